@@ -0,0 +1,207 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+from backend.observabilidade import (
+    ADMISSION_QUEUE, ADMISSION_IN_FLIGHT, ADMISSION_MEMORY, ADMISSION_WAIT, ADMISSION_REJECTED,
+)
+
+# ------------------ CONFIGURAÇÕES ------------------
+# Rotas pesadas (o upload inteiro vai para a memória e vira DataFrames) e a
+# memória de pico por byte enviado, medida com as planilhas dos benchmarks
+ROTAS_PESADAS = {
+    "/api/converter_planilha": 20,
+    "/api/salesforce": 75,  # relê a planilha original inteira no openpyxl para copiar as cores
+    "/api/speedio_assertiva": 20,
+    "/api/pipeline": 25,
+    "/api/extrator-numero": 20,
+    "/api/extrator-email": 20,
+    "/api/transcrever_audios": 20,
+}
+# Conversões simultâneas por rota (ADMISSAO_LIMITES sobrescreve por rota)
+ADMISSAO_CONCORRENCIA = int(os.getenv("ADMISSAO_CONCORRENCIA", "2"))
+# Requisições que podem aguardar vaga por rota; além disso, 503 imediato
+ADMISSAO_FILA = int(os.getenv("ADMISSAO_FILA", "8"))
+# Tempo máximo na fila antes de desistir com 503
+ADMISSAO_ESPERA_MAX_S = float(os.getenv("ADMISSAO_ESPERA_MAX_S", "60"))
+# Memória estimada somada de todas as rotas pesadas em execução
+ADMISSAO_MEMORIA_MB = float(os.getenv("ADMISSAO_MEMORIA_MB", "2048"))
+# Retry-After enquanto a rota ainda não tem tempo médio medido
+ADMISSAO_RETRY_AFTER_S = int(os.getenv("ADMISSAO_RETRY_AFTER_S", "5"))
+
+
+def _por_rota_env(variavel: str, tipo=int) -> dict:
+    """Lê ADMISSAO_LIMITES/ADMISSAO_FATORES no formato 'rota=n,rota=n' (rota sem o /api/)"""
+    valores = {}
+    for item in os.getenv(variavel, "").split(","):
+        if "=" in item:
+            rota, valor = item.split("=", 1)
+            valores[f"/api/{rota.strip().strip('/')}"] = tipo(valor)
+    return valores
+
+
+# Memória reservada por todas as rotas (o OOM derruba o processo inteiro, não uma rota)
+_memoria = {"reservada": 0}
+_controles: dict = {}
+
+
+class Recusada(Exception):
+    def __init__(self, motivo: str, retry_after: int):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+# ------------------ CONTROLE POR ROTA ------------------
+class ControleAdmissao:
+    """
+    Limita as execuções simultâneas de uma rota e a memória estimada do
+    processo. Quem não cabe espera numa fila FIFO limitada; fila cheia ou
+    espera longa demais viram Recusada (503 com Retry-After).
+    """
+
+    def __init__(self, rota: str, limite: int, fila_max: int, espera_max: float, fator_memoria: float):
+        self.rota = rota
+        self.fator_memoria = fator_memoria
+        self.limite = max(1, limite)
+        self.fila_max = fila_max
+        self.espera_max = espera_max
+        self.em_execucao = 0
+        self.fila = deque()
+        self.duracao_media = None
+
+    def estimar_custo(self, headers: dict) -> int:
+        """Memória estimada a partir do Content-Length; sem ele, ocupa o orçamento inteiro"""
+        try:
+            tamanho = int(headers[b"content-length"])
+        except (KeyError, ValueError):
+            return int(ADMISSAO_MEMORIA_MB * 1024 * 1024)
+        return int(tamanho * self.fator_memoria)
+
+    def _cabe(self, custo: int) -> bool:
+        if self.em_execucao >= self.limite:
+            return False
+        # Um upload maior que o orçamento inteiro ainda roda, mas sozinho
+        reservada = _memoria["reservada"]
+        return reservada == 0 or reservada + custo <= ADMISSAO_MEMORIA_MB * 1024 * 1024
+
+    def _ocupar(self, custo: int):
+        self.em_execucao += 1
+        _memoria["reservada"] += custo
+        ADMISSION_IN_FLIGHT.labels(self.rota).set(self.em_execucao)
+        ADMISSION_MEMORY.set(_memoria["reservada"])
+
+    def retry_after(self) -> int:
+        media = self.duracao_media or ADMISSAO_RETRY_AFTER_S
+        return min(600, max(1, math.ceil(media * (len(self.fila) + 1) / self.limite)))
+
+    def _recusar(self, motivo: str):
+        ADMISSION_REJECTED.labels(self.rota, motivo).inc()
+        raise Recusada(motivo, self.retry_after())
+
+    async def admitir(self, custo: int):
+        """Aguarda uma vaga; as vagas são liberadas por liberar()"""
+        inicio = time.perf_counter()
+        if not self.fila and self._cabe(custo):
+            self._ocupar(custo)
+            ADMISSION_WAIT.labels(self.rota).observe(0)
+            return
+        if len(self.fila) >= self.fila_max:
+            self._recusar("fila_cheia")
+
+        futuro = asyncio.get_running_loop().create_future()
+        item = (custo, futuro)
+        self.fila.append(item)
+        ADMISSION_QUEUE.labels(self.rota).set(len(self.fila))
+        try:
+            await asyncio.wait({futuro}, timeout=self.espera_max)
+        except asyncio.CancelledError:
+            # Cliente desistiu: devolve a vaga se ela já tinha sido concedida
+            if futuro.done():
+                self.liberar(custo, 0)
+            else:
+                self._sair_da_fila(item)
+            raise
+        ADMISSION_WAIT.labels(self.rota).observe(time.perf_counter() - inicio)
+        if not futuro.done():
+            self._sair_da_fila(item)
+            self._recusar("tempo_de_espera")
+
+    def _sair_da_fila(self, item):
+        self.fila.remove(item)
+        ADMISSION_QUEUE.labels(self.rota).set(len(self.fila))
+        # Quem estava atrás pode caber agora
+        _despertar()
+
+    def liberar(self, custo: int, duracao: float):
+        self.em_execucao -= 1
+        _memoria["reservada"] -= custo
+        if duracao:
+            self.duracao_media = duracao if self.duracao_media is None else 0.8 * self.duracao_media + 0.2 * duracao
+        ADMISSION_IN_FLIGHT.labels(self.rota).set(self.em_execucao)
+        ADMISSION_MEMORY.set(_memoria["reservada"])
+        _despertar()
+
+    def _despertar(self):
+        while self.fila and self._cabe(self.fila[0][0]):
+            custo, futuro = self.fila.popleft()
+            self._ocupar(custo)
+            futuro.set_result(True)
+        ADMISSION_QUEUE.labels(self.rota).set(len(self.fila))
+
+
+def _despertar():
+    # A memória é compartilhada: a saída de uma rota pode liberar a fila de outra
+    for controle in _controles.values():
+        controle._despertar()
+
+
+def configurar_rotas(rotas: dict = ROTAS_PESADAS) -> dict:
+    limites, fatores = _por_rota_env("ADMISSAO_LIMITES"), _por_rota_env("ADMISSAO_FATORES", float)
+    _controles.clear()
+    for rota, fator in rotas.items():
+        _controles[rota] = ControleAdmissao(
+            rota, limites.get(rota, ADMISSAO_CONCORRENCIA), ADMISSAO_FILA, ADMISSAO_ESPERA_MAX_S,
+            fatores.get(rota, fator),
+        )
+    return _controles
+
+
+# ------------------ MIDDLEWARE ------------------
+class AdmissaoMiddleware:
+    """
+    Middleware ASGI que decide antes de ler o corpo: admite, enfileira ou
+    recusa com 503 e Retry-After as requisições às rotas pesadas.
+    """
+
+    def __init__(self, app, rotas: dict = ROTAS_PESADAS):
+        self.app = app
+        self.controles = configurar_rotas(rotas)
+
+    async def __call__(self, scope, receive, send):
+        controle = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            controle = self.controles.get(scope["path"].rstrip("/"))
+        if controle is None:
+            return await self.app(scope, receive, send)
+
+        custo = controle.estimar_custo(dict(scope.get("headers") or []))
+        try:
+            await controle.admitir(custo)
+        except Recusada as e:
+            resposta = JSONResponse(
+                {"detail": f"Servidor ocupado com outras conversões. Tente novamente em {e.retry_after} s."},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            return await resposta(scope, receive, send)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controle.liberar(custo, time.perf_counter() - inicio)
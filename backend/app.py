@@ -1,19 +1,54 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+# Routers importados no start: as dependências pesadas deles já são tardias (ver README)
 from backend.converter_planilha import router as converter_router
 from backend.extrair_email import router as email_router
 from backend.extrair_numero import router as numero_router
-from backend.speedio_assertiva import router as speedio_router
+from backend.speedio_assertiva import router as speedio_router, HEADERS_MESCLAGEM
 from backend.transcrever_audio import router as transcrever_router
 from backend.whatsapp_validator import router as whatsapp_validator
 from backend.salesforce import router as salesforce
+from backend.pipeline import router as pipeline_router
+from backend.indice_leads import HEADERS_DELTA
+from backend.processamento import iniciar_pool, encerrar_pool
+from backend.admissao import AdmissaoMiddleware
+from backend.compressao import CompressaoMiddleware
+from backend.perfil import router as perfil_router, PerfilMiddleware
+from backend.jobs import router as jobs_router, despachar_jobs, preparar_fila
+from backend.observabilidade import router as metricas_router, MetricasMiddleware, configurar_logging
+
+configurar_logging(os.getenv("LOG_LEVEL", "INFO"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool de processos para as conversões pandas/xlsx, fora do event loop
+    iniciar_pool()
+    await asyncio.to_thread(preparar_fila)
+    despachante = asyncio.create_task(despachar_jobs())
+    yield
+    despachante.cancel()
+    encerrar_pool()
+
 
 app = FastAPI(
     title="Central Dibai Sales - Backend",
     description="API unificada para conversão, extração e transcrição de dados.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson no lugar do json da stdlib em todas as respostas JSON
+    default_response_class=ORJSONResponse,
 )
 
+# Admissão por dentro das métricas: os 503 também são contados na latência
+app.add_middleware(CompressaoMiddleware)
+app.add_middleware(PerfilMiddleware)
+app.add_middleware(AdmissaoMiddleware)
+app.add_middleware(MetricasMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -24,6 +59,7 @@ app.add_middleware(
     allow_credentials=True, 
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Disposition", "Retry-After", "X-Perfil", *HEADERS_MESCLAGEM.values(), *HEADERS_DELTA.values()],
 )
 
 app.include_router(converter_router, prefix="/api", tags=["Conversor"])
@@ -32,4 +68,8 @@ app.include_router(numero_router, prefix="/api", tags=["Extrator de Números"])
 app.include_router(speedio_router, prefix="/api", tags=["Speedio / Assertiva"])
 app.include_router(transcrever_router, prefix="/api", tags=["Transcritor de Áudios"])
 app.include_router(whatsapp_validator, prefix="/api", tags=["Whatsapp Validator"] )
-app.include_router(salesforce, prefix="/api", tags=["Conversor Salesforce"])
\ No newline at end of file
+app.include_router(salesforce, prefix="/api", tags=["Conversor Salesforce"])
+app.include_router(pipeline_router, prefix="/api", tags=["Pipeline"])
+app.include_router(jobs_router, prefix="/api", tags=["Jobs"])
+app.include_router(perfil_router, prefix="/api", tags=["Perfil"])
+app.include_router(metricas_router, tags=["Métricas"])
@@ -0,0 +1,111 @@
+import os
+import gzip
+import asyncio
+
+from backend.importacao import importar_tardio
+
+brotli = importar_tardio("brotli")
+
+# ------------------ CONFIGURAÇÕES ------------------
+# Respostas JSON menores que isso saem sem compressão (não compensa o custo)
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "4096"))
+# Qualidade 5 do brotli: perto do gzip 9 em tamanho e bem mais rápido que a 11
+COMPRESSAO_BROTLI_QUALIDADE = int(os.getenv("COMPRESSAO_BROTLI_QUALIDADE", "5"))
+COMPRESSAO_GZIP_NIVEL = int(os.getenv("COMPRESSAO_GZIP_NIVEL", "6"))
+# Acima disso a compressão sai do event loop
+_LIMITE_THREAD = 1024 * 1024
+
+_PREFERENCIA = {"br": 2, "gzip": 1}
+
+
+def escolher_codificacao(accept_encoding: str):
+    """'br' ou 'gzip' conforme o Accept-Encoding (respeitando q=); None se nenhum for aceito"""
+    melhor, melhor_chave = None, (0, 0)
+    for item in accept_encoding.split(","):
+        nome, *params = [parte.strip() for parte in item.split(";")]
+        nome = nome.lower()
+        if nome not in _PREFERENCIA:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    pass
+        chave = (q, _PREFERENCIA[nome])
+        if q > 0 and chave > melhor_chave:
+            melhor, melhor_chave = nome, chave
+    return melhor
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=COMPRESSAO_BROTLI_QUALIDADE)
+    return gzip.compress(corpo, compresslevel=COMPRESSAO_GZIP_NIVEL, mtime=0)
+
+
+class CompressaoMiddleware:
+    """
+    Middleware ASGI que comprime com brotli ou gzip as respostas JSON grandes
+    (lista de e-mails, validações em lote). Arquivos xlsx/zip/parquet já são
+    compactados e respostas em streaming passam direto.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        codificacao = None
+        for nome, valor in scope.get("headers") or []:
+            if nome == b"accept-encoding":
+                codificacao = escolher_codificacao(valor.decode("latin-1"))
+                break
+        if codificacao is None:
+            return await self.app(scope, receive, send)
+
+        inicio = None
+        repassar = False
+
+        async def send_comprimido(message):
+            nonlocal inicio, repassar
+            if repassar:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                # Segura o início até ver o corpo: os headers dependem da compressão
+                inicio = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            headers = list(inicio.get("headers") or [])
+            nomes = {nome.lower(): valor for nome, valor in headers}
+            corpo = message.get("body", b"")
+            elegivel = (
+                not message.get("more_body", False)
+                and nomes.get(b"content-type", b"").startswith(b"application/json")
+                and b"content-encoding" not in nomes
+                and len(corpo) >= COMPRESSAO_MIN_BYTES
+            )
+            repassar = True
+            if not elegivel:
+                await send(inicio)
+                return await send(message)
+
+            if len(corpo) > _LIMITE_THREAD:
+                corpo = await asyncio.to_thread(comprimir, corpo, codificacao)
+            else:
+                corpo = comprimir(corpo, codificacao)
+            vary = nomes.get(b"vary")
+            headers = [(nome, valor) for nome, valor in headers if nome.lower() not in (b"content-length", b"vary")]
+            headers += [
+                (b"content-encoding", codificacao.encode()),
+                (b"content-length", str(len(corpo)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**inicio, "headers": headers})
+            await send({"type": "http.response.body", "body": corpo, "more_body": False})
+
+        await self.app(scope, receive, send_comprimido)
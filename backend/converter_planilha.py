@@ -1,40 +1,28 @@
+from __future__ import annotations
+
 import io
-import re
 import zipfile
-import pandas as pd
-import xlsxwriter
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from starlette.responses import StreamingResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Header
 from datetime import datetime
+from backend.processamento import executar_no_pool
+from backend.formatos import escolher_formato, serializar, trocar_extensao, resposta_arquivo
+from backend.indice_leads import filtrar_delta, registrar_delta, headers_delta
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import TEXTO_ARROW, compactar, constante
+from backend.redes_sociais import extrair_links
+
+pd = importar_tardio("pandas")
 
 router = APIRouter()
 
 # ==== Funções auxiliares ====
-def separar_redes_sociais(series_redes: pd.Series):
-    links_instagram, links_facebook = [], []
-    instagram_pattern = re.compile(r'(instagram\.com/[^\s,]+)', re.IGNORECASE)
-    facebook_pattern = re.compile(r'(facebook\.com/[^\s,]+)', re.IGNORECASE)
-    for redes_str in series_redes.fillna(''):
-        partes = redes_str.split(',')
-        insta_encontrado, face_encontrado = '', ''
-        for parte in partes:
-            parte = parte.strip()
-            if not insta_encontrado and (m := instagram_pattern.search(parte)):
-                insta_encontrado = 'http://' + m.group(1).lower()
-            if not face_encontrado and (m := facebook_pattern.search(parte)):
-                face_encontrado = 'http://' + m.group(1).lower()
-            if insta_encontrado and face_encontrado:
-                break
-        links_instagram.append(insta_encontrado)
-        links_facebook.append(face_encontrado)
-    return pd.Series(links_facebook), pd.Series(links_instagram)
-
-
 def limpar_numero_endereco(series: pd.Series) -> pd.Series:
-    series = series.astype(str).str.upper().str.strip()
-    series_limpa = series.str.replace(r'[^0-9]', '', regex=True)
-    series_limpa = series_limpa.apply(lambda x: '0' if len(x) > 15 and x.isdigit() else x)
-    return series_limpa.replace(r'^\s*$', '0', regex=True).fillna('0')
+    series_limpa = series.astype(TEXTO_ARROW).str.replace(r'[^0-9]', '', regex=True)
+    # Mais de 15 dígitos não é número de endereço (CNPJ, telefone colado no campo)
+    series_limpa = series_limpa.mask(series_limpa.str.len() > 15, '0')
+    return series_limpa.replace('', '0').fillna('0')
 
 
 # === MAPA EMPRESA ===
@@ -99,26 +87,27 @@ def converter_planilha(df_original: pd.DataFrame, funil: str, usuario: str):
         if col_entrada in df_original.columns:
             df_empresa[col_saida] = df_original[col_entrada]
         elif col_entrada == 'Brasil':
-            df_empresa[col_saida] = 'Brasil'
+            df_empresa[col_saida] = constante('Brasil', df_empresa.index)
         elif col_entrada == 'Outbound':
-            df_empresa[col_saida] = 'Outbound'
+            df_empresa[col_saida] = constante('Outbound', df_empresa.index)
         else:
-            df_empresa[col_saida] = ''
-    df_empresa['Usuário responsável'] = usuario
+            df_empresa[col_saida] = constante('', df_empresa.index)
+    df_empresa['Usuário responsável'] = constante(usuario, df_empresa.index)
     df_empresa['Número'] = limpar_numero_endereco(df_empresa['Número'])
-    df_empresa['Categoria'] = 'Cliente em potencial'
-    df_facebook, df_instagram = separar_redes_sociais(df_original['Rede Social'])
-    df_empresa['Facebook'], df_empresa['Instagram'] = df_facebook, df_instagram
+    df_empresa['Categoria'] = constante('Cliente em potencial', df_empresa.index)
+    links = extrair_links(df_original['Rede Social'], df_original['Site'] if 'Site' in df_original.columns else None)
+    df_empresa['Facebook'], df_empresa['Instagram'] = links['facebook'], links['instagram']
+    df_empresa['LinkedIn'], df_empresa['Website'] = links['linkedin'], links['site']
 
     # === NEGÓCIOS ===
     df_negocios = pd.DataFrame(columns=COLUNAS_NEGOCIOS)
     df_negocios['Empresa relacionada'] = df_empresa['Nome']
     df_negocios['Título do negócio'] = df_empresa['Nome']
-    df_negocios['Usuário responsável'] = usuario
-    df_negocios['Data de início'] = datetime.today().strftime('%d/%m/%Y')
-    df_negocios['Funil'] = funil
-    df_negocios['Etapa'] = 'Em andamento'
-    df_negocios['Status'] = 'Aberto'
+    df_negocios['Usuário responsável'] = constante(usuario, df_negocios.index)
+    df_negocios['Data de início'] = constante(datetime.today().strftime('%d/%m/%Y'), df_negocios.index)
+    df_negocios['Funil'] = constante(funil, df_negocios.index)
+    df_negocios['Etapa'] = constante('Em andamento', df_negocios.index)
+    df_negocios['Status'] = constante('Aberto', df_negocios.index)
 
     # === PESSOAS (SÓCIOS) ===
     pessoas = {}
@@ -147,31 +136,31 @@ def converter_planilha(df_original: pd.DataFrame, funil: str, usuario: str):
                 df_pessoa['Cargo'] = df_filtrado[cargo_col] if cargo_col in df_filtrado.columns else ''
                 df_pessoa['Aniversário'] = df_filtrado[aniversario_col] if aniversario_col in df_filtrado.columns else ''
                 df_pessoa['Ano de nascimento'] = df_filtrado[ano_col] if ano_col in df_filtrado.columns else ''
-                df_pessoa['Usuário responsável'] = usuario
-                df_pessoa['Categoria'] = 'Cliente em potencial'
-                df_pessoa['Origem'] = 'Outbound'
-                df_pessoa['Descrição'] = ''
+                df_pessoa['Usuário responsável'] = constante(usuario, df_pessoa.index)
+                df_pessoa['Categoria'] = constante('Cliente em potencial', df_pessoa.index)
+                df_pessoa['Origem'] = constante('Outbound', df_pessoa.index)
+                df_pessoa['Descrição'] = constante('', df_pessoa.index)
                 df_pessoa['E-mail'] = df_filtrado[email_col] if email_col in df_filtrado.columns else ''
                 df_pessoa['WhatsApp'] = df_filtrado[whatsapp_col] if whatsapp_col in df_filtrado.columns else ''
                 df_pessoa['Telefone'] = df_filtrado[telefone_col] if telefone_col in df_filtrado.columns else ''
                 df_pessoa['Celular'] = df_filtrado[celular_col] if celular_col in df_filtrado.columns else ''
-                df_pessoa['Fax'] = ''
-                df_pessoa['Ramal'] = ''
+                df_pessoa['Fax'] = constante('', df_pessoa.index)
+                df_pessoa['Ramal'] = constante('', df_pessoa.index)
                 df_pessoa['CEP'] = df_filtrado['CEP'] if 'CEP' in df_filtrado.columns else ''
-                df_pessoa['País'] = 'Brasil'
+                df_pessoa['País'] = constante('Brasil', df_pessoa.index)
                 df_pessoa['Estado'] = df_filtrado['Estado'] if 'Estado' in df_filtrado.columns else ''
                 df_pessoa['Cidade'] = df_filtrado['Cidade'] if 'Cidade' in df_filtrado.columns else ''
                 df_pessoa['Bairro'] = df_filtrado['Bairro'] if 'Bairro' in df_filtrado.columns else ''
                 df_pessoa['Rua'] = df_filtrado['Logradouro'] if 'Logradouro' in df_filtrado.columns else ''
                 df_pessoa['Número'] = df_filtrado['Número'] if 'Número' in df_filtrado.columns else ''
                 df_pessoa['Complemento'] = df_filtrado['Complemento'] if 'Complemento' in df_filtrado.columns else ''
-                df_pessoa['Produto'] = ''
+                df_pessoa['Produto'] = constante('', df_pessoa.index)
                 df_pessoa['Rede Social'] = df_filtrado['Rede Social'] if 'Rede Social' in df_filtrado.columns else ''
                 df_pessoa['Twitter'] = df_filtrado[twitter_col] if twitter_col in df_filtrado.columns else ''
                 df_pessoa['LinkedIn'] = df_filtrado[linkedin_col] if linkedin_col in df_filtrado.columns else ''
                 df_pessoa['Skype'] = df_filtrado[skype_col] if skype_col in df_filtrado.columns else ''
                 df_pessoa['Instagram'] = df_filtrado[instagram_col] if instagram_col in df_filtrado.columns else ''
-                df_pessoa['Ranking'] = ''
+                df_pessoa['Ranking'] = constante('', df_pessoa.index)
                 pessoas[f'Pessoas{i}.xlsx'] = df_pessoa
 
     return {
@@ -181,16 +170,8 @@ def converter_planilha(df_original: pd.DataFrame, funil: str, usuario: str):
     }
 
 
-@router.post("/converter_planilha")
-async def upload_e_converter(
-    file: UploadFile = File(...),
-    funil: str = Form(...),
-    usuario_responsavel: str = Form(...)
-):
-    filename_lower = file.filename.lower()
-    conteudo = await file.read()
+def ler_planilha(conteudo: bytes, filename_lower: str) -> pd.DataFrame:
     buffer = io.BytesIO(conteudo)
-
     try:
         if filename_lower.endswith(('.xlsx', '.xls')):
             xls = pd.ExcelFile(buffer)
@@ -199,29 +180,76 @@ async def upload_e_converter(
                 sheet_name = next(s for s in xls.sheet_names if s.lower() == 'main')
             else:
                 sheet_name = xls.sheet_names[0]
-            df = pd.read_excel(xls, sheet_name=sheet_name, dtype=str)
+            return compactar(pd.read_excel(xls, sheet_name=sheet_name, dtype=str))
 
         elif filename_lower.endswith('.csv'):
-            df = pd.read_csv(buffer, dtype=str, encoding='latin-1')
+            return compactar(pd.read_csv(buffer, dtype=str, encoding='latin-1'))
         else:
             raise HTTPException(status_code=400, detail="Formato não suportado. Use .xlsx ou .csv.")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao ler planilha: {str(e)}")
 
-    arquivos = converter_planilha(df, funil, usuario_responsavel)
 
+def gerar_zip(arquivos: dict, formato: str = "xlsx") -> bytes:
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
         for nome_arquivo, dataframe in arquivos.items():
+            if formato != "xlsx":
+                zipf.writestr(trocar_extensao(nome_arquivo, formato), serializar(dataframe, formato))
+                continue
             xlsx_buffer = io.BytesIO()
             with pd.ExcelWriter(xlsx_buffer, engine="xlsxwriter") as writer:
                 dataframe.to_excel(writer, index=False)
-            xlsx_buffer.seek(0)
-            zipf.writestr(nome_arquivo, xlsx_buffer.read())
-
-    zip_buffer.seek(0)
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/x-zip-compressed",
-        headers={"Content-Disposition": "attachment; filename=planilhas_convertidas.zip"}
+            zipf.writestr(nome_arquivo, xlsx_buffer.getvalue())
+    return zip_buffer.getvalue()
+
+
+def processar_converter_planilha(conteudo: bytes, filename_lower: str, funil: str, usuario: str,
+                                 formato: str = "xlsx", delta: bool = False) -> tuple:
+    """
+    Leitura, conversão e geração do ZIP (executado no pool de processos).
+    Devolve (bytes do ZIP, contagens do modo delta ou None).
+    """
+    rota = "/api/converter_planilha"
+    with medir_etapa(rota, "parse"):
+        df = ler_planilha(conteudo, filename_lower)
+    registrar_linhas(rota, len(df))
+    estatisticas = None
+    if delta:
+        with medir_etapa(rota, "delta"):
+            df, pendentes, estatisticas = filtrar_delta(df, "empresas")
+            df = df.reset_index(drop=True)
+    with medir_etapa(rota, "transform"):
+        arquivos = converter_planilha(df, funil, usuario)
+    with medir_etapa(rota, "serialize"):
+        zip_bytes = gerar_zip(arquivos, formato)
+    if delta:
+        registrar_delta("empresas", pendentes)
+    return zip_bytes, estatisticas
+
+
+@router.post("/converter_planilha")
+async def upload_e_converter(
+    file: UploadFile = File(...),
+    funil: str = Form(...),
+    usuario_responsavel: str = Form(...),
+    formato: Optional[str] = Form(None),
+    delta: bool = Form(False),
+    accept: Optional[str] = Header(None),
+):
+    filename_lower = file.filename.lower()
+    if not filename_lower.endswith(('.xlsx', '.xls', '.csv')):
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use .xlsx ou .csv.")
+    formato = escolher_formato(formato, accept)
+    conteudo = await file.read()
+
+    zip_bytes, estatisticas = await executar_no_pool(
+        processar_converter_planilha, conteudo, filename_lower, funil, usuario_responsavel, formato, delta
     )
+
+    resposta = resposta_arquivo(zip_bytes, "planilhas_convertidas.zip", "application/x-zip-compressed")
+    if estatisticas:
+        resposta.headers.update(headers_delta(estatisticas))
+    return resposta
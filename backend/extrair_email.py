@@ -1,34 +1,22 @@
+from __future__ import annotations
+
 import io
-import pandas as pd
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
-
-router = APIRouter()
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from backend.processamento import executar_no_pool
+from backend.formatos import serializar
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import compactar
 
-@router.post("/extrator-email")
-async def extrair_emails_endpoint(file: UploadFile = File(...), gerar_excel: bool = True):
-    filename = file.filename.lower()
-    conteudo = await file.read()
-    buffer = io.BytesIO(conteudo)
+pd = importar_tardio("pandas")
 
-    # Detecta e lê conforme o tipo de arquivo
-    if filename.endswith('.csv'):
-        df = pd.read_csv(buffer, dtype=str, keep_default_na=False, encoding='latin-1')
-        aba_usada = "csv"
-    elif filename.endswith(('.xlsx', '.xls')):
-        planilhas = pd.read_excel(buffer, dtype=str, keep_default_na=False, sheet_name=None)
-        if "main" in planilhas:
-            df = planilhas["main"]
-            aba_usada = "main"
-        else:
-            primeira_aba = list(planilhas.keys())[0]
-            df = planilhas[primeira_aba]
-            aba_usada = primeira_aba
-    else:
-        raise HTTPException(status_code=400, detail="Arquivo não suportado. Envie um CSV ou Excel.")
+router = APIRouter()
 
+def listar_emails(df: pd.DataFrame, aba_usada: str) -> list:
+    """E-mails únicos e ordenados da coluna SOCIO1Email1"""
     coluna_alvo = "SOCIO1Email1"
-    df.columns = df.columns.str.strip()
+    df = df.set_axis(df.columns.str.strip(), axis=1)
 
     if coluna_alvo not in df.columns:
         raise HTTPException(
@@ -45,19 +33,54 @@ async def extrair_emails_endpoint(file: UploadFile = File(...), gerar_excel: boo
             status_code=400,
             detail=f"Nenhum e-mail encontrado na coluna '{coluna_alvo}' da aba '{aba_usada}'."
         )
+    return emails
+
+
+def extrair_emails(conteudo: bytes, filename: str, gerar_excel: bool = True):
+    """Leitura da planilha e extração dos e-mails (executado no pool de processos)"""
+    buffer = io.BytesIO(conteudo)
+    rota = "/api/extrator-email"
+
+    # Detecta e lê conforme o tipo de arquivo
+    with medir_etapa(rota, "parse"):
+        if filename.endswith('.csv'):
+            df = pd.read_csv(buffer, dtype=str, keep_default_na=False, encoding='latin-1')
+            aba_usada = "csv"
+        elif filename.endswith(('.xlsx', '.xls')):
+            planilhas = pd.read_excel(buffer, dtype=str, keep_default_na=False, sheet_name=None)
+            if "main" in planilhas:
+                df = planilhas["main"]
+                aba_usada = "main"
+            else:
+                primeira_aba = list(planilhas.keys())[0]
+                df = planilhas[primeira_aba]
+                aba_usada = primeira_aba
+        else:
+            raise HTTPException(status_code=400, detail="Arquivo não suportado. Envie um CSV ou Excel.")
+        df = compactar(df)
+    registrar_linhas(rota, len(df))
+
+    with medir_etapa(rota, "transform"):
+        emails = listar_emails(df, aba_usada)
 
     # Se gerar Excel, cria o arquivo
     excel_bytes = None
     if gerar_excel:
-        df_out = pd.DataFrame({'email': emails})
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_out.to_excel(writer, index=False, sheet_name="Emails")
-        output.seek(0)
-        excel_bytes = output.read()
-
-    # Retorna JSON com e-mails e arquivo Excel opcional
-    return JSONResponse(
+        with medir_etapa(rota, "serialize"):
+            excel_bytes = serializar(pd.DataFrame({'email': emails}), "xlsx", aba="Emails")
+
+    return emails, excel_bytes
+
+
+@router.post("/extrator-email")
+async def extrair_emails_endpoint(file: UploadFile = File(...), gerar_excel: bool = True):
+    filename = file.filename.lower()
+    conteudo = await file.read()
+
+    emails, excel_bytes = await executar_no_pool(extrair_emails, conteudo, filename, gerar_excel)
+
+    # Retorna JSON com e-mails e arquivo Excel opcional (orjson; gzip/brotli no CompressaoMiddleware)
+    return ORJSONResponse(
         content={
             "emails": emails,
             "excel_base64": excel_bytes.decode("latin1") if excel_bytes else None
@@ -1,8 +1,17 @@
+from __future__ import annotations
+
 import io
 import zipfile
-import pandas as pd
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from starlette.responses import StreamingResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+from backend.processamento import executar_no_pool
+from backend.formatos import escolher_formato, serializar, trocar_extensao, resposta_arquivo
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import compactar
+from backend.telefones import normalizar_telefones
+
+pd = importar_tardio("pandas")
 
 router = APIRouter()
 
@@ -16,19 +25,11 @@ PROMPT_TEMPLATE = (
     'D)Quem é?=Yasmin sobre marketing {business}.'
 )
 
-def formatar_telefone(numero: str) -> str:
-    if not numero or str(numero).strip() == '':
-        return ''
-    numero = str(numero).strip()
-    if not numero.startswith('55') and not numero.startswith('55'):
-        numero = f'55{numero}'
-    numero = numero.replace(' ', '').replace('-', '')
-    return numero
+def formatar_telefones(numeros: pd.Series) -> pd.Series:
+    """Números para discagem: 55 + DDD + número, só dígitos ('' quando vazio)"""
+    return normalizar_telefones(numeros)['internacional'].fillna('')
 
-@router.post("/extrator-numero")
-async def extrair_contatos_endpoint(file: UploadFile = File(...)):
-    filename = file.filename.lower()
-    conteudo = await file.read()
+def ler_planilha(conteudo: bytes, filename: str):
     buffer = io.BytesIO(conteudo)
 
     # Lê o arquivo Excel
@@ -36,15 +37,13 @@ async def extrair_contatos_endpoint(file: UploadFile = File(...)):
         planilhas = pd.read_excel(buffer, dtype=str, sheet_name=None)
 
         if "main" in planilhas:
-            df = planilhas["main"]
-            aba_usada = "main"
-        else:
-            primeira_aba = list(planilhas.keys())[0]
-            df = planilhas[primeira_aba]
-            aba_usada = primeira_aba
-    else:
-        raise HTTPException(status_code=400, detail="Arquivo não suportado. Envie um arquivo Excel (.xlsx ou .xls).")
+            return compactar(planilhas["main"]), "main"
+        primeira_aba = list(planilhas.keys())[0]
+        return compactar(planilhas[primeira_aba]), primeira_aba
+    raise HTTPException(status_code=400, detail="Arquivo não suportado. Envie um arquivo Excel (.xlsx ou .xls).")
 
+
+def montar_contatos(df: pd.DataFrame) -> list:
     dfs = []
 
     # Processa cada conjunto de colunas SOCIOx
@@ -68,7 +67,7 @@ async def extrair_contatos_endpoint(file: UploadFile = File(...)):
                     df.loc[sub_df.index, cel2_col].fillna('')
                 )
 
-            sub_df['phone_number'] = sub_df['phone_number'].apply(formatar_telefone)
+            sub_df['phone_number'] = formatar_telefones(sub_df['phone_number'])
             sub_df['business'] = df.iloc[sub_df.index, 1].fillna('')
 
             sub_df['prompt'] = sub_df.apply(
@@ -80,23 +79,50 @@ async def extrair_contatos_endpoint(file: UploadFile = File(...)):
 
             dfs.append((f"socio{i}.xlsx", sub_df))
 
-    if not dfs:
-        raise HTTPException(status_code=400, detail=f"Nenhum número encontrado na aba '{aba_usada}'.")
+    return dfs
 
-    # Cria o ZIP com arquivos Excel (.xlsx)
+
+def gerar_zip(dfs: list, formato: str = "xlsx") -> bytes:
+    # Cria o ZIP com arquivos Excel (.xlsx) ou no formato pedido
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
         for name, sub_df in dfs:
+            if formato != "xlsx":
+                zipf.writestr(trocar_extensao(name, formato), serializar(sub_df, formato))
+                continue
             excel_buffer = io.BytesIO()
             with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
                 sub_df.to_excel(writer, index=False, sheet_name="Contatos")
-            excel_buffer.seek(0)
-            zipf.writestr(name, excel_buffer.read())
+            zipf.writestr(name, excel_buffer.getvalue())
+    return zip_buffer.getvalue()
+
+
+def extrair_contatos(conteudo: bytes, filename: str, formato: str = "xlsx"):
+    """Leitura da planilha e geração do ZIP de contatos (executado no pool de processos)"""
+    rota = "/api/extrator-numero"
+    with medir_etapa(rota, "parse"):
+        df, aba_usada = ler_planilha(conteudo, filename)
+    registrar_linhas(rota, len(df))
+
+    with medir_etapa(rota, "transform"):
+        dfs = montar_contatos(df)
+    if not dfs:
+        raise HTTPException(status_code=400, detail=f"Nenhum número encontrado na aba '{aba_usada}'.")
+
+    with medir_etapa(rota, "serialize"):
+        return gerar_zip(dfs, formato), aba_usada
+
+
+@router.post("/extrator-numero")
+async def extrair_contatos_endpoint(
+    file: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    accept: Optional[str] = Header(None),
+):
+    formato = escolher_formato(formato, accept)
+    filename = file.filename.lower()
+    conteudo = await file.read()
 
-    zip_buffer.seek(0)
+    zip_bytes, aba_usada = await executar_no_pool(extrair_contatos, conteudo, filename, formato)
 
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename="socios_contatos_{aba_usada}.zip"'}
-    )
+    return resposta_arquivo(zip_bytes, f"socios_contatos_{aba_usada}.zip", "application/zip")
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import io
+import os
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+
+from backend.importacao import importar_tardio
+
+pd = importar_tardio("pandas")
+
+# ------------------ FORMATOS DE SAÍDA ------------------
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATO_PADRAO = "xlsx"
+FORMATOS = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Media types aceitos no header Accept
+_POR_MEDIA_TYPE = {
+    XLSX_MEDIA_TYPE: "xlsx",
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def escolher_formato(formato: Optional[str] = None, accept: Optional[str] = None) -> str:
+    """
+    Formato de saída pedido no parâmetro `formato` ou, na falta dele, no
+    header Accept (respeitando q=; */* conta como xlsx). Sem nenhum dos dois,
+    ou com um Accept só de tipos que não geramos, mantém o xlsx em vez de
+    responder 406: navegadores e clientes antigos mandam Accept genéricos.
+    """
+    if formato:
+        formato = formato.strip().lower().lstrip(".")
+        if formato not in FORMATOS:
+            raise HTTPException(status_code=400, detail=f"Formato de saída inválido. Use: {', '.join(FORMATOS)}")
+        return formato
+
+    candidatos = []
+    for ordem, item in enumerate((accept or "").split(",")):
+        media_type, *params = [parte.strip() for parte in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    pass
+        media_type = media_type.lower()
+        if media_type == "*/*" and q > 0:
+            candidatos.append((-q, ordem, FORMATO_PADRAO))
+        elif media_type in _POR_MEDIA_TYPE and q > 0:
+            candidatos.append((-q, ordem, _POR_MEDIA_TYPE[media_type]))
+    return min(candidatos)[2] if candidatos else FORMATO_PADRAO
+
+
+def trocar_extensao(nome: str, formato: str) -> str:
+    return f"{os.path.splitext(nome)[0]}.{formato}"
+
+
+def serializar(df: pd.DataFrame, formato: str, aba: str = "Sheet1") -> bytes:
+    """Serializa o DataFrame no formato pedido (xlsx simples, sem cabeçalhos extras nem cores)"""
+    if formato == "xlsx":
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name=aba)
+        return buffer.getvalue()
+    if formato == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if formato == "ndjson":
+        if df.empty:
+            return b""
+        return df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso").encode("utf-8")
+    if formato == "parquet":
+        # Colunas object podem misturar números e textos, o que o Arrow não aceita;
+        # category também vira texto, para o schema não depender da cardinalidade
+        texto = {col: "string" for col in df.columns if df[col].dtype in (object, "category")}
+        buffer = io.BytesIO()
+        df.astype(texto).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Formato de saída desconhecido: {formato}")
+
+
+def _em_blocos(conteudo: bytes):
+    for inicio in range(0, len(conteudo), TAMANHO_BLOCO):
+        yield conteudo[inicio:inicio + TAMANHO_BLOCO]
+
+
+def resposta_arquivo(conteudo: bytes, nome: str, media_type: str) -> StreamingResponse:
+    """Envia o resultado em blocos de 1 MB (em vez de linha a linha, como faria um BytesIO)"""
+    return StreamingResponse(
+        _em_blocos(conteudo),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome}"', "Content-Length": str(len(conteudo))},
+    )
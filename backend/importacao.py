@@ -0,0 +1,21 @@
+import types
+import importlib
+
+
+class _ModuloTardio(types.ModuleType):
+    def __getattr__(self, atributo):
+        # Só chega aqui enquanto o módulo real não foi copiado para o proxy.
+        # import_module usa o lock de importação, então threads concorrentes
+        # nunca enxergam o módulo pela metade.
+        modulo = importlib.import_module(self.__name__)
+        self.__dict__.update(modulo.__dict__)
+        return getattr(modulo, atributo)
+
+
+def importar_tardio(nome: str) -> types.ModuleType:
+    """
+    Devolve um substituto do módulo `nome`: a importação real acontece no
+    primeiro acesso a um atributo. Mantém o start do app rápido e só paga
+    pandas, Gemini, fpdf etc. quando a rota que precisa deles é chamada.
+    """
+    return _ModuloTardio(nome)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import time
+import sqlite3
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from backend.importacao import importar_tardio
+from backend.speedio_assertiva import normalizar_cnpj
+
+pd = importar_tardio("pandas")
+
+# ------------------ CONFIGURAÇÕES ------------------
+LEADS_DB_PATH = os.getenv("LEADS_DB_PATH", "leads.sqlite3")
+
+# Contagens do modo delta devolvidas nos headers da resposta
+HEADERS_DELTA = {
+    "novos": "X-Delta-Novos",
+    "alterados": "X-Delta-Alterados",
+    "ignorados": "X-Delta-Ignorados",
+    "sem_cnpj": "X-Delta-Sem-Cnpj",
+}
+
+
+# ------------------ BANCO ------------------
+@contextmanager
+def conectar():
+    conn = sqlite3.connect(LEADS_DB_PATH, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS leads (
+                alvo TEXT NOT NULL,
+                cnpj TEXT NOT NULL,
+                impressao INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (alvo, cnpj)
+            ) WITHOUT ROWID
+        """)
+        yield conn
+    finally:
+        conn.close()
+
+
+# ------------------ MODO DELTA ------------------
+def impressoes(df: pd.DataFrame) -> pd.Series:
+    """Hash do conteúdo de cada linha (independe da ordem das colunas)"""
+    hashes = pd.util.hash_pandas_object(df[sorted(df.columns)].fillna(""), index=False)
+    # uint64 -> int64 para caber no INTEGER do SQLite
+    return pd.Series(hashes.to_numpy().view("int64"), index=df.index)
+
+
+def filtrar_delta(df: pd.DataFrame, alvo: str) -> tuple:
+    """
+    Mantém só as linhas novas ou alteradas desde a última conversão para o alvo.
+    Linhas sem CNPJ válido sempre passam. Devolve (df filtrado, pendentes, estatísticas);
+    os pendentes só entram no índice com registrar_delta, depois que a saída foi gerada.
+    """
+    if "CNPJ" not in df.columns:
+        raise HTTPException(status_code=400, detail="O modo delta exige a coluna 'CNPJ' na planilha.")
+
+    cnpj = normalizar_cnpj(df["CNPJ"])
+    impressao = impressoes(df)
+
+    with conectar() as conn:
+        conn.execute("CREATE TEMP TABLE consulta (cnpj TEXT PRIMARY KEY)")
+        conn.executemany("INSERT OR IGNORE INTO consulta VALUES (?)", ((c,) for c in cnpj.dropna().unique()))
+        anteriores = dict(conn.execute(
+            "SELECT l.cnpj, l.impressao FROM leads l JOIN consulta c ON c.cnpj = l.cnpj WHERE l.alvo = ?", (alvo,)
+        ))
+
+    # Int64 (e não float) para não perder precisão nos hashes de 64 bits
+    anterior = pd.Series(anteriores, dtype="Int64").reindex(cnpj).set_axis(df.index)
+    ignorar = (anterior == impressao).fillna(False).astype(bool)
+    estatisticas = {
+        "novos": int((cnpj.notna() & anterior.isna()).sum()),
+        "alterados": int((anterior.notna() & ~ignorar).sum()),
+        "ignorados": int(ignorar.sum()),
+        "sem_cnpj": int(cnpj.isna().sum()),
+    }
+    registrar = ~ignorar & cnpj.notna()
+    pendentes = list(zip(cnpj[registrar].tolist(), impressao[registrar].tolist()))
+    return df[~ignorar], pendentes, estatisticas
+
+
+def registrar_delta(alvo: str, pendentes: list):
+    """Grava no índice as impressões das linhas emitidas"""
+    agora = time.time()
+    with conectar() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO leads (alvo, cnpj, impressao, atualizado_em) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (alvo, cnpj) DO UPDATE SET impressao = excluded.impressao, atualizado_em = excluded.atualizado_em",
+            ((alvo, cnpj, impressao, agora) for cnpj, impressao in pendentes),
+        )
+        conn.execute("COMMIT")
+
+
+def headers_delta(estatisticas: dict) -> dict:
+    return {HEADERS_DELTA[nome]: str(valor) for nome, valor in estatisticas.items()}
@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+from contextlib import contextmanager
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from starlette.responses import FileResponse
+
+from backend.processamento import executar_no_pool
+from backend.observabilidade import acompanhar_etapas
+from backend.formatos import FORMATOS, FORMATO_PADRAO, escolher_formato
+from backend.converter_planilha import processar_converter_planilha
+from backend.speedio_assertiva import processar_speedio_assertiva, processar_speedio_streaming
+from backend.salesforce import processar_salesforce
+from backend.extrair_numero import extrair_contatos
+from backend.extrair_email import extrair_emails
+from backend.pipeline import processar_pipeline, validar_alvos
+
+# ------------------ CONFIGURAÇÕES ------------------
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs_data")
+JOBS_TTL_SEGUNDOS = int(os.getenv("JOBS_TTL_SEGUNDOS", "3600"))
+JOBS_INTERVALO_POLL = float(os.getenv("JOBS_INTERVALO_POLL", "1.0"))
+JOBS_CONCORRENCIA_PADRAO = int(os.getenv("JOBS_CONCORRENCIA_PADRAO", "1"))
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+router = APIRouter()
+
+
+# ------------------ TIPOS DE JOB ------------------
+# Cada tipo recebe (conteudo, filename, **parametros) e devolve
+# (bytes do resultado, nome do arquivo, media type).
+def _job_converter_planilha(conteudo, filename, funil, usuario_responsavel, formato=FORMATO_PADRAO):
+    zip_bytes, _ = processar_converter_planilha(conteudo, filename, funil, usuario_responsavel, formato)
+    return zip_bytes, "planilhas_convertidas.zip", "application/x-zip-compressed"
+
+def _job_speedio_assertiva(conteudo, filename, formato=FORMATO_PADRAO, streaming=False):
+    processar = processar_speedio_streaming if streaming else processar_speedio_assertiva
+    saida = processar(conteudo, filename, formato)
+    return saida, f"Speedio_Assertiva_Unificado.{formato}", FORMATOS[formato]
+
+def _job_salesforce(conteudo, filename, formato=FORMATO_PADRAO):
+    if not filename.endswith(('.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use .xlsx ou .xls.")
+    saida, _ = processar_salesforce(conteudo, formato)
+    return saida, f"Salesforce.{formato}", FORMATOS[formato]
+
+def _job_extrator_numero(conteudo, filename, formato=FORMATO_PADRAO):
+    zip_bytes, aba_usada = extrair_contatos(conteudo, filename, formato)
+    return zip_bytes, f"socios_contatos_{aba_usada}.zip", "application/zip"
+
+def _job_extrator_email(conteudo, filename, gerar_excel=True):
+    emails, excel_bytes = extrair_emails(conteudo, filename, gerar_excel)
+    content = {"emails": emails, "excel_base64": excel_bytes.decode("latin1") if excel_bytes else None}
+    return json.dumps(content).encode(), "emails.json", "application/json"
+
+def _job_pipeline(conteudo, filename, alvos, funil=None, usuario_responsavel=None, formato=FORMATO_PADRAO):
+    zip_bytes = processar_pipeline(conteudo, filename, alvos, formato, funil, usuario_responsavel)
+    return zip_bytes, "pipeline.zip", "application/zip"
+
+
+def _limites_env() -> dict:
+    """Lê JOBS_LIMITES no formato 'tipo=n,tipo=n'"""
+    limites = {}
+    for item in os.getenv("JOBS_LIMITES", "").split(","):
+        if "=" in item:
+            tipo, valor = item.split("=", 1)
+            limites[tipo.strip()] = int(valor)
+    return limites
+
+_LIMITES = _limites_env()
+
+TIPOS_JOB = {
+    "converter_planilha": {"func": _job_converter_planilha, "parametros": ["funil", "usuario_responsavel", "formato"]},
+    "speedio_assertiva": {"func": _job_speedio_assertiva, "parametros": ["formato", "streaming"]},
+    "salesforce": {"func": _job_salesforce, "parametros": ["formato"]},
+    "extrator-numero": {"func": _job_extrator_numero, "parametros": ["formato"]},
+    "extrator-email": {"func": _job_extrator_email, "parametros": ["gerar_excel"]},
+    # funil e usuario_responsavel só são exigidos com o alvo converter_planilha (validar_alvos)
+    "pipeline": {"func": _job_pipeline, "parametros": ["alvos", "funil", "usuario_responsavel", "formato"],
+                 "opcionais": ["funil", "usuario_responsavel"]},
+}
+for _tipo, _config in TIPOS_JOB.items():
+    _config["limite"] = _LIMITES.get(_tipo, JOBS_CONCORRENCIA_PADRAO)
+
+# Progresso gravado quando cada etapa dos conversores (medir_etapa) começa.
+# "entrada" e "saida" são a leitura do upload e a gravação do resultado.
+PROGRESSO_ETAPAS = {
+    "entrada": 0.05,
+    "parse": 0.1,
+    "streaming": 0.1,
+    "delta": 0.4,
+    "transform": 0.5,
+    "merge": 0.5,
+    "serialize": 0.8,
+    "saida": 0.95,
+}
+
+
+# ------------------ BANCO ------------------
+@contextmanager
+def conectar():
+    # Autocommit: cada comando é uma transação, exceto onde há BEGIN explícito
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+def criar_tabelas():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    with conectar() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progresso REAL NOT NULL DEFAULT 0,
+                parametros TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                nome_saida TEXT,
+                media_type TEXT,
+                erro TEXT,
+                dono INTEGER,
+                criado_em REAL NOT NULL,
+                iniciado_em REAL,
+                concluido_em REAL,
+                expira_em REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, tipo, criado_em)")
+
+def _caminho(job_id: str, sufixo: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.{sufixo}")
+
+def _atualizar(conn: sqlite3.Connection, job_id: str, **campos):
+    sets = ", ".join(f"{k} = ?" for k in campos)
+    conn.execute(f"UPDATE jobs SET {sets} WHERE id = ?", (*campos.values(), job_id))
+
+def _pid_ativo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+def recuperar_jobs_interrompidos():
+    """Devolve à fila jobs cujo processo despachante não existe mais"""
+    with conectar() as conn:
+        for row in conn.execute("SELECT id, dono FROM jobs WHERE status = ?", (EXECUTANDO,)).fetchall():
+            if row["dono"] == os.getpid() or not _pid_ativo(row["dono"] or 0):
+                _atualizar(conn, row["id"], status=PENDENTE, progresso=0, dono=None, iniciado_em=None)
+
+def reservar_job(tipo: str, limite: int) -> Optional[str]:
+    """Marca o próximo job pendente do tipo como em execução, respeitando o limite de concorrência"""
+    with conectar() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        em_execucao = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND tipo = ?", (EXECUTANDO, tipo)
+        ).fetchone()[0]
+        row = None
+        if em_execucao < limite:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND tipo = ? ORDER BY criado_em LIMIT 1", (PENDENTE, tipo)
+            ).fetchone()
+            if row:
+                _atualizar(conn, row["id"], status=EXECUTANDO, dono=os.getpid(), iniciado_em=time.time())
+        conn.execute("COMMIT")
+    return row["id"] if row else None
+
+def _detalhe_erro(e: Exception) -> str:
+    return str(e.detail) if isinstance(e, HTTPException) else f"{type(e).__name__}: {str(e)}"
+
+def _finalizar_com_erro(conn: sqlite3.Connection, job_id: str, erro: str):
+    agora = time.time()
+    _atualizar(conn, job_id, status=ERRO, erro=erro, concluido_em=agora, expira_em=agora + JOBS_TTL_SEGUNDOS)
+
+def registrar_falha(job_id: str, erro: str):
+    with conectar() as conn:
+        _finalizar_com_erro(conn, job_id, erro)
+
+def enfileirar_job(job_id: str, tipo: str, parametros: dict, filename: str, arquivo):
+    """Copia o upload (já em disco no SpooledTemporaryFile) para JOBS_DIR e cria o job pendente"""
+    with open(_caminho(job_id, "entrada"), "wb") as f:
+        shutil.copyfileobj(arquivo, f)
+    with conectar() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, tipo, status, parametros, filename, criado_em) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, tipo, PENDENTE, json.dumps(parametros), filename, time.time()),
+        )
+
+def remover_expirados():
+    with conectar() as conn:
+        expirados = conn.execute(
+            "SELECT id FROM jobs WHERE expira_em IS NOT NULL AND expira_em < ?", (time.time(),)
+        ).fetchall()
+        for row in expirados:
+            for sufixo in ("entrada", "saida"):
+                try:
+                    os.remove(_caminho(row["id"], sufixo))
+                except FileNotFoundError:
+                    pass
+            conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+
+
+# ------------------ EXECUÇÃO (processo do pool) ------------------
+def executar_job(job_id: str):
+    """
+    Executa o job no processo do pool, registrando resultado no SQLite e o
+    progresso a cada etapa do conversor (PROGRESSO_ETAPAS).
+    """
+    with conectar() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        progresso = 0.0
+
+        def avancar(etapa: str):
+            # Só avança: etapas repetidas (ex.: serialize por alvo no pipeline) não voltam o progresso
+            nonlocal progresso
+            valor = PROGRESSO_ETAPAS.get(etapa, progresso)
+            if valor > progresso:
+                progresso = valor
+                _atualizar(conn, job_id, progresso=valor)
+
+        try:
+            with open(_caminho(job_id, "entrada"), "rb") as f:
+                conteudo = f.read()
+            avancar("entrada")
+
+            func = TIPOS_JOB[job["tipo"]]["func"]
+            with acompanhar_etapas(avancar):
+                resultado, nome_saida, media_type = func(conteudo, job["filename"], **json.loads(job["parametros"]))
+            avancar("saida")
+
+            with open(_caminho(job_id, "saida"), "wb") as f:
+                f.write(resultado)
+            agora = time.time()
+            _atualizar(
+                conn, job_id, status=CONCLUIDO, progresso=1.0, nome_saida=nome_saida, media_type=media_type,
+                concluido_em=agora, expira_em=agora + JOBS_TTL_SEGUNDOS,
+            )
+        except Exception as e:
+            _finalizar_com_erro(conn, job_id, _detalhe_erro(e))
+        finally:
+            try:
+                os.remove(_caminho(job_id, "entrada"))
+            except FileNotFoundError:
+                pass
+
+
+# ------------------ DESPACHANTE ------------------
+_novo_job = asyncio.Event()
+
+async def _rodar(job_id: str):
+    try:
+        await executar_no_pool(executar_job, job_id)
+    except Exception as e:
+        # Falha do próprio pool (ex.: processo morto por falta de memória)
+        await asyncio.to_thread(registrar_falha, job_id, _detalhe_erro(e))
+    finally:
+        _novo_job.set()
+
+def preparar_fila():
+    """Cria as tabelas e devolve à fila os jobs interrompidos (antes de o app aceitar requisições)"""
+    criar_tabelas()
+    recuperar_jobs_interrompidos()
+
+async def despachar_jobs():
+    """
+    Loop do lifespan: distribui jobs pendentes ao pool e limpa resultados
+    expirados. O acesso ao SQLite e aos arquivos roda em threads, fora do event loop.
+    """
+    tarefas = set()
+    ultima_limpeza = 0.0
+    while True:
+        # Limpa antes de procurar: um job criado durante as consultas (em thread) acorda a próxima volta
+        _novo_job.clear()
+        for tipo, config in TIPOS_JOB.items():
+            while job_id := await asyncio.to_thread(reservar_job, tipo, config["limite"]):
+                tarefa = asyncio.create_task(_rodar(job_id))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+        if time.time() - ultima_limpeza > 60:
+            await asyncio.to_thread(remover_expirados)
+            ultima_limpeza = time.time()
+
+        try:
+            await asyncio.wait_for(_novo_job.wait(), timeout=JOBS_INTERVALO_POLL)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ------------------ ENDPOINTS ------------------
+def _status(job: sqlite3.Row) -> dict:
+    return {
+        "id": job["id"],
+        "tipo": job["tipo"],
+        "status": job["status"],
+        "progresso": job["progresso"],
+        "erro": job["erro"],
+        "criado_em": job["criado_em"],
+        "concluido_em": job["concluido_em"],
+        "expira_em": job["expira_em"],
+        "resultado_url": f"/api/jobs/{job['id']}/resultado" if job["status"] == CONCLUIDO else None,
+    }
+
+def _buscar_job(job_id: str) -> sqlite3.Row:
+    with conectar() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None or (job["expira_em"] and job["expira_em"] < time.time()):
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado.")
+    return job
+
+@router.post("/jobs", status_code=202)
+async def criar_job(
+    tipo: str = Form(...),
+    file: UploadFile = File(...),
+    funil: Optional[str] = Form(None),
+    usuario_responsavel: Optional[str] = Form(None),
+    gerar_excel: bool = Form(True),
+    formato: Optional[str] = Form(None),
+    streaming: bool = Form(False),
+    alvos: Optional[List[str]] = Form(None),
+):
+    """Enfileira uma conversão e devolve o id para acompanhamento"""
+    if tipo not in TIPOS_JOB:
+        raise HTTPException(status_code=400, detail=f"Tipo de job inválido. Use: {', '.join(TIPOS_JOB)}")
+
+    # O Accept deste endpoint se refere ao JSON de status; o formato do resultado vem só do parâmetro
+    recebidos = {"funil": funil, "usuario_responsavel": usuario_responsavel, "gerar_excel": gerar_excel,
+                 "formato": escolher_formato(formato), "streaming": streaming,
+                 "alvos": validar_alvos(alvos or [], funil, usuario_responsavel) if tipo == "pipeline" else None}
+    parametros = {nome: recebidos[nome] for nome in TIPOS_JOB[tipo]["parametros"]}
+    opcionais = TIPOS_JOB[tipo].get("opcionais", [])
+    faltando = [nome for nome, valor in parametros.items() if valor is None and nome not in opcionais]
+    if faltando:
+        raise HTTPException(status_code=400, detail=f"Parâmetros obrigatórios ausentes: {', '.join(faltando)}")
+
+    job_id = uuid.uuid4().hex
+    await asyncio.to_thread(enfileirar_job, job_id, tipo, parametros, file.filename.lower(), file.file)
+    _novo_job.set()
+
+    return _status(await asyncio.to_thread(_buscar_job, job_id))
+
+@router.get("/jobs/{job_id}")
+async def status_job(job_id: str):
+    return _status(await asyncio.to_thread(_buscar_job, job_id))
+
+@router.get("/jobs/{job_id}/resultado")
+async def resultado_job(job_id: str):
+    job = await asyncio.to_thread(_buscar_job, job_id)
+    if job["status"] != CONCLUIDO:
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status: {job['status']}).")
+    return FileResponse(_caminho(job_id, "saida"), media_type=job["media_type"], filename=job["nome_saida"])
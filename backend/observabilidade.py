@@ -0,0 +1,172 @@
+import json
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+
+from fastapi import APIRouter
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from starlette.responses import Response
+
+router = APIRouter()
+
+# ------------------ MÉTRICAS ------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latência das requisições por rota",
+    ["method", "route", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+UPLOAD_SIZE = Histogram(
+    "upload_size_bytes", "Tamanho dos uploads por rota", ["route"],
+    buckets=(1e4, 1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8),
+)
+ROWS_PROCESSED = Histogram(
+    "rows_processed", "Linhas lidas por conversão", ["route"],
+    buckets=(10, 100, 1e3, 1e4, 5e4, 1e5, 5e5, 1e6),
+)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds", "Tempo de cada etapa (parse/transform/serialize/upstream)",
+    ["route", "stage"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Chamadas a serviços externos", ["service"])
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Erros em serviços externos", ["service", "reason"])
+TRANSCRIPTION_BATCHES = Counter(
+    "transcription_batches_total", "Lotes de gravações curtas enviados numa só chamada ao Gemini",
+    ["result"],
+)
+ADMISSION_QUEUE = Gauge("admission_queue_depth", "Requisições aguardando vaga por rota", ["route"])
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requisições admitidas em execução por rota", ["route"])
+ADMISSION_MEMORY = Gauge("admission_reserved_memory_bytes", "Memória estimada reservada pelas requisições admitidas")
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Tempo na fila até a admissão", ["route"],
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requisições recusadas com 503", ["route", "reason"])
+
+PROCESS_POOL_RESTARTS = Counter(
+    "process_pool_restarts_total", "Pools de conversão recriados após a morte de um processo filho",
+)
+
+_HISTOGRAMAS = {"rows": ROWS_PROCESSED, "stage": STAGE_DURATION}
+
+# Quando definido, é chamado com o nome de cada etapa que começa (ex.: para
+# registrar o progresso de um job no processo do pool).
+_ao_iniciar_etapa = contextvars.ContextVar("ao_iniciar_etapa", default=None)
+
+# Quando definida, as medições ficam numa lista em vez de irem direto ao
+# registro. Usado no pool de processos: o filho devolve a lista e o processo
+# principal (que expõe /metrics) registra os valores.
+_coleta = contextvars.ContextVar("coleta_metricas", default=None)
+
+
+def _observar(nome: str, labels: tuple, valor: float):
+    coleta = _coleta.get()
+    if coleta is not None:
+        coleta.append((nome, labels, valor))
+    else:
+        _HISTOGRAMAS[nome].labels(*labels).observe(valor)
+
+
+@contextmanager
+def medir_etapa(rota: str, etapa: str):
+    """Cronometra uma etapa de um conversor"""
+    aviso = _ao_iniciar_etapa.get()
+    if aviso is not None:
+        aviso(etapa)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observar("stage", (rota, etapa), time.perf_counter() - inicio)
+
+
+def registrar_linhas(rota: str, quantidade: int):
+    _observar("rows", (rota,), quantidade)
+
+
+@contextmanager
+def coletar_metricas(coleta: list):
+    token = _coleta.set(coleta)
+    try:
+        yield coleta
+    finally:
+        _coleta.reset(token)
+
+
+@contextmanager
+def acompanhar_etapas(aviso):
+    """Chama `aviso(etapa)` no início de cada medir_etapa do bloco"""
+    token = _ao_iniciar_etapa.set(aviso)
+    try:
+        yield
+    finally:
+        _ao_iniciar_etapa.reset(token)
+
+
+def registrar_coleta(coleta: list):
+    for nome, labels, valor in coleta:
+        _HISTOGRAMAS[nome].labels(*labels).observe(valor)
+
+
+class MetricasMiddleware:
+    """Middleware ASGI que mede latência e tamanho do upload por rota"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        inicio = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_com_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            # Usa o template da rota (/api/jobs/{job_id}) para não explodir a cardinalidade
+            route = scope.get("route")
+            rota = getattr(route, "path", "desconhecida")
+            REQUEST_LATENCY.labels(scope["method"], rota, str(status["code"])).observe(time.perf_counter() - inicio)
+            headers = dict(scope.get("headers") or [])
+            if b"content-length" in headers and scope["method"] in ("POST", "PUT"):
+                UPLOAD_SIZE.labels(rota).observe(int(headers[b"content-length"]))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# ------------------ LOGS ------------------
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por evento, com os campos passados em `extra`"""
+
+    _PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        evento = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        evento.update({k: v for k, v in vars(record).items() if k not in self._PADRAO})
+        if record.exc_info:
+            evento["exc"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+def configurar_logging(nivel: str = "INFO"):
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("backend")
+    logger.handlers[:] = [handler]
+    logger.setLevel(nivel)
+    logger.propagate = False
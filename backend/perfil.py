@@ -0,0 +1,274 @@
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, HTTPException, Header, Query
+from starlette.responses import FileResponse, PlainTextResponse
+
+router = APIRouter()
+
+# ------------------ CONFIGURAÇÕES ------------------
+# Sem token configurado o modo de perfil fica desligado
+PERFIL_TOKEN = os.getenv("PERFIL_TOKEN", "")
+PERFIL_DIR = os.getenv("PERFIL_DIR", "perfis")
+PERFIL_MAX_ARQUIVOS = int(os.getenv("PERFIL_MAX_ARQUIVOS", "50"))
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "5"))
+PERFIL_TOP_ALOCACOES = 25
+# Abaixo disso não vale o custo de um snapshot do tracemalloc
+PERFIL_SNAPSHOT_MIN_MB = 10
+
+# Perfil da requisição: {"memoria": bool, "medicoes": [...]} (None = desligado, o caso normal)
+_perfil = contextvars.ContextVar("perfil_requisicao", default=None)
+
+
+def perfil_da_requisicao() -> Optional[dict]:
+    return _perfil.get()
+
+
+def _autorizado(token: str) -> bool:
+    return bool(PERFIL_TOKEN) and hmac.compare_digest(token.encode(), PERFIL_TOKEN.encode())
+
+
+# ------------------ AMOSTRAGEM (processo do pool) ------------------
+def _rss() -> Optional[int]:
+    # /proc só existe no Linux; em outros sistemas o pico de RSS fica de fora
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _pilha(frame) -> str:
+    """Pilha no formato 'folded' (raiz;...;folha), o mesmo do flamegraph.pl e do speedscope"""
+    quadros = []
+    while frame is not None:
+        codigo = frame.f_code
+        quadros.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(quadros))
+
+
+class _Amostrador(threading.Thread):
+    """
+    Lê a pilha da thread medida a cada intervalo. Cada amostra pesa o tempo
+    real desde a anterior: trechos em C que seguram o GIL não somem do perfil.
+    Acompanha também o pico de RSS e, com tracemalloc ligado, guarda um
+    snapshot a cada novo pico de memória.
+    """
+
+    def __init__(self, thread_id: int, intervalo: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.amostras = 0
+        self.rss_inicial = self.rss_pico = _rss()
+        self.snapshot_pico = None
+        self._pico_snapshot = PERFIL_SNAPSHOT_MIN_MB * 1e6
+        self._parar = threading.Event()
+
+    def run(self):
+        anterior = time.perf_counter()
+        while not self._parar.wait(self.intervalo):
+            agora = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.pilhas[_pilha(frame)] += agora - anterior
+                self.amostras += 1
+            anterior = agora
+            if self.rss_pico is not None:
+                self.rss_pico = max(self.rss_pico, _rss() or 0)
+            if tracemalloc.is_tracing():
+                atual, _ = tracemalloc.get_traced_memory()
+                # Novo snapshot só quando o pico cresce 50%: poucos snapshots mesmo em arquivos grandes
+                if atual > self._pico_snapshot * 1.5:
+                    self._pico_snapshot = atual
+                    self.snapshot_pico = tracemalloc.take_snapshot()
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+@contextmanager
+def medir_perfil(medicao: dict, memoria: bool = False):
+    """
+    Perfil de CPU por amostragem e pico de RSS do bloco. Com `memoria`, liga
+    também o tracemalloc (pico do heap Python e linhas que mais alocaram),
+    que deixa a conversão várias vezes mais lenta e distorce os tempos.
+    """
+    amostrador = _Amostrador(threading.get_ident(), PERFIL_INTERVALO_MS / 1000)
+    if memoria:
+        tracemalloc.start()
+    inicio, cpu_inicio = time.perf_counter(), time.process_time()
+    amostrador.start()
+    try:
+        yield medicao
+    finally:
+        amostrador.parar()
+        medicao.update({
+            "duracao_s": time.perf_counter() - inicio,
+            "cpu_s": time.process_time() - cpu_inicio,
+            "amostras": amostrador.amostras,
+            "pilhas": {pilha: round(s * 1000, 3) for pilha, s in amostrador.pilhas.items()},
+        })
+        if amostrador.rss_pico is not None:
+            medicao["rss_pico_mb"] = amostrador.rss_pico / 1e6
+            medicao["rss_acrescimo_mb"] = (amostrador.rss_pico - amostrador.rss_inicial) / 1e6
+        if memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            snapshot = amostrador.snapshot_pico
+            tracemalloc.stop()
+            alocacoes = snapshot.statistics("lineno")[:PERFIL_TOP_ALOCACOES] if snapshot else []
+            medicao["tracemalloc_pico_mb"] = pico / 1e6
+            medicao["alocacoes_no_pico"] = [
+                {"linha": f"{a.traceback[0].filename}:{a.traceback[0].lineno}", "mb": round(a.size / 1e6, 3),
+                 "blocos": a.count}
+                for a in alocacoes
+            ]
+
+
+def registrar_medicao(perfil: dict, medicao: dict, coleta: list):
+    """Junta ao perfil da requisição uma execução no pool e os tempos de etapa dela"""
+    etapas = Counter()
+    for nome, labels, valor in coleta:
+        if nome == "stage":
+            etapas[labels[1]] += valor
+    medicao["etapas"] = {etapa: round(valor, 4) for etapa, valor in etapas.items()}
+    perfil["medicoes"].append(medicao)
+
+
+# ------------------ RESUMO E ARQUIVO ------------------
+def _resumir(medicoes: list, total_s: float) -> dict:
+    etapas = Counter()
+    for medicao in medicoes:
+        etapas.update(medicao.get("etapas", {}))
+    resumo = {
+        "total_s": round(total_s, 3),
+        "pool_s": round(sum(m["duracao_s"] for m in medicoes), 3),
+        "cpu_s": round(sum(m["cpu_s"] for m in medicoes), 3),
+    }
+    for chave in ("rss_pico_mb", "rss_acrescimo_mb", "tracemalloc_pico_mb"):
+        valores = [m[chave] for m in medicoes if chave in m]
+        if valores:
+            resumo[chave] = round(max(valores), 1)
+    resumo.update({f"{etapa}_s": round(valor, 3) for etapa, valor in etapas.items()})
+    return resumo
+
+
+def _caminho(perfil_id: str) -> str:
+    return os.path.join(PERFIL_DIR, f"{perfil_id}.json")
+
+
+def _salvar(perfil_id: str, rota: str, resumo: dict, medicoes: list):
+    os.makedirs(PERFIL_DIR, exist_ok=True)
+    pilhas = Counter()
+    for medicao in medicoes:
+        pilhas.update(medicao.pop("pilhas", {}))
+    conteudo = {
+        "id": perfil_id, "rota": rota, "criado_em": time.time(), "intervalo_ms": PERFIL_INTERVALO_MS,
+        "resumo": resumo, "execucoes_no_pool": medicoes,
+        "pilhas_ms": dict(pilhas.most_common()),
+    }
+    with open(_caminho(perfil_id), "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False)
+
+    # Mantém só os perfis mais recentes
+    arquivos = sorted(
+        (os.path.join(PERFIL_DIR, nome) for nome in os.listdir(PERFIL_DIR) if nome.endswith(".json")),
+        key=os.path.getmtime,
+    )
+    for antigo in arquivos[:-PERFIL_MAX_ARQUIVOS]:
+        os.remove(antigo)
+
+
+# ------------------ MIDDLEWARE ------------------
+class PerfilMiddleware:
+    """
+    Liga o perfil quando a requisição traz `X-Perfil: <PERFIL_TOKEN>` ou
+    `?perfil=<PERFIL_TOKEN>` (com `X-Perfil-Modo: memoria` ou
+    `?perfil_modo=memoria` para ligar o tracemalloc). O resumo volta no header
+    X-Perfil e o perfil completo fica em GET /api/perfis/{id}. Sem o header, só repassa.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _parametros(self, scope) -> tuple:
+        """(token, modo) do header ou da query string"""
+        headers = dict(scope.get("headers") or [])
+        token, modo = headers.get(b"x-perfil"), headers.get(b"x-perfil-modo")
+        if token is not None:
+            return token.decode("latin-1"), (modo or b"").decode("latin-1")
+        if b"perfil=" in scope.get("query_string", b""):
+            query = parse_qs(scope["query_string"].decode("latin-1"))
+            return query.get("perfil", [None])[0], query.get("perfil_modo", [""])[0]
+        return None, ""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PERFIL_TOKEN or scope["path"].startswith("/api/perfis/"):
+            return await self.app(scope, receive, send)
+        token, modo = self._parametros(scope)
+        if token is None:
+            return await self.app(scope, receive, send)
+        if not _autorizado(token):
+            resposta = PlainTextResponse("Token de perfil inválido.", status_code=403)
+            return await resposta(scope, receive, send)
+
+        perfil_id = uuid.uuid4().hex
+        perfil = {"memoria": modo == "memoria", "medicoes": []}
+        inicio = time.perf_counter()
+
+        async def send_com_resumo(message):
+            if message["type"] == "http.response.start":
+                resumo = _resumir(perfil["medicoes"], time.perf_counter() - inicio)
+                # Diretório e json em outra thread, fora do caminho de envio do event loop
+                await asyncio.to_thread(_salvar, perfil_id, scope["path"], resumo, perfil["medicoes"])
+                valor = "; ".join([f"id={perfil_id}", *(f"{k}={v}" for k, v in resumo.items())])
+                message["headers"] = [*message.get("headers", []), (b"x-perfil", valor.encode("latin-1"))]
+            await send(message)
+
+        token_ctx = _perfil.set(perfil)
+        try:
+            await self.app(scope, receive, send_com_resumo)
+        finally:
+            _perfil.reset(token_ctx)
+
+
+# ------------------ DOWNLOAD ------------------
+@router.get("/perfis/{perfil_id}")
+async def baixar_perfil(
+    perfil_id: str,
+    formato: str = Query("json", pattern="^(json|folded)$"),
+    x_perfil: Optional[str] = Header(None),
+    perfil: Optional[str] = Query(None),
+):
+    """
+    Perfil completo (json) ou só as pilhas no formato folded, que o
+    speedscope e o flamegraph.pl abrem direto.
+    """
+    if not PERFIL_TOKEN:
+        raise HTTPException(status_code=404, detail="Modo de perfil desligado (defina PERFIL_TOKEN).")
+    if not _autorizado(x_perfil or perfil or ""):
+        raise HTTPException(status_code=403, detail="Token de perfil inválido.")
+    caminho = _caminho(perfil_id)
+    if not perfil_id.isalnum() or not os.path.exists(caminho):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    if formato == "json":
+        return FileResponse(caminho, media_type="application/json", filename=f"perfil_{perfil_id}.json")
+    with open(caminho, encoding="utf-8") as f:
+        pilhas = json.load(f)["pilhas_ms"]
+    linhas = "".join(f"{pilha} {round(ms)}\n" for pilha, ms in pilhas.items() if round(ms) > 0)
+    return PlainTextResponse(linhas, headers={"Content-Disposition": f'attachment; filename="perfil_{perfil_id}.folded"'})
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+
+from backend.processamento import executar_no_pool
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import compactar
+from backend.formatos import escolher_formato, serializar, trocar_extensao, resposta_arquivo
+from backend.speedio_assertiva import ler_arquivo, transformar_speedio_assertiva, gerar_xlsx
+from backend.salesforce import transformar_salesforce
+from backend.converter_planilha import converter_planilha
+from backend.extrair_numero import montar_contatos
+from backend.extrair_email import listar_emails
+
+pd = importar_tardio("pandas")
+
+router = APIRouter()
+
+ROTA = "/api/pipeline"
+
+
+# ------------------ PLANILHA UNIFICADA EM MEMÓRIA ------------------
+def _texto(valor):
+    # Números inteiros voltam do xlsx sem o ".0"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def como_planilha_lida(df_saida: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deixa a saída do speedio_assertiva como os conversores a veriam ao reler o
+    xlsx unificado com dtype=str: tudo texto, células vazias como NaN e tipos compactos.
+    """
+    colunas = {}
+    for col in df_saida.columns:
+        serie = df_saida[col].astype(object)
+        colunas[col] = serie.map(_texto, na_action="ignore").replace("", float("nan"))
+    return compactar(pd.DataFrame(colunas, index=pd.RangeIndex(len(df_saida)), columns=df_saida.columns))
+
+
+# ------------------ ALVOS ------------------
+# Cada alvo recebe a planilha unificada e devolve [(nome do arquivo, bytes)].
+def _alvo_speedio_assertiva(df_saida, df_unificado, formato, **_):
+    if formato == "xlsx":
+        return [("Speedio_Assertiva_Unificado.xlsx", gerar_xlsx(df_saida))]
+    return [(f"Speedio_Assertiva_Unificado.{formato}", serializar(df_saida, formato))]
+
+def _alvo_salesforce(df_saida, df_unificado, formato, **_):
+    # A planilha unificada não tem cores nos celulares, então não há o que copiar
+    return [(f"Salesforce.{formato}", serializar(transformar_salesforce(df_unificado), formato))]
+
+def _alvo_converter_planilha(df_saida, df_unificado, formato, funil, usuario_responsavel, **_):
+    arquivos = converter_planilha(df_unificado, funil, usuario_responsavel)
+    return [(trocar_extensao(nome, formato), serializar(df, formato)) for nome, df in arquivos.items()]
+
+def _alvo_extrator_numero(df_saida, df_unificado, formato, **_):
+    dfs = montar_contatos(df_unificado)
+    if not dfs:
+        raise HTTPException(status_code=400, detail="Nenhum número encontrado na planilha unificada.")
+    return [(trocar_extensao(nome, formato), serializar(df, formato, aba="Contatos")) for nome, df in dfs]
+
+def _alvo_extrator_email(df_saida, df_unificado, formato, **_):
+    emails = listar_emails(df_unificado, "unificada")
+    return [(f"Emails.{formato}", serializar(pd.DataFrame({"email": emails}), formato, aba="Emails"))]
+
+
+ALVOS = {
+    "speedio_assertiva": _alvo_speedio_assertiva,
+    "salesforce": _alvo_salesforce,
+    "converter_planilha": _alvo_converter_planilha,
+    "extrator-numero": _alvo_extrator_numero,
+    "extrator-email": _alvo_extrator_email,
+}
+
+
+def processar_pipeline(content: bytes, filename: str, alvos: list, formato: str = "xlsx",
+                       funil: Optional[str] = None, usuario_responsavel: Optional[str] = None) -> bytes:
+    """Unifica o export Speedio uma vez e gera todos os alvos num único ZIP (executado no pool de processos)"""
+    with medir_etapa(ROTA, "parse"):
+        df = ler_arquivo(content, filename)
+    registrar_linhas(ROTA, len(df))
+    with medir_etapa(ROTA, "transform"):
+        df_saida = transformar_speedio_assertiva(df)
+        df_unificado = como_planilha_lida(df_saida)
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for alvo in alvos:
+            with medir_etapa(ROTA, alvo):
+                try:
+                    arquivos = ALVOS[alvo](df_saida, df_unificado, formato,
+                                           funil=funil, usuario_responsavel=usuario_responsavel)
+                except HTTPException as e:
+                    raise HTTPException(status_code=e.status_code, detail=f"{alvo}: {e.detail}")
+                for nome, conteudo in arquivos:
+                    zipf.writestr(f"{alvo}/{nome}", conteudo)
+    return zip_buffer.getvalue()
+
+
+def validar_alvos(alvos: list, funil: Optional[str], usuario_responsavel: Optional[str]) -> list:
+    """Alvos sem repetição, na ordem pedida (campo repetido ou separado por vírgula)"""
+    alvos = list(dict.fromkeys(a.strip() for item in alvos for a in item.split(",") if a.strip()))
+    invalidos = [a for a in alvos if a not in ALVOS]
+    if not alvos or invalidos:
+        motivo = f"Alvos inválidos: {', '.join(invalidos)}" if invalidos else "Informe ao menos um alvo"
+        raise HTTPException(status_code=400, detail=f"{motivo}. Use: {', '.join(ALVOS)}")
+    if "converter_planilha" in alvos and not (funil and usuario_responsavel):
+        raise HTTPException(status_code=400, detail="converter_planilha exige os campos funil e usuario_responsavel.")
+    return alvos
+
+
+@router.post("/pipeline")
+async def pipeline(
+    file: UploadFile = File(...),
+    alvos: List[str] = Form(...),
+    funil: Optional[str] = Form(None),
+    usuario_responsavel: Optional[str] = Form(None),
+    formato: Optional[str] = Form(None),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Recebe o export bruto do Speedio e a lista de alvos (campo `alvos`
+    repetido ou separado por vírgula) e devolve um ZIP com uma pasta por alvo.
+    """
+    filename = file.filename.lower()
+    if not filename.endswith((".xlsx", ".xls", ".csv")):
+        raise HTTPException(status_code=400, detail="Formato de arquivo não suportado. Use .xlsx, .xls ou .csv")
+
+    alvos = validar_alvos(alvos, funil, usuario_responsavel)
+    formato = escolher_formato(formato, accept)
+
+    content = await file.read()
+    zip_bytes = await executar_no_pool(
+        processar_pipeline, content, filename, alvos, formato, funil, usuario_responsavel
+    )
+    return resposta_arquivo(zip_bytes, "pipeline.zip", "application/zip")
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from fastapi import HTTPException
+
+from backend.observabilidade import coletar_metricas, registrar_coleta, PROCESS_POOL_RESTARTS
+from backend.perfil import perfil_da_requisicao, medir_perfil, registrar_medicao
+
+# ------------------ CONFIGURAÇÕES ------------------
+# Quantidade de processos que executam as conversões (pandas/xlsx).
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+# Recicla o processo após N tarefas para devolver memória ao SO (0 = nunca).
+PROCESS_POOL_MAX_TASKS = int(os.getenv("PROCESS_POOL_MAX_TASKS", "0"))
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "spawn")
+
+_executor: ProcessPoolExecutor | None = None
+_max_workers: int | None = None
+
+
+class ErroProcessamento(Exception):
+    """HTTPException serializável entre processos"""
+
+    def __init__(self, status_code: int, detail, coleta: list | None = None):
+        super().__init__(status_code, detail, coleta)
+        self.status_code = status_code
+        self.detail = detail
+        self.coleta = coleta or []
+
+
+def _executar(func, *args, **kwargs):
+    # Roda no processo filho: HTTPException não sobrevive ao pickle de volta e
+    # as métricas precisam ser devolvidas ao processo que expõe /metrics
+    with coletar_metricas([]) as coleta:
+        try:
+            return func(*args, **kwargs), coleta
+        except HTTPException as e:
+            raise ErroProcessamento(e.status_code, e.detail, coleta) from None
+        except Exception as e:
+            # Erros do pandas/openpyxl seguem com o tipo original; a coleta vai
+            # junto (atributos da exceção sobrevivem ao pickle) para não perder
+            # as etapas e erros justamente das conversões que falharam
+            e.coleta = coleta
+            raise
+
+
+def _executar_com_perfil(memoria, func, *args, **kwargs):
+    # Perfil de CPU e memória no próprio processo filho, onde a conversão roda
+    with medir_perfil({}, memoria) as medicao:
+        resultado, coleta = _executar(func, *args, **kwargs)
+    return resultado, coleta, medicao
+
+
+def iniciar_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Cria o pool de processos usado pelas conversões (chamado no lifespan do app)"""
+    global _executor, _max_workers
+    if _executor is None:
+        _max_workers = max_workers or PROCESS_POOL_WORKERS
+        _executor = ProcessPoolExecutor(
+            max_workers=_max_workers,
+            mp_context=multiprocessing.get_context(PROCESS_POOL_START_METHOD),
+            max_tasks_per_child=PROCESS_POOL_MAX_TASKS or None,
+        )
+    return _executor
+
+
+def encerrar_pool():
+    """Finaliza o pool, aguardando as conversões em andamento"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _recriar_pool(quebrado: ProcessPoolExecutor):
+    """
+    Troca um pool quebrado (processo filho morto, ex.: OOM killer) por um novo.
+    Várias requisições falham juntas com o mesmo pool; só a primeira recria.
+    """
+    global _executor
+    if _executor is not quebrado:
+        return
+    quebrado.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    iniciar_pool(_max_workers)
+    PROCESS_POOL_RESTARTS.inc()
+
+
+async def executar_no_pool(func, *args, **kwargs):
+    """
+    Executa `func` fora do event loop.
+
+    As funções enviadas recebem e devolvem apenas bytes/tipos simples (o conteúdo
+    do upload e o arquivo gerado), evitando serializar DataFrames entre processos.
+    Sem pool iniciado (ex.: scripts e testes sem lifespan), usa uma thread.
+    Se um processo do pool morrer, o pool é recriado e a requisição recebe 503.
+    """
+    loop = asyncio.get_running_loop()
+    perfil = perfil_da_requisicao()
+    executor = _executor
+    try:
+        if perfil is None:
+            resultado, coleta = await loop.run_in_executor(executor, partial(_executar, func, *args, **kwargs))
+        else:
+            resultado, coleta, medicao = await loop.run_in_executor(
+                executor, partial(_executar_com_perfil, perfil["memoria"], func, *args, **kwargs)
+            )
+            registrar_medicao(perfil, medicao, coleta)
+    except ErroProcessamento as e:
+        registrar_coleta(e.coleta)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except BrokenProcessPool:
+        _recriar_pool(executor)
+        raise HTTPException(
+            status_code=503,
+            detail="O processo de conversão foi interrompido (memória insuficiente?). Tente novamente.",
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        registrar_coleta(getattr(e, "coleta", []))
+        raise
+    registrar_coleta(coleta)
+    return resultado
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import TEXTO_ARROW
+
+pd = importar_tardio("pandas")
+np = importar_tardio("numpy")
+pa = importar_tardio("pyarrow")
+pc = importar_tardio("pyarrow.compute")
+
+# ------------------ PADRÕES ------------------
+# Aplicados a cada parte da célula (separada por vírgula, já em minúsculas), como
+# o search por parte que o converter fazia. Rodam no RE2 do Arrow; extrair grupos
+# é a parte cara, então o segundo padrão só vê as partes sem link de rede social.
+PADRAO_REDE = r"(?P<rede>facebook|instagram|linkedin)\.com/(?P<caminho>[^\s,]+)"
+PADRAO_OUTROS = r"^\s*(?:@(?P<arroba>[\w.]+)|(?P<site>[^\s@]+\.[^\s]+))"
+
+COLUNAS_LINKS = ["facebook", "instagram", "linkedin", "site"]
+
+
+def _arrow(serie: pd.Series):
+    arr = pa.array(serie.astype(TEXTO_ARROW).array)
+    return arr.combine_chunks() if isinstance(arr, pa.ChunkedArray) else arr
+
+
+def _juntar(*partes):
+    """Concatena arrays e textos fixos do Arrow elemento a elemento"""
+    tipo = next(parte.type for parte in partes if not isinstance(parte, str))
+    return pc.binary_join_element_wise(*(pa.scalar(p, tipo) if isinstance(p, str) else p for p in partes), pa.scalar("", tipo))
+
+
+def _com_esquema(links):
+    """Prefixa http:// nos links preenchidos que vieram sem esquema (www.empresa.com.br)"""
+    sem_esquema = pc.and_(pc.not_equal(links, ""), pc.invert(pc.match_substring_regex(links, r"^https?://")))
+    return pc.if_else(sem_esquema, _juntar("http://", links), links)
+
+
+def _espalhar(total: int, posicoes, valores):
+    """Devolve `valores` (de um subconjunto) nas `posicoes` de um array de tamanho `total`; '' no resto"""
+    indice = np.full(total, -1, dtype=np.int64)
+    indice[posicoes] = np.arange(len(posicoes))
+    return pc.take(valores, pa.array(indice, mask=indice < 0)).fill_null("")
+
+
+def _primeiro_por_linha(total: int, linhas, valores, filtro):
+    """Para cada linha, o primeiro valor (na ordem da célula) que passa no filtro; '' se nenhum"""
+    posicoes = np.flatnonzero(filtro)
+    unicas, primeiras = np.unique(linhas[posicoes], return_index=True)
+    indice = np.full(total, -1, dtype=np.int64)
+    indice[unicas] = posicoes[primeiras]
+    return pc.take(valores, pa.array(indice, mask=indice < 0)).fill_null("")
+
+
+def extrair_links(redes: pd.Series, site: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Facebook, Instagram (link ou @perfil), LinkedIn e site de uma coluna
+    "Rede Social" inteira numa só passada de regex, no formato
+    'http://facebook.com/perfil'. O site vem da coluna `site` quando
+    preenchida; senão, do primeiro link que não é de rede social.
+    Alinhado ao índice de `redes`, com '' onde não há link.
+    """
+    partes = pc.split_pattern(_arrow(redes), ",")
+    linhas = pc.list_parent_indices(partes).to_numpy()
+    texto_partes = pc.utf8_lower(pc.list_flatten(partes))
+
+    achados = pc.extract_regex(texto_partes, PADRAO_REDE)
+    rede, caminho = achados.field("rede").fill_null(""), achados.field("caminho").fill_null("")
+    sem_rede = np.flatnonzero(pc.is_null(achados).to_numpy(zero_copy_only=False))
+    outros = pc.extract_regex(pc.take(texto_partes, sem_rede), PADRAO_OUTROS)
+    arroba, site_parte = (_espalhar(len(texto_partes), sem_rede, outros.field(nome)) for nome in ("arroba", "site"))
+
+    link_rede = _juntar("http://", rede, ".com/", caminho)
+    link_arroba = _juntar("http://instagram.com/", arroba)
+    eh = {nome: pc.equal(rede, nome).to_numpy(zero_copy_only=False) for nome in ("facebook", "instagram", "linkedin")}
+    tem_arroba = pc.not_equal(arroba, "").to_numpy(zero_copy_only=False)
+    tem_site = pc.not_equal(site_parte, "").to_numpy(zero_copy_only=False)
+
+    total = len(redes)
+    links = {
+        "facebook": _primeiro_por_linha(total, linhas, link_rede, eh["facebook"]),
+        "instagram": _primeiro_por_linha(
+            total, linhas, pc.if_else(eh["instagram"], link_rede, link_arroba), eh["instagram"] | tem_arroba,
+        ),
+        "linkedin": _primeiro_por_linha(total, linhas, link_rede, eh["linkedin"]),
+        "site": _com_esquema(_primeiro_por_linha(total, linhas, site_parte, tem_site)),
+    }
+    if site is not None:
+        proprio = _com_esquema(pc.utf8_lower(pc.utf8_trim_whitespace(_arrow(site).fill_null(""))))
+        links["site"] = pc.if_else(pc.not_equal(proprio, ""), proprio, links["site"].cast(proprio.type))
+    return pd.DataFrame({coluna: pd.Series(valores, dtype=TEXTO_ARROW, index=redes.index) for coluna, valores in links.items()})
@@ -0,0 +1,96 @@
+import logging
+
+from fpdf import FPDF
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ CLASSE PDF ------------------
+class PDF(FPDF):
+    def header(self):
+        self.set_fill_color(220, 220, 220)
+        self.set_font("Arial", "B", 10)
+        self.set_text_color(40, 40, 40)
+        self.cell(0, 7, "Central Dibai Sales - Relatório de Transcrições", 0, 1, "C", fill=True)
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Arial", "I", 8)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 10, f"Página {self.page_no()}/{{nb}}", 0, 0, "C")
+
+    def write_long_transcription_block(self, call_id: str, atendente: str, link: str, transcricao: str):
+        logger.debug("Adicionando transcrição longa ao PDF", extra={"call_id": call_id})
+        self.set_font("Arial", "B", 14)
+        self.set_text_color(20, 20, 20)
+        self.cell(0, 8, f"ID: {call_id}", 0, 1, "L")
+        self.ln(1)
+
+        self.set_font("Arial", "I", 10)
+        self.set_text_color(80, 80, 80)
+        self.cell(0, 5, f"Atendente: {atendente}", 0, 1, "L")
+        self.multi_cell(0, 5, f"Link: {link}", 0, "L")
+        self.ln(5)
+
+        self.set_font("Arial", "", 10)
+        self.set_text_color(0, 0, 0)
+        self.multi_cell(0, 5, transcricao)
+        self.ln(10)
+
+    def _draw_summary_header(self, W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT):
+        self.set_font("Arial", "B", 10)
+        self.set_fill_color(240, 240, 240)
+        self.cell(W_ID, LINE_HEIGHT, "ID", 1, 0, "C", fill=True)
+        self.cell(W_ATENDENTE, LINE_HEIGHT, "ATENDENTE", 1, 0, "C", fill=True)
+        self.cell(W_STATUS, LINE_HEIGHT, "STATUS / RESUMO", 1, 1, "C", fill=True)
+        self.set_font("Arial", "", 9)
+        self.set_text_color(0, 0, 0)
+
+    def write_summary_block(self, curtas: list[dict]):
+        logger.debug("Adicionando resumo de chamadas curtas/falhas ao PDF")
+        self.add_page()
+        self.set_font("Arial", "B", 18)
+        self.set_text_color(200, 40, 40)
+        self.cell(0, 10, "Resumo de Chamadas Curtas ou Falhas", 0, 1, "C")
+        self.ln(10)
+
+        W_ID = 35
+        W_ATENDENTE = 40
+        W_STATUS = 125
+        LINE_HEIGHT = 6
+
+        self.set_fill_color(240, 240, 240)
+        self._draw_summary_header(W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT)
+
+        PB_TRIGGER = self.page_break_trigger
+        MIN_ROW_HEIGHT = LINE_HEIGHT * 3
+
+        for item in curtas:
+            status_text = item["STATUS"]
+            if self.get_y() + MIN_ROW_HEIGHT > PB_TRIGGER:
+                self.add_page()
+                self._draw_summary_header(W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT)
+
+            start_y = self.get_y()
+            start_x = self.get_x()
+
+            self.set_xy(start_x + W_ID + W_ATENDENTE, start_y)
+            self.multi_cell(W_STATUS, LINE_HEIGHT, status_text, 0, "L")
+            end_y = self.get_y()
+            final_height = max(LINE_HEIGHT, end_y - start_y)
+            v_offset = (final_height - LINE_HEIGHT) / 2
+
+            self.set_xy(start_x, start_y)
+            self.cell(W_ID, final_height, "", 1, 0)
+            self.set_xy(start_x, start_y + v_offset)
+            self.cell(W_ID, LINE_HEIGHT, item["ID"], 0, 0, "C")
+
+            self.set_xy(start_x + W_ID, start_y)
+            self.cell(W_ATENDENTE, final_height, "", 1, 0)
+            self.set_xy(start_x + W_ID, start_y + v_offset)
+            self.cell(W_ATENDENTE, LINE_HEIGHT, item["ATENDENTE"], 0, 0, "C")
+
+            self.set_xy(start_x + W_ID + W_ATENDENTE, start_y)
+            self.cell(W_STATUS, final_height, "", 1, 1, "L")
+            self.set_y(end_y)
@@ -1,65 +1,62 @@
+from __future__ import annotations
+
 import io
-import pandas as pd
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from starlette.responses import StreamingResponse
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+from backend.processamento import executar_no_pool
+from backend.formatos import FORMATOS, escolher_formato, serializar, resposta_arquivo
+from backend.indice_leads import filtrar_delta, registrar_delta, headers_delta
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import TEXTO_ARROW, compactar
+from backend.redes_sociais import extrair_links
+
+pd = importar_tardio("pandas")
+openpyxl = importar_tardio("openpyxl")
 
 router = APIRouter()
 
-def extrair_facebook(valor):
-    if isinstance(valor, str) and "facebook.com" in valor:
-        return valor
-    return ""
+COLUNAS_SALESFORCE = [
+    "Company", "LastName", "MobilePhone", "Email", "Website", "Documento__c",
+    "Faturamento_Mensal_N_mero_Exato__c", "Canal_Origem__c", "Segmento__c",
+    "Facebook__c", "Instagram__c", "Biblioteca_de_An_ncios__c", "LinkedIn__c",
+    "Observa_es_fixadas__c", "Quantidade_de_an_ncios__c", "Email_do_Investidor_que_Indicou__c",
+    "Contato_1_Nome__c", "Contato_1_Cargo__c", "Contato_1_Telefone__c",
+    "Contato_1_Telefone_2__c", "Contato_1_Telefone_3__c",
+    "Contato_2_Nome__c", "Contato_2_Cargo__c", "Contato_2_Telefone__c",
+    "Contato_2_Telefone_2__c", "Contato_2_Telefone_3__c",
+    "Contato_3_Nome__c", "Contato_3_Cargo__c", "Contato_3_Telefone__c",
+    "Contato_3_Telefone_2__c", "Contato_3_Telefone_3__c",
+    "Contato_4_Nome__c", "Contato_4_Cargo__c", "Contato_4_Telefone__c",
+    "Contato_4_Telefone_2__c", "Contato_4_Telefone_3__c",
+]
 
-def extrair_instagram(valor):
-    if isinstance(valor, str) and ("instagram.com" in valor or "@") and "facebook.com" not in valor:
-        return valor
-    return ""
+MAPEAMENTO_CORES = {
+    "SOCIO1Celular1": "Contato_1_Telefone__c",
+    "SOCIO1Celular2": "Contato_1_Telefone_2__c",
+    "SOCIO2Celular1": "Contato_2_Telefone__c",
+    "SOCIO2Celular2": "Contato_2_Telefone_2__c",
+    "SOCIO3Celular1": "Contato_3_Telefone__c",
+    "SOCIO3Celular2": "Contato_3_Telefone_2__c",
+}
 
-@router.post("/salesforce")
-async def converter_planilha_salesforce(
-    file: UploadFile = File(...),
-):
-    filename_lower = file.filename.lower()
-    if not filename_lower.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Formato não suportado. Use .xlsx ou .xls.")
 
-    conteudo = await file.read()
-    buffer = io.BytesIO(conteudo)
-    
-    try:
-        df = pd.read_excel(buffer, dtype=str)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erro ao ler planilha: {str(e)}")
-
-    columns = [
-        "Company", "LastName", "MobilePhone", "Email", "Website", "Documento__c",
-        "Faturamento_Mensal_N_mero_Exato__c", "Canal_Origem__c", "Segmento__c",
-        "Facebook__c", "Instagram__c", "Biblioteca_de_An_ncios__c", "LinkedIn__c",
-        "Observa_es_fixadas__c", "Quantidade_de_an_ncios__c", "Email_do_Investidor_que_Indicou__c",
-        "Contato_1_Nome__c", "Contato_1_Cargo__c", "Contato_1_Telefone__c",
-        "Contato_1_Telefone_2__c", "Contato_1_Telefone_3__c",
-        "Contato_2_Nome__c", "Contato_2_Cargo__c", "Contato_2_Telefone__c",
-        "Contato_2_Telefone_2__c", "Contato_2_Telefone_3__c",
-        "Contato_3_Nome__c", "Contato_3_Cargo__c", "Contato_3_Telefone__c",
-        "Contato_3_Telefone_2__c", "Contato_3_Telefone_3__c",
-        "Contato_4_Nome__c", "Contato_4_Cargo__c", "Contato_4_Telefone__c",
-        "Contato_4_Telefone_2__c", "Contato_4_Telefone_3__c",
-    ]
-
-    new_df = pd.DataFrame(columns=columns)
+def transformar_salesforce(df: pd.DataFrame) -> pd.DataFrame:
+    new_df = pd.DataFrame(columns=COLUNAS_SALESFORCE)
+    links = extrair_links(df.get("Rede Social", pd.Series(index=df.index, dtype=object)), df.get("Site"))
+    # LinkedIn do sócio; sem ele, o da empresa que veio em "Rede Social"
+    linkedin_socio = df.get("SOCIO1Linkedin", pd.Series(index=df.index, dtype=object)).astype(TEXTO_ARROW).fillna("")
 
     new_df["Company"] = df.get("Nome do Lead", "")
     new_df["LastName"] = df.get("SOCIO1Nome", "")
     new_df["MobilePhone"] = df.get("SOCIO1Celular1", "")
     new_df["Email"] = df.get("E-mails Válidos de Decisores", "")
-    new_df["Website"] = df.get("Site", "")
+    new_df["Website"] = links["site"]
     new_df["Documento__c"] = df.get("CNPJ", "")
     new_df["Observa_es_fixadas__c"] = df.get("Observação", "")
-    new_df["Facebook__c"] = df.get("Rede Social", "").apply(extrair_facebook)
-    new_df["Instagram__c"] = df.get("Rede Social", "").apply(extrair_instagram)
-    new_df["LinkedIn__c"] = df.get("SOCIO1Linkedin", "")
+    new_df["Facebook__c"] = links["facebook"]
+    new_df["Instagram__c"] = links["instagram"]
+    new_df["LinkedIn__c"] = linkedin_socio.where(linkedin_socio.str.strip() != "", links["linkedin"])
     new_df["Contato_1_Nome__c"] = df.get("SOCIO1Nome", "")
     new_df["Contato_1_Telefone__c"] = df.get("SOCIO1Celular1", "")
     new_df["Contato_1_Telefone_2__c"] = df.get("SOCIO1Celular2", "")
@@ -69,45 +66,86 @@ async def converter_planilha_salesforce(
     new_df["Contato_3_Nome__c"] = df.get("SOCIO3Nome", "")
     new_df["Contato_3_Telefone__c"] = df.get("SOCIO3Celular1", "")
     new_df["Contato_3_Telefone_2__c"] = df.get("SOCIO3Celular2", "")
+    return new_df
+
 
+def gerar_xlsx_com_cores(conteudo_original: bytes, new_df: pd.DataFrame) -> bytes:
+    """Gera o xlsx final copiando o preenchimento das células de celular da planilha original"""
     excel_buffer = io.BytesIO()
     new_df.to_excel(excel_buffer, index=False)
     excel_buffer.seek(0)
 
-    wb_original = load_workbook(buffer)
+    wb_original = openpyxl.load_workbook(io.BytesIO(conteudo_original))
     ws_original = wb_original.active
-    wb_novo = load_workbook(excel_buffer)
+    wb_novo = openpyxl.load_workbook(excel_buffer)
     ws_novo = wb_novo.active
 
-    mapeamento_cores = {
-        "SOCIO1Celular1": "Contato_1_Telefone__c",
-        "SOCIO1Celular2": "Contato_1_Telefone_2__c",
-        "SOCIO2Celular1": "Contato_2_Telefone__c",
-        "SOCIO2Celular2": "Contato_2_Telefone_2__c",
-        "SOCIO3Celular1": "Contato_3_Telefone__c",
-        "SOCIO3Celular2": "Contato_3_Telefone_2__c",
-    }
-
     colunas_originais = {cell.value: idx+1 for idx, cell in enumerate(ws_original[1])}
     colunas_novas = {cell.value: idx+1 for idx, cell in enumerate(ws_novo[1])}
 
-    for col_orig, col_novo in mapeamento_cores.items():
+    for col_orig, col_novo in MAPEAMENTO_CORES.items():
         if col_orig not in colunas_originais or col_novo not in colunas_novas:
             continue
         idx_orig = colunas_originais[col_orig]
         idx_novo = colunas_novas[col_novo]
-        for i in range(2, ws_original.max_row + 1):
-            cor = ws_original.cell(row=i, column=idx_orig).fill.start_color.rgb
+        # O índice do new_df guarda a posição da linha na planilha original (no modo delta há linhas a menos)
+        for i, posicao in enumerate(new_df.index, start=2):
+            cor = ws_original.cell(row=posicao + 2, column=idx_orig).fill.start_color.rgb
             if cor and cor != "00000000":
-                ws_novo.cell(row=i, column=idx_novo).fill = PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+                ws_novo.cell(row=i, column=idx_novo).fill = openpyxl.styles.PatternFill(start_color=cor, end_color=cor, fill_type="solid")
 
     # Salva XLSX final em memória
     final_buffer = io.BytesIO()
     wb_novo.save(final_buffer)
-    final_buffer.seek(0)
+    return final_buffer.getvalue()
+
+
+def processar_salesforce(conteudo: bytes, formato: str = "xlsx", delta: bool = False) -> tuple:
+    """
+    Leitura, conversão e geração da saída (executado no pool de processos).
+    Devolve (bytes do arquivo, contagens do modo delta ou None).
+    """
+    rota = "/api/salesforce"
+    try:
+        with medir_etapa(rota, "parse"):
+            df = compactar(pd.read_excel(io.BytesIO(conteudo), dtype=str))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erro ao ler planilha: {str(e)}")
+    registrar_linhas(rota, len(df))
+    estatisticas = None
+    if delta:
+        with medir_etapa(rota, "delta"):
+            df, pendentes, estatisticas = filtrar_delta(df, "salesforce")
+
+    with medir_etapa(rota, "transform"):
+        new_df = transformar_salesforce(df)
+    with medir_etapa(rota, "serialize"):
+        # As cores dos celulares só existem no xlsx; os demais formatos pulam o openpyxl
+        if formato != "xlsx":
+            saida = serializar(new_df, formato)
+        else:
+            saida = gerar_xlsx_com_cores(conteudo, new_df)
+    if delta:
+        registrar_delta("salesforce", pendentes)
+    return saida, estatisticas
+
+
+@router.post("/salesforce")
+async def converter_planilha_salesforce(
+    file: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    delta: bool = Form(False),
+    accept: Optional[str] = Header(None),
+):
+    filename_lower = file.filename.lower()
+    if not filename_lower.endswith(('.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use .xlsx ou .xls.")
+    formato = escolher_formato(formato, accept)
+
+    conteudo = await file.read()
+    final_bytes, estatisticas = await executar_no_pool(processar_salesforce, conteudo, formato, delta)
 
-    return StreamingResponse(
-        final_buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=Salesforce.xlsx"}
-    )
+    resposta = resposta_arquivo(final_bytes, f"Salesforce.{formato}", FORMATOS[formato])
+    if estatisticas:
+        resposta.headers.update(headers_delta(estatisticas))
+    return resposta
@@ -1,11 +1,33 @@
+from __future__ import annotations
+
 import io
+import os
+import asyncio
 import re
 from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+
+from backend.processamento import executar_no_pool
+from backend.formatos import FORMATOS, escolher_formato, serializar, resposta_arquivo
+from backend.observabilidade import medir_etapa, registrar_linhas
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import compactar, para_arrow, de_arrow
+from backend.telefones import normalizar_telefones
 
-import numpy as np
-import pandas as pd
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from starlette.responses import StreamingResponse
+np = importar_tardio("numpy")
+pd = importar_tardio("pandas")
+openpyxl = importar_tardio("openpyxl")
+xlsxwriter = importar_tardio("xlsxwriter")
+pa = importar_tardio("pyarrow")
+pq = importar_tardio("pyarrow.parquet")
+parsers = importar_tardio("pandas.io.parsers")
+
+# Linhas por bloco no modo streaming
+LINHAS_POR_BLOCO = int(os.getenv("SPEEDIO_LINHAS_POR_BLOCO", "20000"))
+# Limite de linhas de uma planilha do Excel
+LIMITE_LINHAS_XLSX = 1_048_576
 
 router = APIRouter()
 
@@ -53,14 +75,9 @@ def calcular_idade_empresa(data_abertura):
     except Exception:
         return None
 
-def formatar_telefone(valor):
-    if pd.isna(valor):
-        return None
-    s = str(valor).strip()
-    if s.endswith('.0'):
-        s = s[:-2]
-    s_limpo = re.sub(r'\D', '', s)
-    return s_limpo if s_limpo else None
+def formatar_telefones(valores: pd.Series) -> pd.Series:
+    """Coluna de telefones no formato da planilha unificada: DDD + número, só dígitos"""
+    return normalizar_telefones(valores)['nacional']
 
 # --- Colunas de saída ---
 COLUNAS_SAIDA = [
@@ -78,94 +95,377 @@ for i in range(1, 4):
         ' ' * i
     ]
 
-@router.post("/speedio_assertiva")
-async def speedio_assertiva(file: UploadFile = File(...)):
+# --- Cabeçalhos secundários ---
+SECOND_HEADER_LABELS = COLUNAS_SAIDA.copy()
+for idx, col in enumerate(SECOND_HEADER_LABELS):
+    if 'Nome do Lead' in col:
+        SECOND_HEADER_LABELS[idx] = 'Razão Social'
+    elif 'Nome Fantasia' in col:
+        SECOND_HEADER_LABELS[idx] = 'Nome Fantasia'
+    elif 'Telefones' in col:
+        SECOND_HEADER_LABELS[idx] = 'Telefones Válidos'
+    elif 'E-mails Válidos de Decisores' in col:
+        SECOND_HEADER_LABELS[idx] = 'Todos E-mails'
+
+
+def ler_arquivo(content: bytes, filename: str) -> pd.DataFrame:
+    # --- Lê Excel ou CSV corretamente ---
+    if filename.endswith(".xlsx") or filename.endswith(".xls"):
+        df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
+    elif filename.endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(content))
+    else:
+        raise HTTPException(status_code=400, detail="Formato de arquivo não suportado. Use .xlsx, .xls ou .csv")
+
+    df.columns = df.columns.str.strip()
+    return compactar(df)
+
+
+def transformar_speedio_assertiva(df: pd.DataFrame) -> pd.DataFrame:
+    # --- Inicializa DataFrame de saída ---
+    df_saida = pd.DataFrame(columns=COLUNAS_SAIDA)
+
+    # --- Mapeamento de colunas principais ---
+    df_saida['CNPJ'] = df.get('CNPJ').astype(str).str.strip() if 'CNPJ' in df.columns else ''
+    df_saida['Nome do Lead'] = df.get('Razao', '')
+    df_saida['Nome Fantasia'] = df.get('Fantasia', '')
+    df_saida['Estado'] = df.get('UF', '')
+    df_saida['Cidade'] = df.get('Cidade', '')
+    df_saida['Logradouro'] = df.get('Logradouro', '')
+    df_saida['Número'] = df.get('Numero', '')
+    df_saida['Bairro'] = df.get('Bairro', '')
+    df_saida['Complemento'] = df.get('Complemento', '')
+    df_saida['CEP'] = df.get('CEP', '')
+    df_saida['Data de Abertura'] = pd.to_datetime(df.get('DataAbertura'), errors='coerce', dayfirst=True).dt.strftime('%d/%m/%Y')
+    df_saida['Mercado'] = df.get('CNAEDescricao', '').astype(str).replace('False', '').replace('nan', '')
+    df_saida['Faixa de Funcionários da Empresa'] = df.get('QtdeFuncionarios').apply(converter_para_faixa_funcionarios) if 'QtdeFuncionarios' in df.columns else ''
+    df_saida['Idade da Empresa'] = df.get('DataAbertura').apply(calcular_idade_empresa) if 'DataAbertura' in df.columns else ''
+
+    # --- Telefones ---
+    cols_telefones = [col for col in df.columns if re.match(r'Telefone\d+', col)]
+    if cols_telefones:
+        # Junta os preenchidos de cada linha na ordem das colunas, uma coluna inteira por vez
+        juntos = None
+        for col in cols_telefones:
+            telefones = formatar_telefones(df[col])
+            juntos = telefones if juntos is None else (juntos + ', ' + telefones).fillna(juntos).fillna(telefones)
+        df_saida['Telefones'] = juntos
+
+    # --- Emails ---
+    cols_emails = [col for col in df.columns if re.match(r'Email\d+', col)]
+    if cols_emails:
+        emails = df[cols_emails].astype(str).replace('nan', '', regex=True)
+        df_saida['E-mails Válidos de Decisores'] = emails.apply(
+            lambda row: ', '.join(row.str.strip().replace('', np.nan).dropna()), axis=1
+        )
+        df_saida['E-mails Válidos de Decisores'] = df_saida['E-mails Válidos de Decisores'].replace('', np.nan)
+
+    # --- Sócios ---
+    for i in range(1, 4):
+        df_saida[f'SOCIO{i}Nome'] = df.get(f'SOCIO{i}Nome', np.nan)
+        for j in [1, 2]:
+            df_saida[f'SOCIO{i}Email{j}'] = df.get(f'SOCIO{i}Email{j}', np.nan) if f'SOCIO{i}Email{j}' in df.columns else np.nan
+            df_saida[f'SOCIO{i}Celular{j}'] = formatar_telefones(df[f'SOCIO{i}Celular{j}']) if f'SOCIO{i}Celular{j}' in df.columns else np.nan
+        df_saida[f'SOCIO{i}Linkedin'] = np.nan
+        df_saida[' ' * i] = np.nan
+
+    return df_saida
+
+
+def gerar_xlsx(df_saida: pd.DataFrame) -> bytes:
+    # --- Geração do Excel ---
+    buffer_saida = io.BytesIO()
+    with pd.ExcelWriter(buffer_saida, engine='xlsxwriter') as writer:
+        df_saida.to_excel(writer, sheet_name='Sheet1', index=False, header=False, startrow=2)
+        worksheet = writer.sheets['Sheet1']
+        worksheet.write_row(0, 0, COLUNAS_SAIDA)
+        worksheet.write_row(1, 0, SECOND_HEADER_LABELS)
+    return buffer_saida.getvalue()
+
+
+# --- Modo streaming: blocos de linhas e memória limitada ---
+def _linhas_xlsx(content: bytes):
+    """Linhas da primeira aba sem carregar a planilha inteira (openpyxl read_only)"""
+    wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
     try:
-        content = await file.read()
-        filename = file.filename.lower()
-
-        # --- Lê Excel ou CSV corretamente ---
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
-        elif filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(content))
+        vazias = 0
+        for linha in wb.worksheets[0].iter_rows(values_only=True):
+            # Como o pandas, descarta só as linhas vazias do final da planilha
+            if all(valor is None for valor in linha):
+                vazias += 1
+                continue
+            for _ in range(vazias):
+                yield ()
+            vazias = 0
+            yield linha
+    finally:
+        wb.close()
+
+
+def _valor_celula(valor):
+    # Mesma conversão de célula do leitor openpyxl do pandas
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def ler_em_blocos(content: bytes, filename: str, linhas: Optional[int] = None):
+    """Gera DataFrames de até `linhas` (padrão LINHAS_POR_BLOCO) linhas com as mesmas colunas de ler_arquivo"""
+    linhas = linhas or LINHAS_POR_BLOCO
+    if filename.endswith(".csv"):
+        for bloco in pd.read_csv(io.BytesIO(content), chunksize=linhas):
+            bloco.columns = bloco.columns.str.strip()
+            yield compactar(bloco)
+    elif filename.endswith(".xlsx"):
+        iterador = _linhas_xlsx(content)
+        cabecalho = next(iterador, None)
+        if cabecalho is None:
+            return
+        colunas = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(cabecalho)]
+
+        def montar(lote):
+            # Mesma inferência de tipos e de vazios que o read_excel aplica às células
+            return compactar(parsers.TextParser(lote, names=colunas, header=None).read())
+
+        lote = []
+        for linha in iterador:
+            lote.append([_valor_celula(v) for v in linha[:len(colunas)]])
+            if len(lote) == linhas:
+                yield montar(lote)
+                lote = []
+        if lote:
+            yield montar(lote)
+    elif filename.endswith(".xls"):
+        # O .xls não tem leitura incremental: a planilha inteira iria para a memória
+        raise HTTPException(status_code=400, detail="O modo streaming não aceita .xls. Use .xlsx ou .csv, ou envie sem streaming.")
+    else:
+        raise HTTPException(status_code=400, detail="Formato de arquivo não suportado. Use .xlsx ou .csv")
+
+
+def _gravar_xlsx_em_blocos(blocos, destino):
+    # constant_memory: cada linha vai para um arquivo temporário assim que a próxima começa
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Sheet1")
+    worksheet.write_row(0, 0, COLUNAS_SAIDA)
+    worksheet.write_row(1, 0, SECOND_HEADER_LABELS)
+    linha = 2
+    for df_saida in blocos:
+        if linha + len(df_saida) > LIMITE_LINHAS_XLSX:
+            workbook.close()
+            raise HTTPException(status_code=400, detail="A saída passa do limite de linhas do Excel. Use formato=csv.")
+        valores = df_saida.astype(object).where(df_saida.notna(), None)
+        for registro in valores.itertuples(index=False, name=None):
+            worksheet.write_row(linha, 0, registro)
+            linha += 1
+    workbook.close()
+
+
+def _gravar_parquet_em_blocos(blocos, destino):
+    escritor = None
+    for df_saida in blocos:
+        # Tudo como texto para o schema ser o mesmo em todos os blocos
+        tabela = pa.Table.from_pandas(df_saida.astype("string"), preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(destino, tabela.schema)
+        escritor.write_table(tabela)
+    if escritor is None:
+        escritor = pq.ParquetWriter(destino, pa.schema([(col, pa.string()) for col in COLUNAS_SAIDA]))
+    escritor.close()
+
+
+def processar_speedio_streaming(content: bytes, filename: str, formato: str = "xlsx") -> bytes:
+    """
+    Lê, unifica e grava bloco a bloco, sem montar o DataFrame inteiro
+    (executado no pool de processos). A memória fica limitada ao tamanho do bloco.
+    """
+    rota = "/api/speedio_assertiva"
+    total = 0
+
+    def blocos_unificados():
+        nonlocal total
+        for bloco in ler_em_blocos(content, filename):
+            total += len(bloco)
+            yield transformar_speedio_assertiva(bloco)
+
+    destino = io.BytesIO()
+    with medir_etapa(rota, "streaming"):
+        if formato == "xlsx":
+            _gravar_xlsx_em_blocos(blocos_unificados(), destino)
+        elif formato == "parquet":
+            _gravar_parquet_em_blocos(blocos_unificados(), destino)
         else:
-            raise HTTPException(status_code=400, detail="Formato de arquivo não suportado. Use .xlsx, .xls ou .csv")
-
-        df.columns = df.columns.str.strip()
-
-        # --- Inicializa DataFrame de saída ---
-        df_saida = pd.DataFrame(columns=COLUNAS_SAIDA)
-
-        # --- Mapeamento de colunas principais ---
-        df_saida['CNPJ'] = df.get('CNPJ').astype(str).str.strip() if 'CNPJ' in df.columns else ''
-        df_saida['Nome do Lead'] = df.get('Razao', '')
-        df_saida['Nome Fantasia'] = df.get('Fantasia', '')
-        df_saida['Estado'] = df.get('UF', '')
-        df_saida['Cidade'] = df.get('Cidade', '')
-        df_saida['Logradouro'] = df.get('Logradouro', '')
-        df_saida['Número'] = df.get('Numero', '')
-        df_saida['Bairro'] = df.get('Bairro', '')
-        df_saida['Complemento'] = df.get('Complemento', '')
-        df_saida['CEP'] = df.get('CEP', '')
-        df_saida['Data de Abertura'] = pd.to_datetime(df.get('DataAbertura'), errors='coerce', dayfirst=True).dt.strftime('%d/%m/%Y')
-        df_saida['Mercado'] = df.get('CNAEDescricao', '').astype(str).replace('False', '').replace('nan', '')
-        df_saida['Faixa de Funcionários da Empresa'] = df.get('QtdeFuncionarios').apply(converter_para_faixa_funcionarios) if 'QtdeFuncionarios' in df.columns else ''
-        df_saida['Idade da Empresa'] = df.get('DataAbertura').apply(calcular_idade_empresa) if 'DataAbertura' in df.columns else ''
-
-        # --- Telefones ---
-        cols_telefones = [col for col in df.columns if re.match(r'Telefone\d+', col)]
-        if cols_telefones:
-            telefones_formatados = df[cols_telefones].applymap(formatar_telefone)
-            df_saida['Telefones'] = telefones_formatados.apply(lambda row: ', '.join(row.dropna().astype(str)), axis=1)
-            df_saida['Telefones'] = df_saida['Telefones'].replace('', np.nan)
-
-        # --- Emails ---
-        cols_emails = [col for col in df.columns if re.match(r'Email\d+', col)]
-        if cols_emails:
-            emails = df[cols_emails].astype(str).replace('nan', '', regex=True)
-            df_saida['E-mails Válidos de Decisores'] = emails.apply(
-                lambda row: ', '.join(row.str.strip().replace('', np.nan).dropna()), axis=1
-            )
-            df_saida['E-mails Válidos de Decisores'] = df_saida['E-mails Válidos de Decisores'].replace('', np.nan)
-
-        # --- Sócios ---
-        for i in range(1, 4):
-            df_saida[f'SOCIO{i}Nome'] = df.get(f'SOCIO{i}Nome', np.nan)
-            for j in [1, 2]:
-                df_saida[f'SOCIO{i}Email{j}'] = df.get(f'SOCIO{i}Email{j}', np.nan) if f'SOCIO{i}Email{j}' in df.columns else np.nan
-                df_saida[f'SOCIO{i}Celular{j}'] = df.get(f'SOCIO{i}Celular{j}').apply(formatar_telefone) if f'SOCIO{i}Celular{j}' in df.columns else np.nan
-            df_saida[f'SOCIO{i}Linkedin'] = np.nan
-            df_saida[' ' * i] = np.nan
-
-        # --- Cabeçalhos secundários ---
-        SECOND_HEADER_LABELS = COLUNAS_SAIDA.copy()
-        for idx, col in enumerate(SECOND_HEADER_LABELS):
-            if 'Nome do Lead' in col:
-                SECOND_HEADER_LABELS[idx] = 'Razão Social'
-            elif 'Nome Fantasia' in col:
-                SECOND_HEADER_LABELS[idx] = 'Nome Fantasia'
-            elif 'Telefones' in col:
-                SECOND_HEADER_LABELS[idx] = 'Telefones Válidos'
-            elif 'E-mails Válidos de Decisores' in col:
-                SECOND_HEADER_LABELS[idx] = 'Todos E-mails'
-
-        # --- Geração do Excel ---
-        buffer_saida = io.BytesIO()
-        with pd.ExcelWriter(buffer_saida, engine='xlsxwriter') as writer:
-            df_saida.to_excel(writer, sheet_name='Sheet1', index=False, header=False, startrow=2)
-            worksheet = writer.sheets['Sheet1']
-            for col_num, value in enumerate(COLUNAS_SAIDA):
-                worksheet.write(0, col_num, value)
-            for col_num, value in enumerate(SECOND_HEADER_LABELS):
-                worksheet.write(1, col_num, value)
-
-        buffer_saida.seek(0)
-        return StreamingResponse(
-            buffer_saida,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename=Speedio_Assertiva_Unificado.xlsx"},
-        )
+            primeiro = True
+            for df_saida in blocos_unificados():
+                if formato == "csv":
+                    destino.write(df_saida.to_csv(index=False, header=primeiro).encode("utf-8"))
+                else:
+                    destino.write(serializar(df_saida, formato))
+                primeiro = False
+            if primeiro and formato == "csv":
+                destino.write((",".join(COLUNAS_SAIDA) + "\n").encode("utf-8"))
+    registrar_linhas(rota, total)
+    return destino.getvalue()
+
+
+# --- Mesclagem de vários arquivos por CNPJ ---
+# Campos com listas: une os valores de todos os arquivos, sem repetir, na ordem de envio
+COLUNAS_LISTA = ['Telefones', 'E-mails Válidos de Decisores']
+# Cada bloco de sócio vem inteiro de um único arquivo, para não misturar dados de pessoas diferentes
+BLOCOS_SOCIOS = [
+    [f'SOCIO{i}Nome', f'SOCIO{i}Email1', f'SOCIO{i}Email2', f'SOCIO{i}Celular1', f'SOCIO{i}Celular2', f'SOCIO{i}Linkedin']
+    for i in range(1, 4)
+]
+
+
+# Contagens devolvidas nos headers da resposta
+HEADERS_MESCLAGEM = {
+    'arquivos': 'X-Mesclagem-Arquivos',
+    'linhas_lidas': 'X-Mesclagem-Linhas-Lidas',
+    'linhas_saida': 'X-Mesclagem-Linhas-Saida',
+    'duplicados': 'X-Mesclagem-Duplicados',
+    'cnpjs_mesclados': 'X-Mesclagem-Cnpjs-Mesclados',
+    'sem_cnpj': 'X-Mesclagem-Sem-Cnpj',
+}
+
+
+def normalizar_cnpj(series: pd.Series) -> pd.Series:
+    """Só dígitos, com os zeros à esquerda que o Excel remove; vazio vira NaN"""
+    digitos = series.astype(str).str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+    digitos = digitos.where(digitos.str.len().between(1, 14))
+    return digitos.str.zfill(14)
+
+
+def _vazio_como_nan(serie: pd.Series) -> pd.Series:
+    # Nas colunas category o '' é uma categoria: removê-la já deixa a célula vazia
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.remove_categories('') if '' in serie.cat.categories else serie
+    return serie.mask(serie == '')
+
+
+def mesclar_por_cnpj(dfs: list) -> tuple:
+    """
+    Junta as saídas de vários arquivos em uma linha por CNPJ. Precedência: o
+    primeiro arquivo enviado com valor preenchido vence nos campos simples;
+    Telefones e E-mails são unidos; blocos de sócio vêm do primeiro arquivo
+    que tem o nome do sócio. Linhas sem CNPJ válido são mantidas como estão.
+    """
+    df = pd.concat(dfs, ignore_index=True)
+    df = df.apply(_vazio_como_nan)
+    linhas_lidas = len(df)
+
+    cnpj = normalizar_cnpj(df['CNPJ'])
+    sem_cnpj = int(cnpj.isna().sum())
+    # Índice de hash: chave = CNPJ normalizado (ou a própria linha, quando não há CNPJ)
+    chave = cnpj.fillna(pd.Series('linha-' + df.index.astype(str), index=df.index))
+    codigos, _ = pd.factorize(chave)
+    grupos = df.groupby(codigos, sort=True)
+
+    blocos = [col for bloco in BLOCOS_SOCIOS for col in bloco]
+    simples = [col for col in COLUNAS_SAIDA if col not in COLUNAS_LISTA and col not in blocos]
+    mesclado = grupos[simples].first()
+    mesclado['CNPJ'] = cnpj.groupby(codigos).first().fillna(mesclado['CNPJ'])
+
+    for col in COLUNAS_LISTA:
+        partes = df[col].dropna().astype(str).str.split(',').explode().str.strip()
+        partes = partes[partes != '']
+        partes = pd.DataFrame({'grupo': codigos[partes.index], 'valor': partes}).drop_duplicates()
+        mesclado[col] = partes.groupby('grupo')['valor'].agg(', '.join)
+
+    for bloco in BLOCOS_SOCIOS:
+        com_socio = df[df[bloco[0]].notna()]
+        primeiro = com_socio[bloco].groupby(codigos[com_socio.index]).head(1)
+        primeiro.index = codigos[primeiro.index]
+        mesclado[bloco] = primeiro.reindex(mesclado.index)
+
+    tamanhos = grupos.size()
+    estatisticas = {
+        'arquivos': len(dfs),
+        'linhas_lidas': linhas_lidas,
+        'linhas_saida': len(mesclado),
+        'duplicados': linhas_lidas - len(mesclado),
+        'cnpjs_mesclados': int((tamanhos > 1).sum()),
+        'sem_cnpj': sem_cnpj,
+    }
+    return mesclado[COLUNAS_SAIDA].reset_index(drop=True), estatisticas
+
+
+def unificar_arquivo(content: bytes, filename: str) -> pd.DataFrame:
+    """Leitura e unificação de um arquivo do lote (executado no pool de processos)"""
+    rota = "/api/speedio_assertiva"
+    with medir_etapa(rota, "parse"):
+        df = ler_arquivo(content, filename)
+    registrar_linhas(rota, len(df))
+    with medir_etapa(rota, "transform"):
+        return transformar_speedio_assertiva(df)
+
+
+def serializar_saida(df_saida: pd.DataFrame, formato: str) -> bytes:
+    # O segundo cabeçalho só faz sentido na planilha; CSV/NDJSON/Parquet levam um cabeçalho único
+    return gerar_xlsx(df_saida) if formato == "xlsx" else serializar(df_saida, formato)
+
+
+def processar_speedio_assertiva(content: bytes, filename: str, formato: str = "xlsx") -> bytes:
+    """Leitura, unificação e geração da saída (executado no pool de processos)"""
+    df_saida = unificar_arquivo(content, filename)
+    with medir_etapa("/api/speedio_assertiva", "serialize"):
+        return serializar_saida(df_saida, formato)
+
+
+def unificar_arquivo_arrow(content: bytes, filename: str) -> bytes:
+    """unificar_arquivo de um arquivo do lote, devolvido em Arrow IPC (executado no pool de processos)"""
+    return para_arrow(unificar_arquivo(content, filename))
+
+
+def processar_lote(unificados: list, formato: str = "xlsx") -> tuple:
+    """
+    Mescla por CNPJ as saídas de unificar_arquivo_arrow (bytes Arrow IPC) e gera
+    a saída (executado no pool de processos).
+    """
+    rota = "/api/speedio_assertiva"
+    dfs = [de_arrow(dados) for dados in unificados]
+    with medir_etapa(rota, "merge"):
+        df_saida, estatisticas = mesclar_por_cnpj(dfs)
+    with medir_etapa(rota, "serialize"):
+        return serializar_saida(df_saida, formato), estatisticas
+
+
+@router.post("/speedio_assertiva")
+async def speedio_assertiva(
+    file: List[UploadFile] = File(...),
+    formato: Optional[str] = Form(None),
+    streaming: bool = Form(False),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Aceita um ou vários arquivos (campo `file` repetido). Com vários, cada um
+    é lido em paralelo no pool e as linhas são mescladas por CNPJ; as contagens
+    vão nos headers X-Mesclagem-*. Com `streaming=true` (um arquivo só), a
+    conversão é feita em blocos de linhas, com memória limitada.
+    """
+    formato = escolher_formato(formato, accept)
+    if streaming and len(file) > 1:
+        raise HTTPException(status_code=400, detail="O modo streaming aceita um arquivo por vez.")
+    try:
+        nome_saida = f"Speedio_Assertiva_Unificado.{formato}"
+        if len(file) == 1:
+            content = await file[0].read()
+            processar = processar_speedio_streaming if streaming else processar_speedio_assertiva
+            saida = await executar_no_pool(processar, content, file[0].filename.lower(), formato)
+            return resposta_arquivo(saida, nome_saida, FORMATOS[formato])
+
+        conteudos = [(await f.read(), f.filename.lower()) for f in file]
+        # Cada arquivo numa tarefa; entre os processos só trafegam bytes (upload, Arrow IPC e resultado)
+        unificados = await asyncio.gather(*(executar_no_pool(unificar_arquivo_arrow, c, nome) for c, nome in conteudos))
+        saida, estatisticas = await executar_no_pool(processar_lote, list(unificados), formato)
+
+        resposta = resposta_arquivo(saida, nome_saida, FORMATOS[formato])
+        for nome, valor in estatisticas.items():
+            resposta.headers[HEADERS_MESCLAGEM[nome]] = str(valor)
+        return resposta
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {type(e).__name__}: {str(e)}")
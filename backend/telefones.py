@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from backend.importacao import importar_tardio
+from backend.tipos_compactos import TEXTO_ARROW
+
+pd = importar_tardio("pandas")
+np = importar_tardio("numpy")
+
+# ------------------ TABELAS ------------------
+CODIGO_PAIS = "55"
+
+# DDDs em uso no Brasil (Anatel)
+DDDS = (
+    11, 12, 13, 14, 15, 16, 17, 18, 19,
+    21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55,
+    61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79,
+    81, 82, 83, 84, 85, 86, 87, 88, 89,
+    91, 92, 93, 94, 95, 96, 97, 98, 99,
+)
+
+TIPOS = ("invalido", "fixo", "celular")
+
+
+@lru_cache(maxsize=None)
+def _tabelas():
+    """
+    (ddd_valido, tipo_por_tamanho_e_digito): consultas por índice, sem
+    comparação célula a célula. A segunda é indexada por
+    [11 dígitos?, primeiro dígito do assinante] e devolve a posição em TIPOS.
+    """
+    ddd_valido = np.zeros(100, dtype=bool)
+    ddd_valido[list(DDDS)] = True
+    tipo = np.zeros((2, 10), dtype=np.int8)
+    tipo[0, 2:6] = TIPOS.index("fixo")      # DDD + 8 dígitos começando em 2-5
+    tipo[1, 9] = TIPOS.index("celular")     # DDD + 9 dígitos começando em 9
+    return ddd_valido, tipo
+
+
+# ------------------ NORMALIZAÇÃO ------------------
+def _como_texto(valores: pd.Series) -> pd.Series:
+    # Colunas numéricas (read_excel sem dtype=str) viram texto sem o ".0" do float
+    if pd.api.types.is_numeric_dtype(valores) and not pd.api.types.is_bool_dtype(valores):
+        return valores.round().astype("Int64").astype(TEXTO_ARROW)
+    return valores.astype(TEXTO_ARROW)
+
+
+def normalizar_telefones(valores) -> pd.DataFrame:
+    """
+    Normaliza uma coluna inteira de telefones brasileiros de uma vez.
+
+    Aceita texto com máscara, espaços, floats com ".0", com ou sem o 55.
+    Devolve, alinhado ao índice da entrada:
+      - nacional: DDD + número (10 ou 11 dígitos) quando reconhecido;
+      - internacional: 55 + DDD + número quando reconhecido;
+      - ddd: os dois dígitos do DDD;
+      - tipo: 'celular', 'fixo' ou 'invalido' (DDD inexistente ou número fora do padrão).
+    Números não reconhecidos ficam só com os dígitos em nacional e, em
+    internacional, com o 55 na frente quando ainda não começam por ele (como o
+    WhatsApp e o extrator de números sempre fizeram); células vazias ou sem
+    dígitos ficam NaN em todas as colunas.
+    """
+    valores = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    texto = _como_texto(valores).str.strip()
+    digitos = (
+        texto.str.replace(r"\.0+$", "", regex=True)
+        .str.replace(r"\D", "", regex=True)
+        .str.lstrip("0")  # prefixo de discagem interurbana (0 11 ...)
+    )
+    digitos = digitos.where(digitos.str.len() > 0)
+
+    tamanho = digitos.str.len()
+    com_pais = digitos.str.startswith(CODIGO_PAIS, na=False) & tamanho.isin([12, 13])
+    nacional = digitos.where(~com_pais, digitos.str[len(CODIGO_PAIS):])
+    reconhecido = nacional.str.len().isin([10, 11]).to_numpy()
+
+    ddd = nacional.str[:2].where(reconhecido)
+    ddd_valido, tipo_por_digito = _tabelas()
+    ddd_num = pd.to_numeric(ddd, errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    celular_tam = (nacional.str.len() == 11).to_numpy()
+    primeiro = pd.to_numeric(nacional.str[2:3], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    posicao = np.where(reconhecido & ddd_valido[ddd_num], tipo_por_digito[celular_tam.astype(np.int8), primeiro], 0)
+    tipo = pd.Series(np.asarray(TIPOS, dtype=object)[posicao], index=valores.index)
+
+    return pd.DataFrame({
+        "nacional": nacional,
+        "internacional": (CODIGO_PAIS + nacional).where(
+            reconhecido, digitos.where(digitos.str.startswith(CODIGO_PAIS, na=True), CODIGO_PAIS + digitos)
+        ),
+        "ddd": ddd,
+        "tipo": tipo.where(digitos.notna()),
+    }, index=valores.index)
+
+
+def normalizar_telefone(valor) -> dict:
+    """Versão de um número só (mesma regra da coluna)"""
+    linha = normalizar_telefones(pd.Series([valor], dtype=object)).iloc[0]
+    return {chave: (None if pd.isna(v) else v) for chave, v in linha.items()}
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import pickle
+
+from backend.importacao import importar_tardio
+
+pd = importar_tardio("pandas")
+np = importar_tardio("numpy")
+pa = importar_tardio("pyarrow")
+
+# ------------------ TIPOS COMPACTOS ------------------
+# Texto guardado no Arrow (um buffer por coluna em vez de um objeto Python por célula).
+# A variante "pyarrow_numpy" mantém NaN nas células vazias e devolve bool do numpy nas
+# comparações, como as colunas object que os conversores já tratavam.
+TEXTO_ARROW = "string[pyarrow_numpy]"
+
+# Colunas com poucos valores distintos (UF, cidade, CNAE, cargos...) que viram category
+COLUNAS_CATEGORICAS = {
+    "UF", "Estado", "Cidade", "Bairro", "CNAEDescricao", "Mercado", "Origem", "Funil",
+    "Usuário responsável", "País", "Categoria", "Faixa de Funcionários da Empresa",
+    "SOCIO1Cargo", "SOCIO2Cargo", "SOCIO3Cargo",
+}
+# Só compensa se os valores distintos forem no máximo esta fração das linhas
+FRACAO_CATEGORIA = 0.5
+
+COMPACTAR_TIPOS = os.getenv("COMPACTAR_TIPOS", "1") != "0"
+
+
+def _categoria(serie: pd.Series) -> pd.Series:
+    categorica = serie.astype("category")
+    # Os conversores fazem fillna(''), que exige '' entre as categorias
+    if "" not in categorica.cat.categories:
+        categorica = categorica.cat.add_categories("")
+    return categorica
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Troca as colunas só de texto por strings Arrow e as de baixa cardinalidade
+    (COLUNAS_CATEGORICAS) por category. Colunas numéricas ou mistas ficam como estão.
+    """
+    if not COMPACTAR_TIPOS:
+        return df
+    colunas = {}
+    for col in df.columns.unique():
+        serie = df[col]
+        if not isinstance(serie, pd.Series) or serie.dtype != object:
+            continue
+        if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "empty"):
+            continue
+        if col in COLUNAS_CATEGORICAS and serie.nunique() <= len(serie) * FRACAO_CATEGORIA:
+            colunas[col] = _categoria(serie)
+        else:
+            colunas[col] = serie.astype(TEXTO_ARROW)
+    if not colunas:
+        return df
+    compactado = df.copy(deep=False)
+    for col, serie in colunas.items():
+        compactado[col] = serie
+    return compactado
+
+
+def constante(valor, index) -> pd.Series:
+    """Coluna com o mesmo valor em todas as linhas: um código int8 por linha em vez de uma referência"""
+    if not COMPACTAR_TIPOS:
+        return pd.Series(valor, index=index, dtype=object)
+    codigos = np.zeros(len(index), dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=[valor]), index=index)
+
+
+# ------------------ TROCA ENTRE PROCESSOS ------------------
+# Colunas mistas (números e textos, ex.: "Número" com "S/N") não têm tipo no
+# Arrow; vão à parte, em pickle, para as células manterem o tipo original.
+_META_TEXTO = b"colunas_texto_arrow"
+_META_MISTAS = b"colunas_mistas"
+
+
+def para_arrow(df: pd.DataFrame) -> bytes:
+    """
+    DataFrame em bytes Arrow IPC, para devolver do pool de processos sem
+    pickle célula a célula. de_arrow restaura strings Arrow e category.
+    """
+    mistas = {
+        col: df[col] for col in df.columns
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty", "floating")
+    }
+    tabela = pa.Table.from_pandas(df.drop(columns=list(mistas)), preserve_index=False)
+    texto = [col for col in df.columns if df[col].dtype == TEXTO_ARROW]
+    metadados = {
+        **(tabela.schema.metadata or {}),
+        _META_TEXTO: pickle.dumps(texto),
+        _META_MISTAS: pickle.dumps((list(df.columns), mistas)),
+    }
+    tabela = tabela.replace_schema_metadata(metadados)
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return destino.getvalue().to_pybytes()
+
+
+def de_arrow(dados: bytes) -> pd.DataFrame:
+    tabela = pa.ipc.open_stream(dados).read_all()
+    metadados = tabela.schema.metadata
+    texto = pickle.loads(metadados[_META_TEXTO])
+    colunas, mistas = pickle.loads(metadados[_META_MISTAS])
+    df = tabela.to_pandas()
+    df = df.astype({col: TEXTO_ARROW for col in texto})
+    for col, serie in mistas.items():
+        df[col] = serie.to_numpy()
+    return df[colunas]
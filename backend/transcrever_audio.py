@@ -1,256 +1,331 @@
 import os
 import io
+import re
 import time
+import uuid
 import shutil
-import requests
-import pandas as pd
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from starlette.responses import StreamingResponse
-from fpdf import FPDF
-from mutagen import File as MutagenFile
-import google.generativeai as genai
 from dotenv import load_dotenv
 import asyncio
-from functools import partial
+from functools import partial, lru_cache
 import mimetypes
+import logging
+
+from backend.observabilidade import (
+    medir_etapa, registrar_linhas, UPSTREAM_REQUESTS, UPSTREAM_ERRORS, TRANSCRIPTION_BATCHES,
+)
+from backend.importacao import importar_tardio
+
+# Dependências pesadas só são carregadas na primeira transcrição
+requests = importar_tardio("requests")
+pd = importar_tardio("pandas")
+mutagen = importar_tardio("mutagen")
+relatorio_pdf = importar_tardio("backend.relatorio_pdf")
+
+logger = logging.getLogger(__name__)
 
 # ------------------ CARREGA .ENV ------------------
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY não encontrada. Verifique seu arquivo .env")
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-print("[API] Conexão com Gemini OK")
+# ------------------ GEMINI ------------------
+@lru_cache(maxsize=1)
+def cliente_gemini():
+    """Importa e configura o SDK do Gemini sob demanda; sem chave, só esta rota fica indisponível"""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=503, detail="Transcrição indisponível: GEMINI_API_KEY não encontrada. Verifique seu arquivo .env")
+
+    import google.generativeai as genai
+
+    # Endpoint alternativo (ex.: backend falso dos testes de carga); usa o transporte REST
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+    logger.info("Conexão com Gemini configurada")
+    return genai
 
 # ------------------ CONFIGURAÇÕES ------------------
 LIMITE_TRANSCRICAO_CURTA = 100
 COLUNA_ATENDENTE = "ATENDENTE"
 PASTA_TEMP = "audios_temp"
+MODELO_GEMINI = "models/gemini-2.5-pro"
+
+# Lotes de gravações curtas numa só chamada ao Gemini (0 em TRANSCRICAO_LOTE_DURACAO_S desliga).
+# O teto em bytes fica abaixo dos 20 MB que a API aceita inline por requisição.
+TRANSCRICAO_LOTE_DURACAO_S = float(os.getenv("TRANSCRICAO_LOTE_DURACAO_S", "600"))
+TRANSCRICAO_LOTE_MAX_BYTES = int(os.getenv("TRANSCRICAO_LOTE_MAX_BYTES", str(16 * 1024 * 1024)))
+TRANSCRICAO_LOTE_MAX_ITENS = int(os.getenv("TRANSCRICAO_LOTE_MAX_ITENS", "10"))
+# Gravações mais longas que isso vão sozinhas: o tempo do modelo já domina a chamada
+TRANSCRICAO_LOTE_CHAMADA_MAX_S = float(os.getenv("TRANSCRICAO_LOTE_CHAMADA_MAX_S", "120"))
+# Downloads e chamadas ao Gemini simultâneos por requisição
+CONCORRENCIA_TRANSCRICAO = 5
+
+PROMPT_TRANSCRICAO = (
+    "Transcreva o áudio completo em Português do Brasil. "
+    "Identifique os locutores pelo nome real se possível. "
+    "Formate como diálogo assim: 'Nome: fala do participante'. "
+    "Evite linhas longas e remova espaços extras desnecessários."
+)
+PROMPT_LOTE = (
+    "Você vai receber {total} gravações de chamadas diferentes, cada uma precedida de um marcador "
+    "'=== GRAVAÇÃO n ==='. Transcreva cada gravação separadamente, em Português do Brasil. "
+    "Identifique os locutores pelo nome real se possível. "
+    "Formate como diálogo assim: 'Nome: fala do participante'. "
+    "Evite linhas longas e remova espaços extras desnecessários. "
+    "Responda com as {total} transcrições na mesma ordem, cada uma começando por uma linha só com "
+    "o seu marcador (=== GRAVAÇÃO 1 ===, === GRAVAÇÃO 2 ===, ...), sem nenhum texto fora dos blocos. "
+    "Não misture falas de gravações diferentes."
+)
+MARCADOR_LOTE = "=== GRAVAÇÃO {n} ==="
+_MARCADOR_RESPOSTA = re.compile(r"^[ \t*#]*=+ *GRAVA[ÇC][ÃA]O +(\d+) *=+[ \t*]*$", re.MULTILINE | re.IGNORECASE)
 
 router = APIRouter()
 
-# ------------------ CLASSE PDF ------------------
-class PDF(FPDF):
-    def header(self):
-        self.set_fill_color(220, 220, 220)
-        self.set_font("Arial", "B", 10)
-        self.set_text_color(40, 40, 40)
-        self.cell(0, 7, "Central Dibai Sales - Relatório de Transcrições", 0, 1, "C", fill=True)
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Arial", "I", 8)
-        self.set_text_color(100, 100, 100)
-        self.cell(0, 10, f"Página {self.page_no()}/{{nb}}", 0, 0, "C")
-
-    def write_long_transcription_block(self, call_id: str, atendente: str, link: str, transcricao: str):
-        print(f"[PDF] Adicionando transcrição longa para ID: {call_id}")
-        self.set_font("Arial", "B", 14)
-        self.set_text_color(20, 20, 20)
-        self.cell(0, 8, f"ID: {call_id}", 0, 1, "L")
-        self.ln(1)
-
-        self.set_font("Arial", "I", 10)
-        self.set_text_color(80, 80, 80)
-        self.cell(0, 5, f"Atendente: {atendente}", 0, 1, "L")
-        self.multi_cell(0, 5, f"Link: {link}", 0, "L")
-        self.ln(5)
-
-        self.set_font("Arial", "", 10)
-        self.set_text_color(0, 0, 0)
-        self.multi_cell(0, 5, transcricao)
-        self.ln(10)
-
-    def _draw_summary_header(self, W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT):
-        self.set_font("Arial", "B", 10)
-        self.set_fill_color(240, 240, 240)
-        self.cell(W_ID, LINE_HEIGHT, "ID", 1, 0, "C", fill=True)
-        self.cell(W_ATENDENTE, LINE_HEIGHT, "ATENDENTE", 1, 0, "C", fill=True)
-        self.cell(W_STATUS, LINE_HEIGHT, "STATUS / RESUMO", 1, 1, "C", fill=True)
-        self.set_font("Arial", "", 9)
-        self.set_text_color(0, 0, 0)
-
-    def write_summary_block(self, curtas: list[dict]):
-        print("[PDF] Adicionando resumo de chamadas curtas/falhas")
-        self.add_page()
-        self.set_font("Arial", "B", 18)
-        self.set_text_color(200, 40, 40)
-        self.cell(0, 10, "Resumo de Chamadas Curtas ou Falhas", 0, 1, "C")
-        self.ln(10)
-
-        W_ID = 35
-        W_ATENDENTE = 40
-        W_STATUS = 125
-        LINE_HEIGHT = 6
-
-        self.set_fill_color(240, 240, 240)
-        self._draw_summary_header(W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT)
-
-        PB_TRIGGER = self.page_break_trigger
-        MIN_ROW_HEIGHT = LINE_HEIGHT * 3
-
-        for item in curtas:
-            status_text = item["STATUS"]
-            if self.get_y() + MIN_ROW_HEIGHT > PB_TRIGGER:
-                self.add_page()
-                self._draw_summary_header(W_ID, W_ATENDENTE, W_STATUS, LINE_HEIGHT)
-
-            start_y = self.get_y()
-            start_x = self.get_x()
-
-            self.set_xy(start_x + W_ID + W_ATENDENTE, start_y)
-            self.multi_cell(W_STATUS, LINE_HEIGHT, status_text, 0, "L")
-            end_y = self.get_y()
-            final_height = max(LINE_HEIGHT, end_y - start_y)
-            v_offset = (final_height - LINE_HEIGHT) / 2
-
-            self.set_xy(start_x, start_y)
-            self.cell(W_ID, final_height, "", 1, 0)
-            self.set_xy(start_x, start_y + v_offset)
-            self.cell(W_ID, LINE_HEIGHT, item["ID"], 0, 0, "C")
-
-            self.set_xy(start_x + W_ID, start_y)
-            self.cell(W_ATENDENTE, final_height, "", 1, 0)
-            self.set_xy(start_x + W_ID, start_y + v_offset)
-            self.cell(W_ATENDENTE, LINE_HEIGHT, item["ATENDENTE"], 0, 0, "C")
-
-            self.set_xy(start_x + W_ID + W_ATENDENTE, start_y)
-            self.cell(W_STATUS, final_height, "", 1, 1, "L")
-            self.set_y(end_y)
-
 # ------------------ FUNÇÕES AUXILIARES ------------------
 def baixar_audio(link_gravacao, nome_arquivo_saida):
     try:
-        print(f"[DOWNLOAD] Baixando áudio: {link_gravacao}")
-        r = requests.get(link_gravacao, stream=True, timeout=30)
-        if r.status_code == 200:
-            with open(nome_arquivo_saida, "wb") as f:
-                for chunk in r.iter_content(8192):
-                    f.write(chunk)
-            print(f"[DOWNLOAD] Sucesso: {nome_arquivo_saida}")
-            return True
-        print(f"[DOWNLOAD] Falha HTTP {r.status_code}")
+        logger.info("Baixando áudio", extra={"link": link_gravacao})
+        UPSTREAM_REQUESTS.labels("gravacao").inc()
+        with medir_etapa("/api/transcrever_audios", "download"):
+            r = requests.get(link_gravacao, stream=True, timeout=30)
+            if r.status_code == 200:
+                with open(nome_arquivo_saida, "wb") as f:
+                    for chunk in r.iter_content(8192):
+                        f.write(chunk)
+                logger.info("Download concluído", extra={"arquivo": nome_arquivo_saida})
+                return True
+        UPSTREAM_ERRORS.labels("gravacao", str(r.status_code)).inc()
+        logger.warning("Falha no download", extra={"link": link_gravacao, "http_status": r.status_code})
         return f"Erro: HTTP {r.status_code}"
     except Exception as e:
-        print(f"[DOWNLOAD] Erro: {e}")
+        UPSTREAM_ERRORS.labels("gravacao", type(e).__name__).inc()
+        logger.warning("Erro no download", extra={"link": link_gravacao, "erro": str(e)})
         return f"Erro de conexão: {str(e)}"
 
 def duracao_audio_segundos(caminho):
     try:
-        audio = MutagenFile(caminho)
+        audio = mutagen.File(caminho)
         if audio is None or not hasattr(audio, "info"):
             return 0
         return audio.info.length
     except Exception:
         return 0
 
-def transcrever_audio(caminho):
-    try:
-        model = genai.GenerativeModel("models/gemini-2.5-pro")  
-
-        mime_type, _ = mimetypes.guess_type(caminho)
-        if not mime_type:
-            mime_type = "audio/mpeg"
-
-        with open(caminho, "rb") as f:
-            audio_bytes = f.read()
-
-        # ✅ formato correto para enviar áudio e prompt
-        response = model.generate_content(
-            [
-                {
-                    "role": "user",
-                    "parts": [
-                        "Transcreva o áudio completo em Português do Brasil. "
-                        "Identifique os locutores pelo nome real se possível. "
-                        "Formate como diálogo assim: 'Nome: fala do participante'. "
-                        "Evite linhas longas e remova espaços extras desnecessários.",
-                        {
-                            "mime_type": mime_type,
-                            "data": audio_bytes,
-                        },
-                    ],
-                }
-            ]
-        )
+def _parte_audio(caminho):
+    mime_type, _ = mimetypes.guess_type(caminho)
+    with open(caminho, "rb") as f:
+        return {"mime_type": mime_type or "audio/mpeg", "data": f.read()}
 
-        texto = response.text.strip() if response and hasattr(response, "text") else ""
-        return texto
+def _gerar(partes):
+    """Uma chamada ao Gemini com as partes (textos e áudios) de uma mensagem do usuário"""
+    model = cliente_gemini().GenerativeModel(MODELO_GEMINI)
+    UPSTREAM_REQUESTS.labels("gemini").inc()
+    with medir_etapa("/api/transcrever_audios", "upstream"):
+        response = model.generate_content([{"role": "user", "parts": partes}])
+    return response.text.strip() if response and hasattr(response, "text") else ""
 
+def transcrever_audio(caminho):
+    try:
+        return _gerar([PROMPT_TRANSCRICAO, _parte_audio(caminho)])
     except Exception as e:
-        print(f"[TRANSCRICAO] Erro: {e}")
+        UPSTREAM_ERRORS.labels("gemini", type(e).__name__).inc()
+        logger.error("Erro na transcrição", extra={"arquivo": caminho, "erro": str(e)})
         return f"ERRO na Transcrição: {type(e).__name__}: {str(e)}"
 
+def separar_transcricoes(texto, total):
+    """
+    Divide a resposta de um lote pelos marcadores. Devolve None se a divisão não
+    for confiável: marcadores faltando, repetidos, fora de ordem, texto antes do
+    primeiro ou algum bloco vazio (gravação pulada ou resposta truncada).
+    """
+    marcadores = list(_MARCADOR_RESPOSTA.finditer(texto or ""))
+    if [int(m.group(1)) for m in marcadores] != list(range(1, total + 1)):
+        return None
+    if texto[:marcadores[0].start()].strip():
+        return None
+    fins = [m.start() for m in marcadores[1:]] + [len(texto)]
+    transcricoes = [texto[m.end():fim].strip() for m, fim in zip(marcadores, fins)]
+    return transcricoes if all(transcricoes) else None
+
+def transcrever_lote(caminhos):
+    """
+    Transcreve várias gravações curtas numa só chamada, com um marcador antes de
+    cada áudio. Devolve as transcrições na ordem dos caminhos, ou None quando a
+    chamada falha ou a resposta não se divide certinho (o endpoint então
+    transcreve uma a uma).
+    """
+    partes = [PROMPT_LOTE.format(total=len(caminhos))]
+    for n, caminho in enumerate(caminhos, start=1):
+        partes += [MARCADOR_LOTE.format(n=n), _parte_audio(caminho)]
+    try:
+        texto = _gerar(partes)
+    except Exception as e:
+        UPSTREAM_ERRORS.labels("gemini", type(e).__name__).inc()
+        TRANSCRIPTION_BATCHES.labels("erro").inc()
+        logger.warning("Erro no lote de transcrição", extra={"gravacoes": len(caminhos), "erro": str(e)})
+        return None
+    transcricoes = separar_transcricoes(texto, len(caminhos))
+    if transcricoes is None:
+        TRANSCRIPTION_BATCHES.labels("divisao_invalida").inc()
+        logger.warning("Resposta do lote não pôde ser dividida", extra={"gravacoes": len(caminhos)})
+        return None
+    TRANSCRIPTION_BATCHES.labels("ok").inc()
+    return transcricoes
+
+class MontadorLotes:
+    """
+    Agrupa as gravações curtas, na ordem em que chegam, em lotes limitados por
+    duração total, bytes e quantidade. As longas (e todas, com o lote
+    desligado) vão sozinhas. `adicionar` devolve os lotes que ficaram prontos,
+    para a transcrição começar enquanto os downloads seguem.
+    """
+
+    def __init__(self):
+        self.atual, self.duracao, self.tamanho = [], 0.0, 0
+
+    def _fechar(self):
+        lote = self.atual
+        self.atual, self.duracao, self.tamanho = [], 0.0, 0
+        return lote
+
+    def adicionar(self, gravacao):
+        if TRANSCRICAO_LOTE_DURACAO_S <= 0 or gravacao["DURACAO"] > TRANSCRICAO_LOTE_CHAMADA_MAX_S:
+            return [[gravacao]]
+        prontos = []
+        if self.atual and (
+            self.duracao + gravacao["DURACAO"] > TRANSCRICAO_LOTE_DURACAO_S
+            or self.tamanho + gravacao["BYTES"] > TRANSCRICAO_LOTE_MAX_BYTES
+        ):
+            prontos.append(self._fechar())
+        self.atual.append(gravacao)
+        self.duracao += gravacao["DURACAO"]
+        self.tamanho += gravacao["BYTES"]
+        # Cheio pela quantidade: fecha já, sem esperar a próxima gravação
+        if len(self.atual) >= TRANSCRICAO_LOTE_MAX_ITENS:
+            prontos.append(self._fechar())
+        return prontos
+
+    def finalizar(self):
+        return [self._fechar()] if self.atual else []
+
+def montar_lotes(gravacoes):
+    """Todos os lotes de uma lista de gravações (ver MontadorLotes)"""
+    montador = MontadorLotes()
+    lotes = [lote for gravacao in gravacoes for lote in montador.adicionar(gravacao)]
+    return lotes + montador.finalizar()
+
+def _remover_arquivo(caminho):
+    try:
+        os.remove(caminho)
+    except Exception:
+        pass
+
+def resultado_transcricao(gravacao, transcricao_texto):
+    call_id, atendente_nome = gravacao["ID"], gravacao["ATENDENTE"]
+    if isinstance(transcricao_texto, str) and transcricao_texto.startswith("ERRO na Transcrição"):
+        return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": transcricao_texto}
+    elif not isinstance(transcricao_texto, str) or len(transcricao_texto) < LIMITE_TRANSCRICAO_CURTA:
+        resumo_curto = (str(transcricao_texto).replace('\n', ' ').strip()[:70] + "...") if transcricao_texto else "Transcrição vazia"
+        return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": f"CURTA: {resumo_curto}"}
+    else:
+        return {"LONGO": {"ID": call_id, "ATENDENTE": atendente_nome, "LINK": gravacao["LINK"], "TRANSCRICAO": transcricao_texto}}
+
 # ------------------ ENDPOINT ------------------
 @router.post("/transcrever_audios")
 async def transcrever_audios_endpoint(file: UploadFile = File(...)):
-    print("[API] Recebendo arquivo Excel...")
+    logger.info("Recebendo arquivo Excel")
+    # Falha cedo (503) se o Gemini não estiver configurado
+    await asyncio.to_thread(cliente_gemini)
     resultados_longos = []
     resultados_curtos_resumo = []
 
-    os.makedirs(PASTA_TEMP, exist_ok=True)
+    # Pasta própria da requisição: outra transcrição em paralelo não apaga os áudios desta
+    pasta = os.path.join(PASTA_TEMP, uuid.uuid4().hex)
+    os.makedirs(pasta, exist_ok=True)
 
     try:
         contents = await file.read()
         df = pd.read_excel(io.BytesIO(contents))
         df.columns = df.columns.str.strip().str.upper()
-        print(f"[API] Excel carregado com {len(df)} linhas")
+        logger.info("Excel carregado", extra={"linhas": len(df)})
+        registrar_linhas("/api/transcrever_audios", len(df))
 
         colunas_requeridas = ["GRAVAÇÃO", "ID", COLUNA_ATENDENTE.upper()]
         if not all(col in df.columns for col in colunas_requeridas):
             raise HTTPException(status_code=400, detail=f"O Excel deve conter as colunas 'GRAVAÇÃO', 'ID' e '{COLUNA_ATENDENTE}'.")
 
-        async def processar_linha(row):
+        loop = asyncio.get_event_loop()
+        baixando = asyncio.Semaphore(CONCORRENCIA_TRANSCRICAO)
+        transcrevendo = asyncio.Semaphore(CONCORRENCIA_TRANSCRICAO)
+        # Áudios baixados e ainda não transcritos: cabem os lotes das chamadas em
+        # andamento e o lote em montagem, sem a requisição inteira ir para o disco
+        em_disco = asyncio.Semaphore(CONCORRENCIA_TRANSCRICAO * max(TRANSCRICAO_LOTE_MAX_ITENS, 1))
+        resultados = [None] * len(df)
+
+        # Download e duração de cada gravação; devolve a gravação pronta para transcrever ou None
+        async def preparar_linha(posicao, row):
             link = row["GRAVAÇÃO"]
             call_id = str(row["ID"])
             atendente_nome = str(row[COLUNA_ATENDENTE.upper()])
 
             if not isinstance(link, str) or not link.startswith("http"):
-                print(f"[SKIP] Linha {row['ID']} inválida: {link}")
+                logger.info("Linha ignorada: link inválido", extra={"call_id": call_id, "link": link})
                 return None
 
-            nome_arquivo = os.path.join(PASTA_TEMP, f"{call_id}.mp3")
-            loop = asyncio.get_event_loop()
-
-            resultado_download = await loop.run_in_executor(None, partial(baixar_audio, link, nome_arquivo))
+            nome_arquivo = os.path.join(pasta, f"{posicao}_{call_id}.mp3")
+            await em_disco.acquire()
+            async with baixando:
+                resultado_download = await loop.run_in_executor(None, partial(baixar_audio, link, nome_arquivo))
             if resultado_download is not True:
-                return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": resultado_download}
+                _remover_arquivo(nome_arquivo)
+                em_disco.release()
+                resultados[posicao] = {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": resultado_download}
+                return None
 
             duracao = await loop.run_in_executor(None, partial(duracao_audio_segundos, nome_arquivo))
             if duracao < 30:
-                try:
-                    os.remove(nome_arquivo)
-                except Exception:
-                    pass
-                return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": "Áudio muito curto (<30s)"}
-
-            transcricao_texto = await loop.run_in_executor(None, partial(transcrever_audio, nome_arquivo))
-            await asyncio.sleep(1)
-
-            try:
-                os.remove(nome_arquivo)
-            except Exception:
-                pass
-
-            if isinstance(transcricao_texto, str) and transcricao_texto.startswith("ERRO na Transcrição"):
-                return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": transcricao_texto}
-            elif not isinstance(transcricao_texto, str) or len(transcricao_texto) < LIMITE_TRANSCRICAO_CURTA:
-                resumo_curto = (str(transcricao_texto).replace('\n', ' ').strip()[:70] + "...") if transcricao_texto else "Transcrição vazia"
-                return {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": f"CURTA: {resumo_curto}"}
-            else:
-                return {"LONGO": {"ID": call_id, "ATENDENTE": atendente_nome, "LINK": link, "TRANSCRICAO": transcricao_texto}}
-
-        SEMAFORO = asyncio.Semaphore(5)
-
-        async def sem_task(row):
-            async with SEMAFORO:
-                return await processar_linha(row)
+                _remover_arquivo(nome_arquivo)
+                em_disco.release()
+                resultados[posicao] = {"ID": call_id, "ATENDENTE": atendente_nome, "STATUS": "Áudio muito curto (<30s)"}
+                return None
 
-        tasks = [sem_task(row) for _, row in df.iterrows()]
-        resultados = await asyncio.gather(*tasks)
+            return {
+                "POSICAO": posicao, "ID": call_id, "ATENDENTE": atendente_nome, "LINK": link,
+                "ARQUIVO": nome_arquivo, "DURACAO": duracao, "BYTES": os.path.getsize(nome_arquivo),
+            }
+
+        # Transcrição: gravações curtas em lote, longas (ou lote que não se dividiu) uma a uma
+        async def chamar_gemini(func, *args):
+            async with transcrevendo:
+                resposta = await loop.run_in_executor(None, partial(func, *args))
+                await asyncio.sleep(1)
+                return resposta
+
+        async def transcrever(lote):
+            transcricoes = None
+            if len(lote) > 1:
+                transcricoes = await chamar_gemini(transcrever_lote, [g["ARQUIVO"] for g in lote])
+            if transcricoes is None:
+                transcricoes = await asyncio.gather(*(chamar_gemini(transcrever_audio, g["ARQUIVO"]) for g in lote))
+            for gravacao, transcricao_texto in zip(lote, transcricoes):
+                _remover_arquivo(gravacao["ARQUIVO"])
+                em_disco.release()
+                resultados[gravacao["POSICAO"]] = resultado_transcricao(gravacao, transcricao_texto)
+
+        # Cada lote vai ao Gemini assim que fecha, enquanto os downloads seguintes continuam
+        montador = MontadorLotes()
+        transcricoes = []
+        preparacoes = [preparar_linha(posicao, row) for posicao, (_, row) in enumerate(df.iterrows())]
+        for preparada in asyncio.as_completed(preparacoes):
+            gravacao = await preparada
+            if gravacao is not None:
+                transcricoes += [asyncio.create_task(transcrever(lote)) for lote in montador.adicionar(gravacao)]
+        transcricoes += [asyncio.create_task(transcrever(lote)) for lote in montador.finalizar()]
+        logger.info("Gravações agrupadas", extra={"chamadas": len(transcricoes)})
+        await asyncio.gather(*transcricoes)
 
         for r in resultados:
             if r is None:
@@ -260,8 +335,8 @@ async def transcrever_audios_endpoint(file: UploadFile = File(...)):
             else:
                 resultados_curtos_resumo.append(r)
 
-        print("[PDF] Gerando PDF final...")
-        pdf = PDF(orientation='P', unit='mm', format='A4')
+        logger.info("Gerando PDF final")
+        pdf = relatorio_pdf.PDF(orientation='P', unit='mm', format='A4')
         pdf.alias_nb_pages()
         pdf.set_auto_page_break(auto=True, margin=15)
 
@@ -278,7 +353,7 @@ async def transcrever_audios_endpoint(file: UploadFile = File(...)):
             pdf.write_summary_block(resultados_curtos_resumo)
 
         pdf_output = bytes(pdf.output(dest='S'))
-        print("[PDF] PDF gerado com sucesso!")
+        logger.info("PDF gerado", extra={"bytes": len(pdf_output)})
 
         return StreamingResponse(
             io.BytesIO(pdf_output),
@@ -287,6 +362,6 @@ async def transcrever_audios_endpoint(file: UploadFile = File(...)):
         )
 
     finally:
-        if os.path.exists(PASTA_TEMP):
-            shutil.rmtree(PASTA_TEMP)
-            print("[TEMP] Pasta temporária removida")
+        if os.path.exists(pasta):
+            shutil.rmtree(pasta)
+            logger.debug("Pasta temporária removida")
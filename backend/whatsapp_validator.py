@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Union
 import os
@@ -6,6 +7,9 @@ from dotenv import load_dotenv
 import httpx
 import asyncio
 
+from backend.observabilidade import medir_etapa, UPSTREAM_REQUESTS, UPSTREAM_ERRORS
+from backend.telefones import normalizar_telefones
+
 load_dotenv()
 
 router = APIRouter()
@@ -25,16 +29,14 @@ class ValidationResult(BaseModel):
     status: str
     sub_status: str = ""
 
-def format_number(number: str) -> str:
-    """Garante que o número comece com o código do Brasil '55'"""
-    number = number.strip()
-    if not number.startswith("55"):
-        number = "55" + number
-    return number
+def format_numbers(numbers: List[str]) -> List[str]:
+    """Normaliza todos os números de uma vez: 55 + DDD + número, só dígitos"""
+    normalizados = normalizar_telefones(numbers)["internacional"]
+    # Sem nenhum dígito, segue o texto original e a API responde como inválido
+    return [n if isinstance(n, str) else original.strip() for n, original in zip(normalizados, numbers)]
 
 async def call_whatsapp_api(number: str) -> ValidationResult:
-    """Chama a API do WhatsApp de forma assíncrona"""
-    number = format_number(number)
+    """Chama a API do WhatsApp de forma assíncrona (número já normalizado)"""
     payload = {"phone_number": number}
     headers = {
         "X-RapidAPI-Key": RAPIDAPI_KEY,
@@ -43,13 +45,17 @@ async def call_whatsapp_api(number: str) -> ValidationResult:
     }
     async with httpx.AsyncClient(timeout=10) as client:
         try:
-            resp = await client.post(RAPIDAPI_URL, json=payload, headers=headers)
+            UPSTREAM_REQUESTS.labels("rapidapi").inc()
+            with medir_etapa("/api/whatsapp_validator", "upstream"):
+                resp = await client.post(RAPIDAPI_URL, json=payload, headers=headers)
             resp.raise_for_status()
             data = resp.json()
             status_api = data.get("status", "").lower()
             status = status_api if status_api in ["valid", "invalid"] else "unknown"
             return ValidationResult(number=number, status=status, sub_status=data.get("sub_status", ""))
         except Exception as e:
+            motivo = str(e.response.status_code) if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+            UPSTREAM_ERRORS.labels("rapidapi", motivo).inc()
             return ValidationResult(number=number, status="unknown", sub_status=str(e))
 
 async def validate_bulk(numbers: List[str]) -> List[ValidationResult]:
@@ -62,15 +68,19 @@ async def validate_bulk(numbers: List[str]) -> List[ValidationResult]:
             res = await call_whatsapp_api(number)
             results.append(res)
 
-    await asyncio.gather(*(sem_task(n) for n in numbers))
+    await asyncio.gather(*(sem_task(n) for n in format_numbers(numbers)))
     return results
 
 @router.post("/whatsapp_validator", response_model=Union[ValidationResult, List[ValidationResult]])
 async def validate(req: ValidationRequest):
     """Endpoint que valida número(s) de WhatsApp"""
+    if not RAPIDAPI_URL:
+        raise HTTPException(status_code=503, detail="Validação indisponível: NEXT_PUBLIC_RAPIDAPI_URL não configurada")
     if req.number:
-        return await call_whatsapp_api(req.number)
+        return await call_whatsapp_api(format_numbers([req.number])[0])
     elif req.numbers and len(req.numbers) > 0:
-        return await validate_bulk(req.numbers)
+        results = await validate_bulk(req.numbers)
+        # Os resultados já são ValidationResult: devolve direto, sem revalidar item a item pelo response_model
+        return ORJSONResponse([r.model_dump() for r in results])
     else:
         raise HTTPException(status_code=400, detail="Nenhum número fornecido")
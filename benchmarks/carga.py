@@ -0,0 +1,202 @@
+"""
+Teste de carga ponta a ponta com serviços externos falsos (benchmarks/fakes.py).
+
+Sobe os fakes (RapidAPI, servidor de MP3 e Gemini), inicia o backend com as
+variáveis de ambiente apontando para eles e dispara clientes concorrentes.
+Ao final, mostra vazão e latências p50/p95/p99.
+
+Exemplos:
+    python -m benchmarks.carga whatsapp --clientes 20 --requisicoes 200 --numeros 50 --taxa-429 0.05
+    python -m benchmarks.carga transcricao --clientes 2 --requisicoes 4 --chamadas 20 --duracoes 45,90,300
+    python -m benchmarks.carga speedio --clientes 4 --requisicoes 8 --linhas 10000
+"""
+import io
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import Counter
+
+import httpx
+import pandas as pd
+
+from benchmarks.fakes import criar_whatsapp_fake, criar_audios_fake, criar_gemini_fake, iniciar_servidor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------ BACKEND ------------------
+def iniciar_backend(porta: int, env_extra: dict, pasta: str) -> subprocess.Popen:
+    env = {**os.environ, **env_extra, "PYTHONPATH": RAIZ, "JOBS_DB_PATH": os.path.join(pasta, "jobs.sqlite3"),
+           "JOBS_DIR": os.path.join(pasta, "jobs_data")}
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=pasta, env=env,
+    )
+    url = f"http://127.0.0.1:{porta}/metrics"
+    for _ in range(300):
+        if processo.poll() is not None:
+            raise RuntimeError("O backend encerrou durante a inicialização")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return processo
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    processo.terminate()
+    raise RuntimeError("O backend não respondeu a tempo")
+
+
+# ------------------ CENÁRIOS ------------------
+def cenario_whatsapp(args, rng: random.Random):
+    def requisicao():
+        numeros = [f"{rng.randint(11, 99)}9{rng.randint(10_000_000, 99_999_999)}" for _ in range(args.numeros)]
+        corpo = {"number": numeros[0]} if args.numeros == 1 else {"numbers": numeros}
+        return {"method": "POST", "url": "/api/whatsapp_validator", "json": corpo}
+    return requisicao, args.numeros
+
+
+def cenario_transcricao(args, rng: random.Random, url_audios: str):
+    duracoes = [float(d) for d in args.duracoes.split(",")]
+
+    def requisicao():
+        ids = [rng.randint(1, 10**9) for _ in range(args.chamadas)]
+        df = pd.DataFrame({
+            "ID": ids,
+            "ATENDENTE": [rng.choice(["Angela", "Yasmin", "Carlos"]) for _ in ids],
+            "GRAVAÇÃO": [f"{url_audios}/audios/{rng.choice(duracoes)}/{i}.mp3" for i in ids],
+        })
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        return {"method": "POST", "url": "/api/transcrever_audios",
+                "files": {"file": ("chamadas.xlsx", buffer.getvalue())}}
+    return requisicao, args.chamadas
+
+
+def cenario_speedio(args):
+    from benchmarks.gerador import gerar_speedio, para_xlsx
+    conteudo = para_xlsx(gerar_speedio(args.linhas))
+
+    def requisicao():
+        return {"method": "POST", "url": "/api/speedio_assertiva",
+                "files": {"file": ("speedio.xlsx", conteudo)}}
+    return requisicao, args.linhas
+
+
+# ------------------ EXECUÇÃO ------------------
+async def disparar(base_url: str, montar_requisicao, clientes: int, total: int, timeout: float):
+    latencias, status = [], Counter()
+    restantes = iter(range(total))
+
+    async def cliente(http: httpx.AsyncClient):
+        for _ in restantes:
+            requisicao = montar_requisicao()
+            inicio = time.perf_counter()
+            try:
+                resp = await http.request(**requisicao)
+                status[resp.status_code] += 1
+            except httpx.HTTPError as e:
+                status[type(e).__name__] += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limites) as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(http) for _ in range(clientes)))
+        duracao = time.perf_counter() - inicio
+    return latencias, status, duracao
+
+
+def relatorio(nome: str, latencias: list, status: Counter, duracao: float, itens_por_requisicao: int,
+              chamadas_upstream: dict):
+    print(f"\n=== {nome} ===")
+    print(f"requisições: {len(latencias)} em {duracao:.2f}s  ->  {len(latencias) / duracao:.2f} req/s"
+          f"  ({len(latencias) * itens_por_requisicao / duracao:.1f} itens/s)")
+    if len(latencias) >= 2:
+        q = statistics.quantiles(latencias, n=100, method="inclusive")
+        print(f"latência (s): p50={q[49]:.3f}  p95={q[94]:.3f}  p99={q[98]:.3f}  max={max(latencias):.3f}")
+    print("status:", dict(status))
+    for servico, chamadas in chamadas_upstream.items():
+        print(f"chamadas ao {servico} falso: {chamadas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com serviços externos falsos")
+    parser.add_argument("cenario", choices=["whatsapp", "transcricao", "speedio"])
+    parser.add_argument("--clientes", type=int, default=10, help="Clientes concorrentes")
+    parser.add_argument("--requisicoes", type=int, default=100, help="Total de requisições")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--url", help="Usa um backend já em execução em vez de iniciar um")
+    parser.add_argument("--porta", type=int, default=8765, help="Porta do backend iniciado pelo harness")
+    parser.add_argument("--porta-fakes", type=int, default=8766, help="Primeira porta dos serviços falsos")
+    parser.add_argument("--seed", type=int, default=42)
+    # whatsapp
+    parser.add_argument("--numeros", type=int, default=20, help="Números por requisição")
+    parser.add_argument("--latencia-ms", type=float, default=200, help="Latência média da RapidAPI falsa")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    # transcrição
+    parser.add_argument("--chamadas", type=int, default=10, help="Gravações por planilha")
+    parser.add_argument("--duracoes", default="45,90,300", help="Durações (s) sorteadas para os MP3")
+    parser.add_argument("--latencia-transcricao-ms", type=float, default=3000)
+    parser.add_argument("--taxa-erro-transcricao", type=float, default=0.0)
+    # speedio
+    parser.add_argument("--linhas", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    whatsapp = criar_whatsapp_fake(args.latencia_ms, args.jitter_ms, args.taxa_429, args.taxa_erro, seed=args.seed)
+    gemini = criar_gemini_fake(args.latencia_transcricao_ms, args.latencia_transcricao_ms / 5,
+                               taxa_erro=args.taxa_erro_transcricao, seed=args.seed)
+    porta_whatsapp, porta_audios, porta_gemini = args.porta_fakes, args.porta_fakes + 1, args.porta_fakes + 2
+    servidores = [
+        iniciar_servidor(whatsapp, porta_whatsapp),
+        iniciar_servidor(criar_audios_fake(), porta_audios),
+        iniciar_servidor(gemini, porta_gemini),
+    ]
+
+    env_fakes = {
+        "NEXT_PUBLIC_RAPIDAPI_URL": f"http://127.0.0.1:{porta_whatsapp}/",
+        "NEXT_PUBLIC_RAPIDAPI_KEY": "fake",
+        "NEXT_PUBLIC_RAPIDAPI_HOST": "fake",
+        "GEMINI_API_KEY": "fake",
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{porta_gemini}",
+    }
+
+    if args.cenario == "whatsapp":
+        montar, itens = cenario_whatsapp(args, rng)
+    elif args.cenario == "transcricao":
+        montar, itens = cenario_transcricao(args, rng, f"http://127.0.0.1:{porta_audios}")
+    else:
+        montar, itens = cenario_speedio(args)
+
+    backend = None
+    with tempfile.TemporaryDirectory() as pasta:
+        try:
+            if args.url:
+                base_url = args.url
+            else:
+                backend = iniciar_backend(args.porta, env_fakes, pasta)
+                base_url = f"http://127.0.0.1:{args.porta}"
+            latencias, status, duracao = asyncio.run(
+                disparar(base_url, montar, args.clientes, args.requisicoes, args.timeout)
+            )
+        finally:
+            if backend is not None:
+                backend.terminate()
+                backend.wait()
+            for servidor in servidores:
+                servidor.should_exit = True
+
+    relatorio(args.cenario, latencias, status, duracao, itens,
+              {"RapidAPI": whatsapp.state.chamadas, "Gemini": gemini.state.chamadas})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from benchmarks.gerador import TAMANHOS, gerar_speedio, gerar_unificado, para_xlsx, para_csv
+
+# Tamanhos executados; os maiores são opcionais por serem lentos:
+#   BENCH_TAMANHOS=1k,10k,100k,500k pytest benchmarks
+BENCH_TAMANHOS = [t.strip() for t in os.getenv("BENCH_TAMANHOS", "1k").split(",") if t.strip()]
+# Pico de memória pelo tracemalloc, ligado nas rodadas cronometradas (deixa os tempos mais lentos)
+BENCH_MEMORIA = os.getenv("BENCH_MEMORIA", "1") == "1"
+
+_resultados = []
+
+
+def pytest_generate_tests(metafunc):
+    if "tamanho" in metafunc.fixturenames:
+        metafunc.parametrize("tamanho", BENCH_TAMANHOS)
+
+
+@pytest.fixture(scope="session")
+def planilhas(request, tmp_path_factory):
+    """Gera (ou reaproveita do cache do pytest) as planilhas sintéticas: planilhas(tipo, tamanho, formato)"""
+    cache = getattr(request.config, "cache", None)
+    pasta = cache.mkdir("planilhas_sinteticas") if cache else tmp_path_factory.mktemp("planilhas_sinteticas")
+    memoria = {}
+
+    def obter(tipo: str, tamanho: str, formato: str = "xlsx") -> bytes:
+        chave = (tipo, tamanho, formato)
+        if chave not in memoria:
+            caminho = pasta / f"{tipo}_{tamanho}.{formato}"
+            if not caminho.exists():
+                df = (gerar_speedio if tipo == "speedio" else gerar_unificado)(TAMANHOS[tamanho])
+                # Speedio exporta CSV em UTF-8; as planilhas unificadas são salvas em latin-1
+                encoding = "utf-8" if tipo == "speedio" else "latin-1"
+                caminho.write_bytes(para_xlsx(df) if formato == "xlsx" else para_csv(df, encoding))
+            memoria[chave] = caminho.read_bytes()
+        return memoria[chave]
+
+    return obter
+
+
+@pytest.fixture
+def medir(benchmark, request):
+    """
+    Executa `func(*args)` sob o pytest-benchmark e registra linhas/s e pico de
+    memória (tracemalloc) em `extra_info`. O pico é medido nas próprias rodadas
+    cronometradas, então o tempo inclui o custo do tracemalloc; para tempos
+    limpos, use BENCH_MEMORIA=0. Com --benchmark-disable, só executa `func`
+    uma vez (as asserções dos testes continuam valendo).
+    """
+    def executar(func, *args, linhas: int):
+        if benchmark.disabled:
+            return func(*args)
+
+        picos = []
+
+        def rodada():
+            if not BENCH_MEMORIA:
+                return func(*args)
+            tracemalloc.start()
+            try:
+                return func(*args)
+            finally:
+                picos.append(tracemalloc.get_traced_memory()[1] / 1e6)
+                tracemalloc.stop()
+
+        rounds = 3 if linhas <= 1_000 else 1
+        resultado = benchmark.pedantic(rodada, rounds=rounds, iterations=1, warmup_rounds=0)
+
+        media = benchmark.stats.stats.mean
+        pico_mb = max(picos) if picos else None
+        benchmark.extra_info.update({
+            "linhas": linhas,
+            "linhas_por_segundo": round(linhas / media) if media else None,
+            "pico_memoria_mb": round(pico_mb, 1) if pico_mb is not None else None,
+        })
+        _resultados.append((request.node.name, linhas, media, benchmark.extra_info["linhas_por_segundo"], pico_mb))
+        return resultado
+
+    return executar
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _resultados:
+        return
+    terminalreporter.section("conversores: linhas/s e pico de memória")
+    terminalreporter.write_line(f"{'benchmark':<55} {'linhas':>8} {'tempo (s)':>10} {'linhas/s':>10} {'pico (MB)':>10}")
+    for nome, linhas, media, por_segundo, pico_mb in _resultados:
+        pico = f"{pico_mb:.1f}" if pico_mb is not None else "-"
+        terminalreporter.write_line(f"{nome:<55} {linhas:>8} {media:>10.3f} {por_segundo or 0:>10} {pico:>10}")
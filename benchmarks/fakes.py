@@ -0,0 +1,117 @@
+"""
+Serviços externos falsos para testes de carga, sem custo nem limite de uso:
+
+- WhatsApp validator compatível com a RapidAPI (latência, taxa de 429 e de erro configuráveis)
+- Servidor de gravações MP3 sintéticas com a duração pedida na URL
+- Backend de transcrição compatível com o endpoint REST `generateContent` do Gemini
+  (em lotes, responde um bloco por marcador "=== GRAVAÇÃO n ===")
+"""
+import re
+import json
+import math
+import random
+import asyncio
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from starlette.responses import JSONResponse, Response
+
+# Quadro MPEG-1 Layer III, 128 kbps, 44.1 kHz, estéreo: 417 bytes e 1152 amostras
+_QUADRO_MP3 = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+
+TRANSCRICAO_FAKE = (
+    "Angela: Olá, aqui é a Angela da Dibai Sales, tudo bem?\n"
+    "Cliente: Tudo sim, pode falar.\n"
+    "Angela: Estou ligando para confirmar os dados da empresa e apresentar nossa proposta de marketing.\n"
+    "Cliente: Claro, pode enviar por e-mail que eu analiso com o time."
+)
+
+_MARCADOR = re.compile(r"=== GRAVAÇÃO \d+ ===")
+
+
+def gerar_mp3(segundos: float) -> bytes:
+    """MP3 silencioso cuja duração o mutagen reconhece"""
+    return _QUADRO_MP3 * math.ceil(segundos * 44100 / 1152)
+
+
+async def _latencia(rng: random.Random, media_ms: float, jitter_ms: float):
+    atraso = max(0.0, rng.gauss(media_ms, jitter_ms)) / 1000 if jitter_ms else media_ms / 1000
+    if atraso:
+        await asyncio.sleep(atraso)
+
+
+def criar_whatsapp_fake(latencia_ms: float = 200, jitter_ms: float = 50, taxa_429: float = 0.0,
+                        taxa_erro: float = 0.0, taxa_validos: float = 0.7, seed: int = 42) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.chamadas = 0
+
+    @app.post("/{caminho:path}")
+    async def validar(caminho: str, request: Request):
+        app.state.chamadas += 1
+        payload = await request.json()
+        await _latencia(rng, latencia_ms, jitter_ms)
+        sorteio = rng.random()
+        if sorteio < taxa_429:
+            return JSONResponse({"message": "Too many requests"}, status_code=429)
+        if sorteio < taxa_429 + taxa_erro:
+            return JSONResponse({"message": "Internal error"}, status_code=500)
+        status = "valid" if rng.random() < taxa_validos else "invalid"
+        return {"phone_number": payload.get("phone_number"), "status": status, "sub_status": ""}
+
+    return app
+
+
+def criar_audios_fake() -> FastAPI:
+    app = FastAPI()
+    cache = {}
+
+    @app.get("/audios/{segundos}/{nome}")
+    async def audio(segundos: float, nome: str):
+        if segundos not in cache:
+            cache[segundos] = gerar_mp3(segundos)
+        return Response(cache[segundos], media_type="audio/mpeg")
+
+    return app
+
+
+def criar_gemini_fake(latencia_ms: float = 3000, jitter_ms: float = 500, ms_por_mb: float = 0.0,
+                      taxa_erro: float = 0.0, seed: int = 42) -> FastAPI:
+    """Responde a POST /{versao}/models/{modelo}:generateContent como a API REST do Gemini"""
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.chamadas = 0
+
+    @app.post("/{versao}/models/{modelo}:generateContent")
+    async def generate_content(versao: str, modelo: str, request: Request):
+        app.state.chamadas += 1
+        corpo = await request.body()
+        await _latencia(rng, latencia_ms + ms_por_mb * len(corpo) / 1e6, jitter_ms)
+        if rng.random() < taxa_erro:
+            return JSONResponse({"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}},
+                                status_code=503)
+        textos = [parte.get("text", "") for conteudo in json.loads(corpo).get("contents", [])
+                  for parte in conteudo.get("parts", [])]
+        marcadores = [texto for texto in textos if _MARCADOR.fullmatch(texto.strip())]
+        resposta = "\n\n".join(f"{m.strip()}\n{TRANSCRICAO_FAKE}" for m in marcadores) or TRANSCRICAO_FAKE
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": resposta}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(corpo) // 100, "candidatesTokenCount": 80},
+        }
+
+    return app
+
+
+def iniciar_servidor(app: FastAPI, porta: int, host: str = "127.0.0.1") -> uvicorn.Server:
+    """Sobe o app numa thread e espera ficar pronto"""
+    servidor = uvicorn.Server(uvicorn.Config(app, host=host, port=porta, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor
@@ -0,0 +1,226 @@
+"""
+Gerador de planilhas sintéticas no formato Speedio/Assertiva.
+
+Uso:
+    python -m benchmarks.gerador --linhas 100000 --formato xlsx --saida speedio_100k.xlsx
+    python -m benchmarks.gerador --linhas 10000 --unificado --saida unificado_10k.xlsx
+"""
+import io
+import argparse
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+UFS = ["SP", "RJ", "MG", "PR", "SC", "RS", "BA", "PE", "CE", "GO", "DF", "ES", "PA", "AM", "MT"]
+CIDADES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Florianópolis", "Porto Alegre",
+           "Salvador", "Recife", "Fortaleza", "Goiânia", "Brasília", "Vitória", "Belém", "Manaus", "Cuiabá"]
+CNAES = ["Comércio varejista de artigos do vestuário", "Restaurantes e similares", "Desenvolvimento de software",
+         "Atividades de contabilidade", "Comércio varejista de mercadorias em geral", "Serviços de engenharia",
+         "Atividades de consultoria em gestão empresarial", "Transporte rodoviário de carga", "Cabeleireiros"]
+CARGOS = ["Sócio-Administrador", "Sócio", "Diretor", "Administrador", "Presidente"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+         "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sabrina", "Thiago", "Vanessa", "William"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes"]
+FILLS_CELULAR = ["FF00B050", "FFFFFF00", "FFFF0000"]  # verde, amarelo, vermelho
+
+N_TELEFONES = 4
+N_EMAILS = 3
+
+TAMANHOS = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "500k": 500_000}
+
+
+def _escolher(rng, opcoes, n):
+    return np.asarray(opcoes, dtype=object)[rng.integers(0, len(opcoes), n)]
+
+
+def _vazios(rng, serie, proporcao):
+    """Apaga uma fração dos valores (células vazias na planilha)"""
+    serie = serie.astype(object)
+    serie[rng.random(len(serie)) < proporcao] = None
+    return serie
+
+
+def _digitos(rng, n, tamanho):
+    return pd.Series(rng.integers(0, 10 ** tamanho, n)).astype(str).str.zfill(tamanho).to_numpy(dtype=object)
+
+
+def _telefones_sujos(rng, n, celular=False):
+    """Telefones nos formatos encontrados nas exportações: float com '.0', máscara, espaços, com/sem 55"""
+    ddd = rng.integers(11, 99, n).astype(str)
+    prefixo = np.where(celular, "9", rng.integers(2, 6, n).astype(str))
+    numero = _digitos(rng, n, 8 if celular else 7)
+    base = pd.Series(ddd.astype(object) + prefixo + numero)
+    estilo = rng.integers(0, 5, n)
+    sujos = base.copy()
+    sujos[estilo == 1] = base[estilo == 1] + ".0"
+    sujos[estilo == 2] = "(" + base[estilo == 2].str[:2] + ") " + base[estilo == 2].str[2:-4] + "-" + base[estilo == 2].str[-4:]
+    sujos[estilo == 3] = "55" + base[estilo == 3]
+    sujos[estilo == 4] = " " + base[estilo == 4].str[:2] + " " + base[estilo == 4].str[2:] + " "
+    return sujos.to_numpy(dtype=object)
+
+
+def _nomes(rng, n):
+    return pd.Series(_escolher(rng, NOMES, n)) + " " + pd.Series(_escolher(rng, SOBRENOMES, n))
+
+
+def _emails(rng, nomes: pd.Series, dominios: pd.Series):
+    emails = nomes.str.lower().str.replace(" ", ".", regex=False).str.normalize("NFKD") \
+        .str.encode("ascii", "ignore").str.decode("ascii") + "@" + dominios
+    estilo = rng.integers(0, 6, len(emails))
+    emails[estilo == 1] = " " + emails[estilo == 1].str.upper() + " "
+    emails[estilo == 2] = emails[estilo == 2].str.replace("@", " arroba ", regex=False)  # inválido
+    return emails.to_numpy(dtype=object)
+
+
+def _redes_sociais(rng, slugs: pd.Series):
+    n = len(slugs)
+    estilo = rng.integers(0, 6, n)
+    redes = pd.Series([None] * n, dtype=object)
+    redes[estilo == 1] = "https://www.instagram.com/" + slugs[estilo == 1]
+    redes[estilo == 2] = "https://facebook.com/" + slugs[estilo == 2]
+    redes[estilo == 3] = ("https://www.facebook.com/" + slugs[estilo == 3] + ", Instagram.com/" + slugs[estilo == 3] + "/")
+    redes[estilo == 4] = "@" + slugs[estilo == 4]
+    redes[estilo == 5] = ("linkedin.com/company/" + slugs[estilo == 5] + ",  https://INSTAGRAM.com/" + slugs[estilo == 5])
+    return redes.to_numpy(dtype=object)
+
+
+def gerar_speedio(linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Exportação bruta Speedio/Assertiva (entrada de /api/speedio_assertiva)"""
+    rng = np.random.default_rng(seed)
+    n = linhas
+    razao = _nomes(rng, n) + " " + pd.Series(_escolher(rng, ["LTDA", "ME", "EIRELI", "S/A"], n))
+    slugs = razao.str.lower().str.replace(r"[^a-z]", "", regex=True)
+    dominios = slugs.str[:12] + pd.Series(_escolher(rng, [".com.br", ".com", ".net"], n))
+
+    abertura = pd.Timestamp("1980-01-01") + pd.to_timedelta(rng.integers(0, 16000, n), unit="D")
+    datas = pd.Series(abertura.strftime("%d/%m/%Y"), dtype=object)
+    datas[rng.random(n) < 0.03] = "data inválida"
+
+    qtde = pd.Series(rng.choice([0, 3, 8, 25, 80, 300, 1200], n).astype(object))
+    qtde[rng.random(n) < 0.05] = "N/D"
+
+    numero = pd.Series(rng.integers(1, 9999, n).astype(str), dtype=object)
+    numero[rng.random(n) < 0.05] = "S/N"
+    numero[rng.random(n) < 0.01] = "1234567890123456789"
+
+    df = pd.DataFrame({
+        "CNPJ": _digitos(rng, n, 14),
+        "Razao": razao.to_numpy(dtype=object),
+        "Fantasia": _vazios(rng, razao.str.split(" ").str[0].to_numpy(dtype=object), 0.2),
+        "UF": _escolher(rng, UFS, n),
+        "Cidade": _escolher(rng, CIDADES, n),
+        "Logradouro": ("Rua " + pd.Series(_escolher(rng, SOBRENOMES, n))).to_numpy(dtype=object),
+        "Numero": numero.to_numpy(),
+        "Bairro": _escolher(rng, ["Centro", "Jardim América", "Vila Nova", "Boa Vista"], n),
+        "Complemento": _vazios(rng, _escolher(rng, ["Sala 1", "Loja B", "Andar 3"], n), 0.6),
+        "CEP": _digitos(rng, n, 8),
+        "DataAbertura": datas.to_numpy(),
+        "CNAEDescricao": _vazios(rng, _escolher(rng, CNAES, n), 0.02),
+        "QtdeFuncionarios": qtde.to_numpy(),
+        "Site": _vazios(rng, ("www." + dominios).to_numpy(dtype=object), 0.4),
+        "Rede Social": _redes_sociais(rng, slugs),
+    })
+    for j in range(1, N_TELEFONES + 1):
+        df[f"Telefone{j}"] = _vazios(rng, _telefones_sujos(rng, n), 0.2 * j)
+    for j in range(1, N_EMAILS + 1):
+        df[f"Email{j}"] = _vazios(rng, _emails(rng, _nomes(rng, n), dominios), 0.25 * j)
+    for i in range(1, 4):
+        presente = rng.random(n) < (1.0 - 0.3 * (i - 1))
+        nomes = _nomes(rng, n)
+        df[f"SOCIO{i}Nome"] = np.where(presente, nomes.to_numpy(dtype=object), None)
+        df[f"SOCIO{i}CPF"] = np.where(presente, _digitos(rng, n, 11), None)
+        df[f"SOCIO{i}Cargo"] = np.where(presente, _escolher(rng, CARGOS, n), None)
+        for j in (1, 2):
+            df[f"SOCIO{i}Email{j}"] = np.where(presente & (rng.random(n) < 0.7), _emails(rng, nomes, dominios), None)
+            df[f"SOCIO{i}Celular{j}"] = np.where(presente & (rng.random(n) < 0.8), _telefones_sujos(rng, n, celular=True), None)
+    return df
+
+
+def _juntar(colunas: pd.DataFrame) -> pd.Series:
+    primeira, *resto = [colunas[c].fillna("") for c in colunas.columns]
+    juntas = primeira.str.cat(resto, sep=", ")
+    return juntas.str.replace(r"(, )+", ", ", regex=True).str.strip(", ")
+
+
+def gerar_unificado(linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Planilha já unificada (entrada de converter_planilha, salesforce e extratores)"""
+    bruto = gerar_speedio(linhas, seed)
+    emails = bruto[[f"Email{j}" for j in range(1, N_EMAILS + 1)]]
+    telefones = bruto[[f"Telefone{j}" for j in range(1, N_TELEFONES + 1)]]
+    df = pd.DataFrame({
+        "CNPJ": bruto["CNPJ"],
+        "Nome do Lead": bruto["Razao"],
+        "Nome Fantasia": bruto["Fantasia"],
+        "Observação": None,
+        "Origem": None,
+        "Mercado": bruto["CNAEDescricao"],
+        "Site": bruto["Site"],
+        "Rede Social": bruto["Rede Social"],
+        "E-mails Válidos de Decisores": _juntar(emails.apply(lambda c: c.str.strip())),
+        "Estado": bruto["UF"],
+        "Cidade": bruto["Cidade"],
+        "Logradouro": bruto["Logradouro"],
+        "Número": bruto["Numero"],
+        "Bairro": bruto["Bairro"],
+        "Complemento": bruto["Complemento"],
+        "CEP": bruto["CEP"],
+        "Telefones": _juntar(telefones),
+    })
+    for i in range(1, 4):
+        for campo in ("Nome", "CPF", "Cargo", "Email1", "Email2", "Celular1", "Celular2"):
+            df[f"SOCIO{i}{campo}"] = bruto[f"SOCIO{i}{campo}"]
+        df[f"SOCIO{i}Linkedin"] = None
+    return df
+
+
+def para_xlsx(df: pd.DataFrame, preencher_celulares: bool = True, seed: int = 42) -> bytes:
+    """
+    Serializa em xlsx. Com `preencher_celulares`, as células SOCIOxCelularY recebem
+    cores de preenchimento, como as planilhas marcadas à mão que o /api/salesforce preserva.
+    """
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True, "in_memory": True})
+    worksheet = workbook.add_worksheet("main")
+    formatos = [workbook.add_format({"bg_color": "#" + cor[2:], "pattern": 1}) for cor in FILLS_CELULAR]
+
+    colunas = list(df.columns)
+    celulares = {idx for idx, col in enumerate(colunas) if col.startswith("SOCIO") and "Celular" in col}
+    worksheet.write_row(0, 0, colunas)
+    sorteio = rng.integers(0, len(formatos) * 2, (len(df), len(colunas)))
+    for linha, valores in enumerate(df.itertuples(index=False, name=None), start=1):
+        for col, valor in enumerate(valores):
+            if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+                continue
+            formato = None
+            if preencher_celulares and col in celulares and sorteio[linha - 1, col] < len(formatos):
+                formato = formatos[sorteio[linha - 1, col]]
+            worksheet.write(linha, col, valor, formato)
+    workbook.close()
+    return buffer.getvalue()
+
+
+def para_csv(df: pd.DataFrame, encoding: str = "latin-1") -> bytes:
+    return df.to_csv(index=False).encode(encoding, errors="replace")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas Speedio/Assertiva")
+    parser.add_argument("--linhas", type=int, default=10_000)
+    parser.add_argument("--formato", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--unificado", action="store_true", help="Gera a planilha já unificada")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", required=True)
+    args = parser.parse_args()
+
+    gerar = gerar_unificado if args.unificado else gerar_speedio
+    df = gerar(args.linhas, args.seed)
+    conteudo = para_xlsx(df, seed=args.seed) if args.formato == "xlsx" else para_csv(df)
+    with open(args.saida, "wb") as f:
+        f.write(conteudo)
+    print(f"{args.saida}: {len(df)} linhas, {len(conteudo) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Controle de admissão das rotas pesadas sob sobrecarga.
+
+Com mais requisições simultâneas do que vagas + fila, as excedentes devem
+voltar logo com 503 e Retry-After, enquanto as admitidas terminam normalmente.
+"""
+import time
+import asyncio
+
+import httpx
+from starlette.responses import PlainTextResponse
+
+from backend import admissao
+from backend.admissao import AdmissaoMiddleware
+
+DURACAO_S = 0.2
+
+
+async def _conversao_lenta(scope, receive, send):
+    await asyncio.sleep(DURACAO_S)
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+async def _disparar(app, total: int):
+    async def requisicao(http):
+        inicio = time.perf_counter()
+        resposta = await http.post("/api/converter_planilha", content=b"x" * 1024)
+        return resposta, time.perf_counter() - inicio
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+        return await asyncio.gather(*(requisicao(http) for _ in range(total)))
+
+
+def test_sobrecarga_recusa_com_503_e_retry_after(monkeypatch):
+    monkeypatch.setattr(admissao, "ADMISSAO_CONCORRENCIA", 2)
+    monkeypatch.setattr(admissao, "ADMISSAO_FILA", 2)
+    app = AdmissaoMiddleware(_conversao_lenta)
+
+    resultados = asyncio.run(_disparar(app, 10))
+    status = sorted(resposta.status_code for resposta, _ in resultados)
+    assert status == [200] * 4 + [503] * 6
+
+    recusadas = [(resposta, tempo) for resposta, tempo in resultados if resposta.status_code == 503]
+    assert all(int(resposta.headers["Retry-After"]) >= 1 for resposta, _ in recusadas)
+    # A recusa não espera a fila andar
+    assert max(tempo for _, tempo in recusadas) < DURACAO_S
+    assert admissao._memoria["reservada"] == 0
+
+
+def test_fila_respeita_o_tempo_maximo_de_espera(monkeypatch):
+    monkeypatch.setattr(admissao, "ADMISSAO_CONCORRENCIA", 1)
+    monkeypatch.setattr(admissao, "ADMISSAO_ESPERA_MAX_S", DURACAO_S * 1.5)
+    app = AdmissaoMiddleware(_conversao_lenta)
+
+    resultados = asyncio.run(_disparar(app, 3))
+    # 1ª executa, 2ª entra quando ela termina, 3ª desiste antes da sua vez
+    assert sorted(resposta.status_code for resposta, _ in resultados) == [200, 200, 503]
@@ -0,0 +1,54 @@
+"""
+Respostas JSON grandes: orjson e compressão negociada (brotli/gzip).
+"""
+import time
+import asyncio
+
+import httpx
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
+
+from backend.compressao import CompressaoMiddleware, escolher_codificacao
+
+EMAILS = [f"pessoa.{i}@empresa{i % 5000}.com.br" for i in range(100_000)]
+
+
+async def _emails(scope, receive, send):
+    await ORJSONResponse({"emails": EMAILS, "excel_base64": None})(scope, receive, send)
+
+
+async def _arquivo(scope, receive, send):
+    await Response(b"PK" * 10_000, media_type="application/zip")(scope, receive, send)
+
+
+async def _get(app, accept_encoding: str):
+    transporte = httpx.ASGITransport(app=CompressaoMiddleware(app))
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+        inicio = time.perf_counter()
+        resposta = await http.get("/", headers={"Accept-Encoding": accept_encoding})
+        return resposta, time.perf_counter() - inicio
+
+
+def test_negociacao_da_codificacao():
+    assert escolher_codificacao("gzip, deflate, br") == "br"
+    assert escolher_codificacao("br;q=0.5, gzip") == "gzip"
+    assert escolher_codificacao("gzip;q=0, br;q=0") is None
+    assert escolher_codificacao("identity") is None
+
+
+def test_json_grande_sai_comprimido():
+    sem, _ = asyncio.run(_get(_emails, "identity"))
+    tamanho_original = int(sem.headers["content-length"])
+    for codificacao in ("br", "gzip"):
+        resposta, tempo = asyncio.run(_get(_emails, codificacao))
+        assert resposta.headers["content-encoding"] == codificacao
+        assert resposta.json()["emails"] == EMAILS
+        reducao = tamanho_original / int(resposta.headers["content-length"])
+        print(f"\n{codificacao}: {tamanho_original} -> {resposta.headers['content-length']} bytes "
+              f"({reducao:.1f}x) em {tempo:.3f}s")
+        assert reducao > 5
+
+
+def test_arquivo_binario_nao_e_recomprimido():
+    resposta, _ = asyncio.run(_get(_arquivo, "br, gzip"))
+    assert "content-encoding" not in resposta.headers
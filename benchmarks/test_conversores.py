@@ -0,0 +1,165 @@
+"""
+Benchmarks das funções centrais de cada router (sem HTTP).
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks
+    BENCH_TAMANHOS=10k,100k,500k pytest benchmarks --benchmark-json=bench.json
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerador import TAMANHOS
+from backend.converter_planilha import converter_planilha, processar_converter_planilha
+from backend.speedio_assertiva import (
+    transformar_speedio_assertiva, processar_speedio_assertiva, processar_speedio_streaming,
+    mesclar_por_cnpj, processar_lote, unificar_arquivo_arrow,
+)
+from backend.salesforce import transformar_salesforce, processar_salesforce
+from backend.extrair_numero import montar_contatos, extrair_contatos
+from backend.extrair_email import extrair_emails
+from backend.pipeline import processar_pipeline
+from backend.tipos_compactos import compactar, para_arrow, de_arrow
+
+
+def _ler_unificado(planilhas, tamanho):
+    # Como os routers leem: tudo texto, com strings Arrow e categorias
+    return compactar(pd.read_csv(io.BytesIO(planilhas("unificado", tamanho, "csv")), dtype=str, encoding="latin-1"))
+
+
+# --- speedio_assertiva ---
+def test_speedio_assertiva_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("speedio", tamanho)
+    medir(processar_speedio_assertiva, conteudo, "speedio.xlsx", linhas=TAMANHOS[tamanho])
+
+
+def test_speedio_assertiva_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("speedio", tamanho, "csv")
+    medir(processar_speedio_assertiva, conteudo, "speedio.csv", linhas=TAMANHOS[tamanho])
+
+
+def test_speedio_assertiva_saida_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("speedio", tamanho)
+    medir(processar_speedio_assertiva, conteudo, "speedio.xlsx", "csv", linhas=TAMANHOS[tamanho])
+
+
+def test_speedio_assertiva_streaming_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("speedio", tamanho)
+    medir(processar_speedio_streaming, conteudo, "speedio.xlsx", linhas=TAMANHOS[tamanho])
+
+
+def test_speedio_assertiva_transformacao(medir, planilhas, tamanho):
+    df = pd.read_csv(io.BytesIO(planilhas("speedio", tamanho, "csv")))
+    medir(transformar_speedio_assertiva, df, linhas=TAMANHOS[tamanho])
+
+
+def test_speedio_assertiva_mesclagem(medir, planilhas, tamanho):
+    # Três "fatias" do mesmo export com metade das linhas repetidas entre elas
+    df_saida = transformar_speedio_assertiva(pd.read_csv(io.BytesIO(planilhas("speedio", tamanho, "csv"))))
+    metade = len(df_saida) // 2
+    fatias = [df_saida, df_saida.iloc[:metade], df_saida.iloc[metade:]]
+    medir(mesclar_por_cnpj, fatias, linhas=2 * len(df_saida))
+
+
+def test_speedio_assertiva_lote_de_arquivos(medir, planilhas, tamanho):
+    # O mesmo export duas vezes: cada CNPJ aparece em ambos e vira uma linha só
+    conteudo = planilhas("speedio", tamanho, "csv")
+    unificados = [unificar_arquivo_arrow(conteudo, "fatia1.csv"), unificar_arquivo_arrow(conteudo, "fatia2.csv")]
+    saida, estatisticas = medir(processar_lote, unificados, "csv", linhas=2 * TAMANHOS[tamanho])
+    assert estatisticas["arquivos"] == 2 and estatisticas["linhas_lidas"] == 2 * TAMANHOS[tamanho]
+    assert estatisticas["linhas_saida"] == estatisticas["linhas_lidas"] - estatisticas["duplicados"]
+
+
+# --- converter_planilha ---
+def test_converter_planilha_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho)
+    medir(processar_converter_planilha, conteudo, "unificado.xlsx", "Funil", "Usuário", linhas=TAMANHOS[tamanho])
+
+
+def test_converter_planilha_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho, "csv")
+    medir(processar_converter_planilha, conteudo, "unificado.csv", "Funil", "Usuário", linhas=TAMANHOS[tamanho])
+
+
+def test_converter_planilha_saida_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho, "csv")
+    medir(processar_converter_planilha, conteudo, "unificado.csv", "Funil", "Usuário", "csv",
+          linhas=TAMANHOS[tamanho])
+
+
+def test_converter_planilha_transformacao(medir, planilhas, tamanho):
+    df = _ler_unificado(planilhas, tamanho)
+    medir(converter_planilha, df, "Funil", "Usuário", linhas=TAMANHOS[tamanho])
+
+
+# --- salesforce ---
+def test_salesforce_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho)
+    medir(processar_salesforce, conteudo, linhas=TAMANHOS[tamanho])
+
+
+def test_salesforce_saida_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho)
+    medir(processar_salesforce, conteudo, "csv", linhas=TAMANHOS[tamanho])
+
+
+def test_salesforce_delta_sem_novidades(medir, planilhas, tamanho, tmp_path, monkeypatch):
+    # Segunda conversão da mesma planilha: tudo é pulado pelo índice de leads
+    monkeypatch.setattr("backend.indice_leads.LEADS_DB_PATH", str(tmp_path / "leads.sqlite3"))
+    conteudo = planilhas("unificado", tamanho)
+    processar_salesforce(conteudo, "xlsx", True)
+    medir(processar_salesforce, conteudo, "xlsx", True, linhas=TAMANHOS[tamanho])
+
+
+def test_salesforce_transformacao(medir, planilhas, tamanho):
+    df = _ler_unificado(planilhas, tamanho)
+    medir(transformar_salesforce, df, linhas=TAMANHOS[tamanho])
+
+
+# --- extratores ---
+def test_extrator_numero_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho)
+    medir(extrair_contatos, conteudo, "unificado.xlsx", linhas=TAMANHOS[tamanho])
+
+
+def test_extrator_numero_transformacao(medir, planilhas, tamanho):
+    df = _ler_unificado(planilhas, tamanho)
+    medir(montar_contatos, df, linhas=TAMANHOS[tamanho])
+
+
+def test_extrator_email_xlsx(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho)
+    medir(extrair_emails, conteudo, "unificado.xlsx", linhas=TAMANHOS[tamanho])
+
+
+def test_extrator_email_csv(medir, planilhas, tamanho):
+    conteudo = planilhas("unificado", tamanho, "csv")
+    medir(extrair_emails, conteudo, "unificado.csv", linhas=TAMANHOS[tamanho])
+
+
+# --- pipeline ---
+def test_pipeline_todos_os_alvos(medir, planilhas, tamanho):
+    conteudo = planilhas("speedio", tamanho)
+    alvos = ["salesforce", "converter_planilha", "extrator-numero", "extrator-email"]
+    medir(processar_pipeline, conteudo, "speedio.xlsx", alvos, "xlsx", "Funil", "Usuário", linhas=TAMANHOS[tamanho])
+
+
+# --- tipos compactos ---
+def test_tipos_compactos(medir, benchmark, planilhas, tamanho):
+    df = pd.read_csv(io.BytesIO(planilhas("unificado", tamanho, "csv")), dtype=str, encoding="latin-1")
+    compacto = medir(compactar, df, linhas=TAMANHOS[tamanho])
+    antes, depois = df.memory_usage(deep=True).sum(), compacto.memory_usage(deep=True).sum()
+    benchmark.extra_info.update({"memoria_df_mb": round(antes / 1e6, 1), "memoria_compacto_mb": round(depois / 1e6, 1)})
+    assert depois < antes / 2
+
+
+def test_troca_arrow_preserva_tipos():
+    # Como as saídas dos arquivos do lote voltam do pool: strings Arrow, category e colunas mistas intactas
+    df = compactar(pd.DataFrame({
+        "Número": [12, "S/N", np.nan], "Nome": ["A", None, "C"], "Estado": ["SP", "", "SP"],
+        "Vazia": pd.Series([np.nan] * 3, dtype=object), "Valor": [1.5, 2.0, 3.0],
+    }))
+    volta = de_arrow(para_arrow(df))
+    assert volta.dtypes.tolist() == df.dtypes.tolist()
+    assert volta.equals(df) and [type(v) for v in volta["Número"][:2]] == [int, str]
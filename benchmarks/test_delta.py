@@ -0,0 +1,103 @@
+"""
+Modo delta: só linhas novas, alteradas ou sem CNPJ saem na segunda conversão,
+com as contagens nos headers X-Delta-* e as cores dos celulares na linha certa.
+"""
+import io
+import asyncio
+import zipfile
+
+import httpx
+import openpyxl
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+
+from benchmarks.gerador import gerar_unificado, para_xlsx
+from backend.converter_planilha import processar_converter_planilha
+from backend.salesforce import router, gerar_xlsx_com_cores, transformar_salesforce
+from backend.tipos_compactos import compactar
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ALTERADAS = [3, 7, 11]
+
+
+@pytest.fixture(autouse=True)
+def indice(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.indice_leads.LEADS_DB_PATH", str(tmp_path / "leads.sqlite3"))
+
+
+def _planilhas():
+    """Primeira planilha e a segunda: 3 linhas alteradas, 4 novas e 2 sem CNPJ"""
+    primeira = gerar_unificado(20)
+    segunda = primeira.copy()
+    segunda.loc[ALTERADAS, "SOCIO1Nome"] = "Sócio Trocado"
+    novas = gerar_unificado(4, seed=7)
+    sem_cnpj = gerar_unificado(2, seed=8).assign(CNPJ=None)
+    segunda = pd.concat([segunda, novas, sem_cnpj], ignore_index=True)
+    esperados = set(primeira.loc[ALTERADAS, "CNPJ"]) | set(novas["CNPJ"])
+    return primeira, segunda, esperados
+
+
+def _salesforce(conteudo: bytes, dados: dict):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+            return await http.post("/api/salesforce", files={"file": ("leads.xlsx", conteudo, XLSX)}, data=dados)
+
+    return asyncio.run(enviar())
+
+
+def test_salesforce_delta_parcial():
+    primeira, segunda, esperados = _planilhas()
+    dados = {"delta": "true", "formato": "csv"}
+    assert _salesforce(para_xlsx(primeira), dados).headers["X-Delta-Novos"] == "20"
+
+    resposta = _salesforce(para_xlsx(segunda), dados)
+    assert resposta.status_code == 200
+    assert {nome: resposta.headers[nome] for nome in (
+        "X-Delta-Novos", "X-Delta-Alterados", "X-Delta-Ignorados", "X-Delta-Sem-Cnpj",
+    )} == {"X-Delta-Novos": "4", "X-Delta-Alterados": "3", "X-Delta-Ignorados": "17", "X-Delta-Sem-Cnpj": "2"}
+
+    saida = pd.read_csv(io.BytesIO(resposta.content), dtype=str)
+    assert len(saida) == 9
+    assert set(saida["Documento__c"].dropna()) == esperados
+    assert saida["Documento__c"].isna().sum() == 2
+
+
+def test_converter_planilha_delta_parcial():
+    primeira, segunda, esperados = _planilhas()
+    processar_converter_planilha(para_xlsx(primeira), "leads.xlsx", "Funil", "Usuário", "csv", True)
+    zip_bytes, estatisticas = processar_converter_planilha(
+        para_xlsx(segunda), "leads.xlsx", "Funil", "Usuário", "csv", True
+    )
+    assert estatisticas == {"novos": 4, "alterados": 3, "ignorados": 17, "sem_cnpj": 2}
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zipf:
+        empresas = pd.read_csv(io.BytesIO(zipf.read("Empresas.csv")), dtype=str)
+    assert len(empresas) == 9
+    assert set(empresas["CNPJ"].dropna()) == esperados
+
+
+def test_cores_nas_linhas_filtradas():
+    conteudo = para_xlsx(gerar_unificado(30))
+    df = compactar(pd.read_excel(io.BytesIO(conteudo), dtype=str))
+    # Como sai do filtrar_delta: linhas a menos, índice com a posição original
+    filtrado = df.iloc[1::3]
+    saida = gerar_xlsx_com_cores(conteudo, transformar_salesforce(filtrado))
+
+    original = openpyxl.load_workbook(io.BytesIO(conteudo)).active
+    nova = openpyxl.load_workbook(io.BytesIO(saida)).active
+    col_original = [c.value for c in original[1]].index("SOCIO1Celular1") + 1
+    col_nova = [c.value for c in nova[1]].index("Contato_1_Telefone__c") + 1
+
+    coloridas = 0
+    for linha, posicao in enumerate(filtrado.index, start=2):
+        celula = original.cell(row=posicao + 2, column=col_original)
+        cor = celula.fill.start_color.rgb
+        assert nova.cell(row=linha, column=col_nova).value == celula.value
+        assert nova.cell(row=linha, column=col_nova).fill.start_color.rgb == cor
+        coloridas += cor != "00000000"
+    assert coloridas > 0
@@ -0,0 +1,81 @@
+"""
+Escolha do formato de saída (parâmetro x Accept) e serialização de cada formato.
+"""
+import io
+import json
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from backend.formatos import escolher_formato, serializar
+from backend.tipos_compactos import compactar
+
+
+@pytest.mark.parametrize("formato, accept, esperado", [
+    (None, None, "xlsx"),
+    ("CSV", None, "csv"),
+    (".parquet", None, "parquet"),
+    # O parâmetro vale mais que o header
+    ("ndjson", "text/csv", "ndjson"),
+    # Maior q vence; no empate, o primeiro da lista
+    (None, "text/csv;q=0.5, application/x-ndjson;q=0.9", "ndjson"),
+    (None, "application/x-parquet, text/csv", "parquet"),
+    (None, "text/csv;q=0, application/jsonl;q=0.1", "ndjson"),
+    (None, "text/csv;q=abc", "csv"),
+    # */* é o padrão, com o q dele
+    (None, "*/*", "xlsx"),
+    (None, "text/csv;q=0.5, */*;q=0.8", "xlsx"),
+    (None, "*/*;q=0.1, text/csv", "csv"),
+    # Nada que geramos: xlsx em vez de 406
+    (None, "application/pdf, image/png", "xlsx"),
+    (None, "text/csv;q=0", "xlsx"),
+])
+def test_escolher_formato(formato, accept, esperado):
+    assert escolher_formato(formato, accept) == esperado
+
+
+def test_formato_invalido():
+    with pytest.raises(HTTPException) as erro:
+        escolher_formato("pdf", "text/csv")
+    assert erro.value.status_code == 400
+
+
+@pytest.fixture
+def df():
+    return compactar(pd.DataFrame({
+        "CNPJ": ["00123456000190", "98765432000110", None],
+        "Estado": ["SP", "SP", "RJ"],
+        "Número": [12, "S/N", None],
+        "Nome": ["Ação Ltda", "", "Zé"],
+    }))
+
+
+def _texto(df):
+    return df.astype(object).where(df.notna(), None).map(lambda v: None if v in (None, "") else str(v))
+
+
+def test_serializar_csv(df):
+    lido = pd.read_csv(io.BytesIO(serializar(df, "csv")), dtype=str)
+    assert list(lido.columns) == list(df.columns)
+    pd.testing.assert_frame_equal(_texto(lido), _texto(df))
+
+
+def test_serializar_ndjson(df):
+    linhas = [json.loads(linha) for linha in serializar(df, "ndjson").decode("utf-8").splitlines()]
+    assert linhas[0] == {"CNPJ": "00123456000190", "Estado": "SP", "Número": 12, "Nome": "Ação Ltda"}
+    assert linhas[1]["Número"] == "S/N" and linhas[2]["CNPJ"] is None
+    assert serializar(df.iloc[:0], "ndjson") == b""
+
+
+def test_serializar_parquet(df):
+    lido = pd.read_parquet(io.BytesIO(serializar(df, "parquet")))
+    assert list(lido.columns) == list(df.columns)
+    # Colunas mistas e category voltam como texto
+    pd.testing.assert_frame_equal(_texto(lido), _texto(df))
+    assert lido["Número"].tolist()[:2] == ["12", "S/N"]
+
+
+def test_serializar_formato_desconhecido(df):
+    with pytest.raises(ValueError):
+        serializar(df, "pdf")
@@ -0,0 +1,49 @@
+"""
+Perfil de importação do backend (cold start).
+
+O app deve subir sem GEMINI_API_KEY e sem carregar pandas, Gemini, fpdf,
+mutagen ou openpyxl, que só são importados na primeira rota que os usa.
+"""
+import os
+import sys
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_MAX_SEGUNDOS = float(os.getenv("BENCH_IMPORT_MAX_S", "1.5"))
+MODULOS_PESADOS = ["pandas", "numpy", "google.generativeai", "fpdf", "mutagen", "openpyxl", "xlsxwriter", "requests"]
+
+
+def _importar_app(codigo: str = ""):
+    env = {k: v for k, v in os.environ.items() if k not in ("GEMINI_API_KEY", "NEXT_PUBLIC_RAPIDAPI_URL")}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import backend.app\n{codigo}"],
+        cwd=RAIZ, env=env, capture_output=True, text=True,
+    )
+
+
+def _perfil(stderr: str) -> list:
+    """[(cumulativo_us, modulo)] do -X importtime, do mais lento ao mais rápido"""
+    perfil = []
+    for linha in stderr.splitlines():
+        if linha.startswith("import time:") and "|" in linha:
+            _, cumulativo, modulo = linha.split("|")
+            if cumulativo.strip().isdigit():
+                perfil.append((int(cumulativo), modulo.strip()))
+    return sorted(perfil, reverse=True)
+
+
+def test_app_importa_sem_gemini_e_sem_dependencias_pesadas():
+    resultado = _importar_app(f"import sys; print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))")
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+    carregados = [m for m in resultado.stdout.strip().split(",") if m]
+    assert carregados == [], f"Importados no start: {carregados}"
+
+
+def test_tempo_de_importacao_do_app():
+    resultado = _importar_app()
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+    perfil = _perfil(resultado.stderr)
+    total = next(us for us, modulo in perfil if modulo == "backend.app") / 1e6
+    mais_lentos = "\n".join(f"{us / 1e3:8.1f} ms  {modulo}" for us, modulo in perfil[:15])
+    print(f"\nimport backend.app: {total:.3f}s\n{mais_lentos}")
+    assert total < IMPORT_MAX_SEGUNDOS, f"import backend.app levou {total:.3f}s\n{mais_lentos}"
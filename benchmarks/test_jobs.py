@@ -0,0 +1,73 @@
+"""
+Fila de jobs: progresso gravado a cada etapa do conversor.
+"""
+import io
+import asyncio
+import sqlite3
+import zipfile
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.gerador import gerar_speedio, para_xlsx
+from backend import jobs
+from backend.observabilidade import medir_etapa
+
+
+def _progresso(job_id):
+    conn = sqlite3.connect(jobs.JOBS_DB_PATH)
+    try:
+        return conn.execute("SELECT progresso FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_progresso_por_etapa(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path))
+    vistos = []
+
+    def conversor(conteudo, filename):
+        for etapa in ("parse", "transform", "serialize", "transform"):
+            with medir_etapa("/api/teste", etapa):
+                vistos.append(_progresso("j1"))
+        return conteudo.upper(), "saida.txt", "text/plain"
+
+    monkeypatch.setitem(jobs.TIPOS_JOB, "teste", {"func": conversor, "parametros": [], "limite": 1})
+    jobs.criar_tabelas()
+    jobs.enfileirar_job("j1", "teste", {}, "entrada.txt", io.BytesIO(b"abc"))
+    jobs.executar_job("j1")
+
+    # Só avança, mesmo com uma etapa repetida no fim
+    assert vistos == [0.1, 0.5, 0.8, 0.8]
+    job = jobs._buscar_job("j1")
+    assert job["status"] == jobs.CONCLUIDO and job["progresso"] == 1.0
+    assert (tmp_path / "j1.saida").read_bytes() == b"ABC"
+
+
+def test_job_do_pipeline(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/api")
+    arquivo = {"file": ("speedio.xlsx", para_xlsx(gerar_speedio(20)))}
+
+    async def enviar(dados):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+            return await http.post("/api/jobs", files=arquivo, data=dados)
+
+    jobs.criar_tabelas()
+    # Validado na criação, como no /api/pipeline
+    assert asyncio.run(enviar({"tipo": "pipeline"})).status_code == 400
+    assert asyncio.run(enviar({"tipo": "pipeline", "alvos": "converter_planilha"})).status_code == 400
+
+    resposta = asyncio.run(enviar({"tipo": "pipeline", "alvos": "salesforce,extrator-email", "formato": "csv"}))
+    assert resposta.status_code == 202
+    job_id = resposta.json()["id"]
+    jobs.executar_job(job_id)
+
+    job = jobs._buscar_job(job_id)
+    assert job["status"] == jobs.CONCLUIDO and job["nome_saida"] == "pipeline.zip"
+    with zipfile.ZipFile(tmp_path / f"{job_id}.saida") as zipf:
+        assert zipf.namelist() == ["salesforce/Salesforce.csv", "extrator-email/Emails.csv"]
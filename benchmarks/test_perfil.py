@@ -0,0 +1,48 @@
+"""
+Modo de perfil por requisição (X-Perfil).
+
+Sem o header nada muda; com o token, a resposta traz o resumo no header e o
+perfil completo (pilhas e tempos por etapa) fica salvo para download.
+"""
+import json
+import asyncio
+
+import httpx
+from starlette.responses import PlainTextResponse
+
+from backend import perfil
+from backend.perfil import PerfilMiddleware
+from backend.processamento import executar_no_pool
+from backend.observabilidade import medir_etapa
+
+
+def _conversao(n: int) -> int:
+    with medir_etapa("/api/teste", "transform"):
+        return sum(i * i for i in range(n))
+
+
+async def _rota(scope, receive, send):
+    total = await executar_no_pool(_conversao, 2_000_000)
+    await PlainTextResponse(str(total))(scope, receive, send)
+
+
+async def _enviar(headers: dict):
+    transporte = httpx.ASGITransport(app=PerfilMiddleware(_rota))
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+        return await http.post("/api/teste", headers=headers)
+
+
+def test_perfil_so_com_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfil, "PERFIL_TOKEN", "segredo")
+    monkeypatch.setattr(perfil, "PERFIL_DIR", str(tmp_path))
+
+    assert "x-perfil" not in asyncio.run(_enviar({})).headers
+    assert asyncio.run(_enviar({"X-Perfil": "outro"})).status_code == 403
+
+    resposta = asyncio.run(_enviar({"X-Perfil": "segredo"}))
+    assert resposta.status_code == 200
+    resumo = dict(item.split("=") for item in resposta.headers["x-perfil"].split("; "))
+    assert float(resumo["cpu_s"]) > 0 and float(resumo["transform_s"]) > 0
+
+    salvo = json.loads((tmp_path / f"{resumo['id']}.json").read_text(encoding="utf-8"))
+    assert any("_conversao" in pilha for pilha in salvo["pilhas_ms"])
@@ -0,0 +1,66 @@
+"""
+/api/pipeline contra o fluxo encadeado (speedio_assertiva, baixar o xlsx
+unificado e reenviá-lo a cada conversor): o ZIP deve trazer os mesmos arquivos.
+"""
+import io
+import asyncio
+import zipfile
+
+import httpx
+import pandas as pd
+from fastapi import FastAPI
+
+from benchmarks.gerador import gerar_speedio, para_xlsx
+from backend import pipeline, speedio_assertiva, salesforce, converter_planilha
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CAMPOS = {"formato": "csv", "funil": "Funil", "usuario_responsavel": "Usuário"}
+
+
+def _ler(conteudo: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(conteudo), dtype=str)
+
+
+def _sem_segundo_cabecalho(conteudo: bytes) -> pd.DataFrame:
+    # O xlsx unificado tem duas linhas de cabeçalho e os conversores leem a
+    # segunda como dado; o pipeline não serializa o xlsx e não tem essa linha
+    return _ler(conteudo).iloc[1:].reset_index(drop=True)
+
+
+def test_pipeline_igual_ao_fluxo_encadeado():
+    app = FastAPI()
+    for modulo in (pipeline, speedio_assertiva, salesforce, converter_planilha):
+        app.include_router(modulo.router, prefix="/api")
+    bruto = para_xlsx(gerar_speedio(50))
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+            def arquivo(conteudo):
+                return {"file": ("planilha.xlsx", conteudo, XLSX)}
+
+            combinado = await http.post("/api/pipeline", files=arquivo(bruto), data={
+                **CAMPOS, "alvos": "speedio_assertiva,salesforce,converter_planilha",
+            })
+            unificado_csv = await http.post("/api/speedio_assertiva", files=arquivo(bruto), data={"formato": "csv"})
+            unificado = await http.post("/api/speedio_assertiva", files=arquivo(bruto))
+            sf = await http.post("/api/salesforce", files=arquivo(unificado.content), data={"formato": "csv"})
+            convertido = await http.post("/api/converter_planilha", files=arquivo(unificado.content), data=CAMPOS)
+            return combinado, unificado_csv, sf, convertido
+
+    combinado, unificado_csv, sf, convertido = asyncio.run(enviar())
+    for resposta in (combinado, unificado_csv, sf, convertido):
+        assert resposta.status_code == 200
+
+    encadeado = {
+        "speedio_assertiva/Speedio_Assertiva_Unificado.csv": _ler(unificado_csv.content),
+        "salesforce/Salesforce.csv": _sem_segundo_cabecalho(sf.content),
+    }
+    with zipfile.ZipFile(io.BytesIO(convertido.content)) as zipf:
+        for nome in zipf.namelist():
+            encadeado[f"converter_planilha/{nome}"] = _sem_segundo_cabecalho(zipf.read(nome))
+
+    with zipfile.ZipFile(io.BytesIO(combinado.content)) as zipf:
+        assert sorted(zipf.namelist()) == sorted(encadeado)
+        for nome, esperado in encadeado.items():
+            pd.testing.assert_frame_equal(_ler(zipf.read(nome)), esperado, obj=nome)
@@ -0,0 +1,57 @@
+"""
+Pool de processos das conversões: recuperação após a morte de um filho e
+métricas das conversões que falham.
+"""
+import os
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend import processamento
+from backend.observabilidade import STAGE_DURATION, medir_etapa
+
+
+def _dobro(n: int) -> int:
+    return 2 * n
+
+
+def _morrer(n: int) -> int:
+    # Simula o OOM killer: o processo some sem levantar exceção
+    os._exit(1)
+
+
+def _falhar(n: int) -> int:
+    with medir_etapa("/api/teste", "parse"):
+        raise ValueError("planilha corrompida")
+
+
+def _amostras(etapa: str) -> float:
+    return STAGE_DURATION.labels("/api/teste", etapa)._sum.get()
+
+
+@pytest.fixture
+def pool():
+    processamento.iniciar_pool(1)
+    yield
+    processamento.encerrar_pool()
+
+
+def test_pool_recriado_apos_morte_do_processo(pool):
+    async def cenario():
+        assert await processamento.executar_no_pool(_dobro, 2) == 4
+        with pytest.raises(HTTPException) as erro:
+            await processamento.executar_no_pool(_morrer, 2)
+        assert erro.value.status_code == 503 and "Retry-After" in erro.value.headers
+        return await processamento.executar_no_pool(_dobro, 3)
+
+    quebrado = processamento._executor
+    assert asyncio.run(cenario()) == 6
+    assert processamento._executor is not quebrado
+
+
+def test_metricas_de_conversao_que_falha(pool):
+    antes = _amostras("parse")
+    with pytest.raises(ValueError, match="corrompida"):
+        asyncio.run(processamento.executar_no_pool(_falhar, 1))
+    assert _amostras("parse") > antes
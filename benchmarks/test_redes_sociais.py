@@ -0,0 +1,39 @@
+"""
+Extração de links de "Rede Social" compartilhada (converter_planilha e salesforce).
+
+    BENCH_TAMANHOS=100k,500k pytest benchmarks/test_redes_sociais.py
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerador import TAMANHOS, _redes_sociais
+from backend.redes_sociais import extrair_links
+from backend.tipos_compactos import compactar
+
+
+def test_formatos_das_exportacoes():
+    redes = pd.Series([
+        "linkedin.com/company/Loja,  https://INSTAGRAM.com/Loja",
+        "https://www.facebook.com/loja, Instagram.com/loja/",
+        "@loja_oficial",
+        "www.loja.com.br, facebook.com/loja",
+        "sem link", None,
+    ], index=range(10, 16))
+    site = pd.Series(["", "", " WWW.Loja.com ", None, None, None], index=redes.index)
+    links = extrair_links(redes, site)
+    assert links.index.equals(redes.index)
+    assert links.loc[10].tolist() == ["", "http://instagram.com/loja", "http://linkedin.com/company/loja", ""]
+    assert links.loc[11].tolist() == ["http://facebook.com/loja", "http://instagram.com/loja/", "", ""]
+    assert links.loc[12].tolist() == ["", "http://instagram.com/loja_oficial", "", "http://www.loja.com"]
+    # Sem a coluna Site, vale o primeiro link que não é de rede social
+    assert links.loc[13].tolist() == ["http://facebook.com/loja", "", "", "http://www.loja.com.br"]
+    assert (links.loc[14:] == "").all().all()
+
+
+def test_extracao_da_coluna(medir, tamanho):
+    linhas = TAMANHOS[tamanho]
+    slugs = pd.Series([f"empresa{i}" for i in range(linhas)])
+    redes = compactar(pd.DataFrame({"Rede Social": _redes_sociais(np.random.default_rng(0), slugs)}))["Rede Social"]
+    links = medir(extrair_links, redes, linhas=linhas)
+    preenchidas = redes.notna().to_numpy()
+    assert ((links.loc[preenchidas] != "").any(axis=1)).all()
@@ -0,0 +1,52 @@
+"""
+Erros do endpoint /api/speedio_assertiva que precisam chegar ao cliente como 400.
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.gerador import gerar_speedio, para_xlsx
+from backend import speedio_assertiva
+from backend.speedio_assertiva import router
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _enviar(arquivos: list, dados: dict):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+            return await http.post("/api/speedio_assertiva", files=[("file", a) for a in arquivos], data=dados)
+
+    return asyncio.run(enviar())
+
+
+def test_streaming_acima_do_limite_do_excel(monkeypatch):
+    # Limite reduzido: 2 linhas de cabeçalho + 50 de dados não cabem em 40
+    monkeypatch.setattr(speedio_assertiva, "LIMITE_LINHAS_XLSX", 40)
+    conteudo = para_xlsx(gerar_speedio(50))
+    resposta = _enviar([("speedio.xlsx", conteudo, XLSX)], {"streaming": "true", "formato": "xlsx"})
+    assert resposta.status_code == 400
+    assert "formato=csv" in resposta.json()["detail"]
+
+
+def test_tipo_de_arquivo_nao_suportado():
+    resposta = _enviar([("speedio.txt", b"CNPJ\n1\n", "text/plain")], {})
+    assert resposta.status_code == 400
+
+
+def test_streaming_recusa_xls():
+    resposta = _enviar([("speedio.xls", b"\xd0\xcf\x11\xe0", "application/vnd.ms-excel")], {"streaming": "true"})
+    assert resposta.status_code == 400
+    assert ".xls" in resposta.json()["detail"]
+
+
+def test_tamanho_do_bloco_lido_na_chamada(monkeypatch):
+    monkeypatch.setattr(speedio_assertiva, "LINHAS_POR_BLOCO", 20)
+    conteudo = para_xlsx(gerar_speedio(50))
+    blocos = list(speedio_assertiva.ler_em_blocos(conteudo, "speedio.xlsx"))
+    assert [len(b) for b in blocos] == [20, 20, 10]
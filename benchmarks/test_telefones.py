@@ -0,0 +1,49 @@
+"""
+Normalização de telefones compartilhada (speedio, extrator de números, WhatsApp).
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerador import TAMANHOS, _telefones_sujos
+from backend.telefones import normalizar_telefones
+from backend.whatsapp_validator import format_numbers
+from backend.extrair_numero import formatar_telefones
+
+
+def test_formatos_das_exportacoes():
+    entrada = pd.Series([
+        11987654321.0, "(11) 98765-4321", " 55 11 98765 4321 ", "011 3456-7890",
+        "55 99876 5432", "20 3456-7890", "12345", "", None,
+    ], dtype=object)
+    saida = normalizar_telefones(entrada)
+    assert saida["internacional"].tolist()[:6] == [
+        "5511987654321", "5511987654321", "5511987654321", "551134567890",
+        # DDD 55 (RS) sem o código do país ganha o 55 como qualquer outro DDD
+        "5555998765432", "552034567890",
+    ]
+    assert saida["nacional"][2] == "11987654321"
+    assert saida["tipo"].tolist()[:7] == ["celular", "celular", "celular", "fixo", "celular", "invalido", "invalido"]
+    # Não reconhecido: só os dígitos, com o 55 na frente como os validadores sempre mandaram
+    assert saida["internacional"][6] == "5512345" and saida["nacional"][6] == "12345"
+    assert saida.iloc[7:].isna().all().all()
+
+
+def test_nao_reconhecidos_nos_routers():
+    # Sem DDD, curtos demais ou já com o 55: o mesmo prefixo que o format_number antigo
+    entrada = ["987654321", " 3456-7890 ", "12345", "55123", "sem número"]
+    assert format_numbers(entrada) == ["55987654321", "5534567890", "5512345", "55123", "sem número"]
+    assert formatar_telefones(pd.Series(entrada + [None], dtype=object)).tolist() == [
+        "55987654321", "5534567890", "5512345", "55123", "", "",
+    ]
+
+
+def test_coluna_float_do_excel():
+    saida = normalizar_telefones(pd.Series([11987654321.0, np.nan]))
+    assert saida["nacional"][0] == "11987654321" and pd.isna(saida["nacional"][1])
+
+
+def test_normalizacao_da_coluna(medir, tamanho):
+    linhas = TAMANHOS[tamanho]
+    coluna = pd.Series(_telefones_sujos(np.random.default_rng(0), linhas, celular=True))
+    saida = medir(normalizar_telefones, coluna, linhas=linhas)
+    assert saida["internacional"].str.fullmatch(r"55\d{10,11}").all()
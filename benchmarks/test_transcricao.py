@@ -0,0 +1,62 @@
+"""
+Lotes de gravações curtas na transcrição (uma chamada ao Gemini para várias).
+
+O ganho de vazão aparece no teste de carga com o Gemini falso:
+
+    python -m benchmarks.carga transcricao --clientes 2 --requisicoes 4 --chamadas 20 --duracoes 45,60,90,300
+"""
+from backend import transcrever_audio
+from backend.transcrever_audio import MontadorLotes, montar_lotes, separar_transcricoes, transcrever_lote
+
+
+def _gravacao(duracao, tamanho=500_000):
+    return {"DURACAO": duracao, "BYTES": tamanho}
+
+
+def test_lotes_respeitam_duracao_bytes_e_chamadas_longas(monkeypatch):
+    monkeypatch.setattr(transcrever_audio, "TRANSCRICAO_LOTE_DURACAO_S", 200)
+    monkeypatch.setattr(transcrever_audio, "TRANSCRICAO_LOTE_MAX_BYTES", 2_000_000)
+    gravacoes = [_gravacao(d) for d in (60, 60, 60, 300, 45, 45)] + [_gravacao(40, 1_500_000), _gravacao(40, 1_000_000)]
+    tamanhos = [[g["DURACAO"] for g in lote] for lote in montar_lotes(gravacoes)]
+    # A longa vai sozinha sem fechar o lote em andamento; a duração fecha o primeiro lote e o teto de bytes, os seguintes
+    assert tamanhos == [[300], [60, 60, 60], [45, 45], [40], [40]]
+
+    monkeypatch.setattr(transcrever_audio, "TRANSCRICAO_LOTE_DURACAO_S", 0)
+    assert all(len(lote) == 1 for lote in montar_lotes(gravacoes))
+
+
+def test_lote_fecha_assim_que_enche(monkeypatch):
+    monkeypatch.setattr(transcrever_audio, "TRANSCRICAO_LOTE_MAX_ITENS", 2)
+    montador = MontadorLotes()
+    assert montador.adicionar(_gravacao(60)) == []
+    # O segundo item enche o lote: ele já sai pronto, sem esperar o próximo download
+    assert len(montador.adicionar(_gravacao(60))) == 1
+    assert montador.adicionar(_gravacao(300)) == [[_gravacao(300)]]
+    assert montador.finalizar() == []
+
+
+def test_divisao_da_resposta():
+    resposta = "=== GRAVAÇÃO 1 ===\nAna: Oi.\n\n**=== GRAVAÇÃO 2 ===**\nBia: Olá.\nAna: Tchau."
+    assert separar_transcricoes(resposta, 2) == ["Ana: Oi.", "Bia: Olá.\nAna: Tchau."]
+    assert separar_transcricoes(resposta, 3) is None
+    assert separar_transcricoes("Claro! Seguem:\n" + resposta, 2) is None
+    assert separar_transcricoes(resposta.replace("GRAVAÇÃO 2", "GRAVAÇÃO 1"), 2) is None
+    # Gravação pulada ou resposta truncada: bloco vazio não vira transcrição vazia
+    assert separar_transcricoes("=== GRAVAÇÃO 1 ===\n\n=== GRAVAÇÃO 2 ===\nBia: Olá.", 2) is None
+    assert separar_transcricoes("=== GRAVAÇÃO 1 ===\nAna: Oi.\n=== GRAVAÇÃO 2 ===\n  ", 2) is None
+
+
+def test_lote_invalido_volta_para_chamadas_individuais(monkeypatch, tmp_path):
+    caminhos = []
+    for n in range(3):
+        caminho = tmp_path / f"{n}.mp3"
+        caminho.write_bytes(b"\xff\xfb")
+        caminhos.append(str(caminho))
+    monkeypatch.setattr(transcrever_audio, "_gerar", lambda partes: "Ana: só uma transcrição, sem marcadores.")
+    assert transcrever_lote(caminhos) is None
+
+    def gerar(partes):
+        total = sum(isinstance(p, str) and p.startswith("=== GRAVAÇÃO") for p in partes)
+        return "\n".join(f"=== GRAVAÇÃO {n} ===\nTexto {n}" for n in range(1, total + 1))
+    monkeypatch.setattr(transcrever_audio, "_gerar", gerar)
+    assert transcrever_lote(caminhos) == ["Texto 1", "Texto 2", "Texto 3"]